@@ -0,0 +1,197 @@
+"""
+Agent Client - Pooled, keep-alive HTTP client for talking to the agents
+Shared by the orchestrator, system tests and demo scripts
+"""
+
+import json
+import os
+import sys
+import threading
+from typing import Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Agent URLs and compact encodings are shared with the agents
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "agents"))
+
+from agent_urls import AGENT_PORTS, default_base_url
+from wire import DecodedResponse, encode_request
+
+# httpx is only needed for HTTP/2 (pip install "httpx[http2]")
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+# Connections kept per agent and read timeout (seconds). Planning waits on
+# the LLM, the generators are fast.
+DEFAULT_POOL_SIZES = {
+    "planning": 8,
+    "frontend": 16,
+    "backend": 16,
+    "database": 16,
+    "testing": 16,
+}
+
+DEFAULT_TIMEOUTS = {
+    "planning": 60.0,
+    "frontend": 30.0,
+    "backend": 30.0,
+    "database": 30.0,
+    "testing": 30.0,
+}
+
+CONNECT_TIMEOUT = 3.0
+
+
+class AgentClient:
+    """
+    One pooled session per agent, reused for every request so TCP (and TLS)
+    setup is paid once per connection instead of once per call.
+
+    Responses wrap the underlying library's response objects (requests or
+    httpx), which share status_code, json(), text and raise_for_status();
+    json() also reads msgpack. With compact, request bodies are msgpack and
+    large ones compressed; an agent that answers 415 gets plain JSON from
+    then on.
+    """
+
+    def __init__(
+        self,
+        base_urls: Optional[Dict[str, str]] = None,
+        pool_sizes: Optional[Dict[str, int]] = None,
+        timeouts: Optional[Dict[str, float]] = None,
+        http2: Optional[bool] = None,
+        compact: bool = True,
+    ):
+        self.base_urls = {agent: default_base_url(agent) for agent in AGENT_PORTS}
+        self.base_urls.update(base_urls or {})
+        self.pool_sizes = {**DEFAULT_POOL_SIZES, **(pool_sizes or {})}
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+
+        if http2 is None:
+            http2 = os.getenv("AGENT_HTTP2", "").lower() in ("1", "true", "yes")
+        if http2 and not HTTPX_AVAILABLE:
+            print("⚠️  HTTP/2 requested but httpx is not installed, using HTTP/1.1 keep-alive")
+            http2 = False
+        self.http2 = http2
+        self.compact = compact
+        self._json_agents = set()
+
+        self._sessions: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _session(self, agent: str):
+        session = self._sessions.get(agent)
+        if session is not None:
+            return session
+
+        with self._lock:
+            session = self._sessions.get(agent)
+            if session is None:
+                pool_size = self.pool_sizes.get(agent, 16)
+                if self.http2:
+                    session = httpx.Client(
+                        http2=True,
+                        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+                        timeout=httpx.Timeout(self.timeouts.get(agent, 30.0), connect=CONNECT_TIMEOUT),
+                    )
+                else:
+                    session = requests.Session()
+                    # pool_block keeps us at pool_size connections under bursts
+                    # instead of opening (and discarding) overflow connections
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                self._sessions[agent] = session
+        return session
+
+    def url(self, agent: str, path: str) -> str:
+        return f"{self.base_urls[agent]}{path}"
+
+    def _timeout(self, agent: str, timeout: Optional[float]):
+        read_timeout = timeout if timeout is not None else self.timeouts.get(agent, 30.0)
+        if self.http2:
+            return httpx.Timeout(read_timeout, connect=CONNECT_TIMEOUT)
+        return (CONNECT_TIMEOUT, read_timeout)
+
+    def _encode(self, agent: str, payload: Dict):
+        body, headers = encode_request(payload, compact=self.compact and agent not in self._json_agents)
+        # requests takes the raw body as data, httpx as content
+        return {"content" if self.http2 else "data": body}, headers
+
+    def _fall_back(self, agent: str, response) -> bool:
+        """True if the agent rejected a compact body; it gets plain JSON from now on"""
+        if response.status_code == 415 and self.compact and agent not in self._json_agents:
+            self._json_agents.add(agent)
+            return True
+        return False
+
+    def post(self, agent: str, path: str, payload: Dict, timeout: Optional[float] = None):
+        body, headers = self._encode(agent, payload)
+        response = self._session(agent).post(
+            self.url(agent, path),
+            headers=headers,
+            timeout=self._timeout(agent, timeout),
+            **body
+        )
+        if self._fall_back(agent, response):
+            return self.post(agent, path, payload, timeout)
+        return DecodedResponse(response)
+
+    def post_stream(self, agent: str, path: str, payload: Dict, timeout: Optional[float] = None) -> Iterator[Dict]:
+        """POST asking for NDJSON and yield each line, parsed, as it arrives"""
+        body, headers = self._encode(agent, payload)
+        headers["Accept"] = "application/x-ndjson"
+        session = self._session(agent)
+        if self.http2:
+            response_context = session.stream(
+                "POST", self.url(agent, path), headers=headers, timeout=self._timeout(agent, timeout), **body
+            )
+        else:
+            response_context = session.post(
+                self.url(agent, path), headers=headers, timeout=self._timeout(agent, timeout), stream=True, **body
+            )
+        with response_context as response:
+            if self._fall_back(agent, response):
+                yield from self.post_stream(agent, path, payload, timeout)
+                return
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def get(self, agent: str, path: str, timeout: Optional[float] = None):
+        return self._session(agent).get(self.url(agent, path), timeout=self._timeout(agent, timeout))
+
+    def health(self, agent: str, timeout: float = 3.0) -> bool:
+        """True if the agent answers /health with 200"""
+        try:
+            return self.get(agent, "/health", timeout=timeout).status_code == 200
+        except Exception:
+            return False
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_shared_client: Optional[AgentClient] = None
+
+
+def get_client() -> AgentClient:
+    """Process-wide client so scripts share one set of pools"""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = AgentClient()
+    return _shared_client
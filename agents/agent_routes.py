@@ -0,0 +1,48 @@
+"""
+Agent Routes - Call agent endpoints directly, without HTTP
+Shared by the in-process transport and the queue workers
+"""
+
+import inspect
+from typing import Any, Callable, Dict, Tuple, Type, get_type_hints
+
+from fastapi import FastAPI, Response
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+RouteTable = Dict[str, Tuple[Callable, Type[BaseModel]]]
+
+
+def json_routes(agent_app: FastAPI) -> RouteTable:
+    """
+    POST routes whose first parameter is a Pydantic request body and whose
+    other parameters (e.g. an optional Accept header) all have defaults
+    """
+    routes = {}
+    for route in agent_app.routes:
+        if not isinstance(route, APIRoute) or "POST" not in route.methods:
+            continue
+        params = list(inspect.signature(route.endpoint).parameters.values())
+        if not params or any(param.default is inspect.Parameter.empty for param in params[1:]):
+            continue
+        model = get_type_hints(route.endpoint).get(params[0].name)
+        if inspect.isclass(model) and issubclass(model, BaseModel):
+            routes[route.path] = (route.endpoint, model)
+    return routes
+
+
+async def call_route(routes: RouteTable, path: str, payload: Dict) -> Dict[str, Any]:
+    """
+    Validate payload into the route's request model, await the handler and
+    return the response as a dict. HTTPExceptions raised by the handler
+    propagate unchanged.
+    """
+    try:
+        handler, model = routes[path]
+    except KeyError:
+        raise ValueError(f"No direct route for {path}")
+
+    result = await handler(model(**payload))
+    if isinstance(result, Response):
+        raise ValueError(f"{path} streams its response and must be called over HTTP")
+    return result.dict() if isinstance(result, BaseModel) else result
@@ -0,0 +1,24 @@
+"""
+Agent URLs - Default ports and base URLs of the five agents
+Shared by the orchestrator's AgentClient, the status hub and the pipeline
+transport, so a port or override lives in one place
+"""
+
+import os
+
+AGENT_PORTS = {
+    "planning": 8000,
+    "frontend": 8001,
+    "backend": 8002,
+    "database": 8003,
+    "testing": 8004,
+}
+
+
+def default_base_url(agent: str) -> str:
+    """PLANNING_AGENT_URL etc. override the localhost default"""
+    env_url = os.getenv(f"{agent.upper()}_AGENT_URL")
+    if env_url:
+        return env_url.rstrip("/")
+    host = os.getenv("AGENT_HOST", "localhost")
+    return f"http://{host}:{AGENT_PORTS[agent]}"
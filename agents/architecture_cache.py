@@ -0,0 +1,122 @@
+"""
+Architecture Cache - Content-addressed cache for LLM-generated architectures
+Two tiers: an in-process LRU in front of (async) Redis, both with a TTL
+"""
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the planning prompt changes so stale blueprints are not served
+CACHE_VERSION = "v1"
+
+
+class ArchitectureCache:
+    """
+    Maps the content of a PlanningRequest (title, description, acceptance
+    criteria, tech hints) to the Architecture generated for it, packed with
+    wire.pack_value (Redis and the in-process tier hold the same bytes).
+    Session, story and project ids are deliberately not part of the key.
+    """
+
+    def __init__(self, redis_client=None, max_entries: int = 256, ttl_seconds: int = 86400, namespace: str = "archcache"):
+        self.redis_client = redis_client
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(request, model: str) -> str:
+        """Canonical SHA-256 of the request content that drives generation"""
+        content = {
+            "version": CACHE_VERSION,
+            "model": model,
+            "title": request.title.strip(),
+            "description": request.description.strip(),
+            # Criteria ids are not in the prompt, only order, priority and text
+            "acceptance_criteria": [[c.priority, c.text.strip()] for c in request.acceptance_criteria],
+            "tech_hints": request.tech_hints.dict(),
+        }
+        canonical = json.dumps(content, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return value
+            del self._entries[key]
+
+        if self.redis_client is not None:
+            try:
+                value = await self.redis_client.get(self._redis_key(key))
+            except Exception as e:
+                logger.warning(f"Architecture cache Redis read failed: {e}")
+                value = None
+            if value is not None:
+                self.redis_hits += 1
+                self._remember(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: bytes):
+        self._remember(key, value)
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.setex(self._redis_key(key), self.ttl_seconds, value)
+            except Exception as e:
+                logger.warning(f"Architecture cache Redis write failed: {e}")
+
+    def queue_set(self, pipeline, key: str, value: bytes):
+        """Remember locally and add the Redis write to a caller's pipeline"""
+        self._remember(key, value)
+        pipeline.setex(self._redis_key(key), self.ttl_seconds, value)
+
+    def _remember(self, key: str, value: bytes):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_hits": self.memory_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+        }
+
+    def render_metrics(self, prefix: str = "planning_architecture_cache") -> str:
+        """Prometheus text exposition of the cache counters"""
+        return "\n".join([
+            f"# TYPE {prefix}_hits_total counter",
+            f'{prefix}_hits_total{{tier="memory"}} {self.memory_hits}',
+            f'{prefix}_hits_total{{tier="redis"}} {self.redis_hits}',
+            f"# TYPE {prefix}_misses_total counter",
+            f"{prefix}_misses_total {self.misses}",
+            f"# TYPE {prefix}_evictions_total counter",
+            f"{prefix}_evictions_total {self.evictions}",
+            f"# TYPE {prefix}_entries gauge",
+            f"{prefix}_entries {len(self._entries)}",
+        ]) + "\n"
@@ -0,0 +1,107 @@
+"""
+Architecture Diff - Entity-level changes between two architectures
+Tables, endpoints and components are matched by key and compared by
+content, so a re-planned story only regenerates what actually changed
+"""
+
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Architecture section holding each layer's entities
+LAYER_SECTIONS = {
+    "database": ("database", "tables"),
+    "backend": ("backend", "endpoints"),
+    "frontend": ("frontend", "components"),
+}
+
+
+def table_key(table: Dict) -> str:
+    return table.get("name", "table")
+
+
+def endpoint_key(endpoint: Dict) -> str:
+    """Method and path identify an endpoint; it is also the file's entity tag"""
+    return f'{endpoint.get("method", "GET").upper()} {endpoint.get("path", "/api/resource")}'
+
+
+def component_key(component: str) -> str:
+    return component
+
+
+LAYER_KEYS: Dict[str, Callable[[Any], str]] = {
+    "database": table_key,
+    "backend": endpoint_key,
+    "frontend": component_key,
+}
+
+
+def layer_entities(architecture: Dict, layer: str) -> List:
+    section, field = LAYER_SECTIONS[layer]
+    return (architecture.get(section) or {}).get(field) or []
+
+
+def _canonical(entity: Any) -> str:
+    return json.dumps(entity, sort_keys=True, separators=(",", ":"))
+
+
+def diff_layer(old: Iterable, new: Iterable, key: Callable[[Any], str]) -> Dict[str, List[str]]:
+    """added/changed/removed/unchanged entity keys, in the new architecture's order"""
+    old_by_key = {key(entity): _canonical(entity) for entity in old}
+    changes = {"added": [], "changed": [], "removed": [], "unchanged": []}
+
+    seen = set()
+    for entity in new:
+        entity_key = key(entity)
+        seen.add(entity_key)
+        if entity_key not in old_by_key:
+            changes["added"].append(entity_key)
+        elif old_by_key[entity_key] != _canonical(entity):
+            changes["changed"].append(entity_key)
+        else:
+            changes["unchanged"].append(entity_key)
+
+    changes["removed"] = [entity_key for entity_key in old_by_key if entity_key not in seen]
+    return changes
+
+
+def diff_architectures(old: Dict, new: Dict) -> Dict[str, Dict[str, List[str]]]:
+    """{layer: {"added", "changed", "removed", "unchanged"}} for every generated layer"""
+    return {
+        layer: diff_layer(layer_entities(old, layer), layer_entities(new, layer), key)
+        for layer, key in LAYER_KEYS.items()
+    }
+
+
+def is_dirty(layer_changes: Optional[Dict[str, List[str]]]) -> bool:
+    """True if anything in the layer was added, changed or removed (or unknown)"""
+    if layer_changes is None:
+        return True
+    return bool(layer_changes["added"] or layer_changes["changed"] or layer_changes["removed"])
+
+
+def changed_entities(architecture: Dict, layer: str, layer_changes: Dict[str, List[str]]) -> List:
+    """The layer's entities that were added or changed"""
+    wanted = set(layer_changes["added"]) | set(layer_changes["changed"])
+    key = LAYER_KEYS[layer]
+    return [entity for entity in layer_entities(architecture, layer) if key(entity) in wanted]
+
+
+def _file_key(file: Dict) -> tuple:
+    # Several endpoints can render to the same file_path, so tagged files
+    # are matched on their entity
+    entity = file.get("entity")
+    return ("entity", entity) if entity is not None else ("path", file["file_path"])
+
+
+def merge_files(previous: List[Dict], fresh: List[Dict], removed: Iterable[str] = ()) -> List[Dict]:
+    """
+    Previous files, minus those tagged with a removed entity, overlaid by
+    the freshly generated files (matched on entity, else file_path)
+    """
+    removed = set(removed)
+    merged = {
+        _file_key(file): file for file in previous
+        if file.get("entity") not in removed
+    }
+    merged.update({_file_key(file): file for file in fresh})
+    return list(merged.values())
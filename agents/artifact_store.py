@@ -0,0 +1,112 @@
+"""
+Artifact Store - Persists generated files into generated_code
+File bodies are content-addressed in code_blobs, so the many identical
+template outputs are stored once; rows are bulk-loaded with COPY
+"""
+
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import AsyncIterator, Awaitable, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class ArtifactStore:
+    """
+    save() writes one story's files in a single transaction: new blobs are
+    COPYed into a temp table and merged with ON CONFLICT DO NOTHING, then the
+    generated_code rows (which only reference the hash) are COPYed directly.
+    A bounded set of hashes already known to be stored lets repeat bodies
+    skip the blob upload entirely.
+    """
+
+    def __init__(self, pool_factory: Callable[[], Awaitable], known_hashes: int = 10000):
+        self.pool_factory = pool_factory
+        self.max_known_hashes = known_hashes
+        self._known: "OrderedDict[str, None]" = OrderedDict()
+
+    def _remember(self, hashes: List[str]):
+        for digest in hashes:
+            self._known[digest] = None
+            self._known.move_to_end(digest)
+        while len(self._known) > self.max_known_hashes:
+            self._known.popitem(last=False)
+
+    async def save(self, story_id: str, session_id: str, files: List[Dict]) -> Dict[str, int]:
+        """files: [{"layer", "file_path", "content", "language"}]"""
+        rows = []
+        new_blobs: Dict[str, str] = {}
+
+        for file in files:
+            content = file["content"]
+            digest = content_hash(content)
+            if digest not in self._known and digest not in new_blobs:
+                new_blobs[digest] = content
+            rows.append((story_id, session_id, file["layer"], file["file_path"], digest, file.get("language")))
+
+        pool = await self.pool_factory()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                if new_blobs:
+                    await conn.execute(
+                        """
+                        CREATE TEMP TABLE IF NOT EXISTS tmp_code_blobs
+                        (content_hash CHAR(64), content TEXT, size_bytes INTEGER)
+                        ON COMMIT DELETE ROWS
+                        """
+                    )
+                    await conn.copy_records_to_table(
+                        "tmp_code_blobs",
+                        records=[(digest, body, len(body.encode("utf-8"))) for digest, body in new_blobs.items()],
+                        columns=["content_hash", "content", "size_bytes"]
+                    )
+                    await conn.execute(
+                        """
+                        INSERT INTO code_blobs (content_hash, content, size_bytes)
+                        SELECT content_hash, content, size_bytes FROM tmp_code_blobs
+                        ON CONFLICT (content_hash) DO NOTHING
+                        """
+                    )
+                await conn.copy_records_to_table(
+                    "generated_code",
+                    records=rows,
+                    columns=["story_id", "session_id", "layer", "file_path", "content_hash", "language"]
+                )
+
+        self._remember(list(new_blobs))
+        logger.info(f"Stored {len(rows)} files for {story_id} ({len(new_blobs)} new blobs)")
+        return {"files": len(rows), "new_blobs": len(new_blobs), "deduplicated": len(rows) - len(new_blobs)}
+
+    async def iter_files(self, story_id: str, after_id: int = 0, limit: int = 100) -> AsyncIterator[Dict]:
+        """Files of a story in id order (keyset pagination), read via a server-side cursor"""
+        pool = await self.pool_factory()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                async for record in conn.cursor(
+                    """
+                    SELECT g.id, g.session_id, g.layer, g.file_path, g.language,
+                           COALESCE(b.content, g.content) AS content, g.content_hash, g.created_at
+                    FROM generated_code g
+                    LEFT JOIN code_blobs b ON b.content_hash = g.content_hash
+                    WHERE g.story_id = $1 AND g.id > $2
+                    ORDER BY g.id
+                    LIMIT $3
+                    """,
+                    story_id, after_id, limit,
+                    prefetch=50
+                ):
+                    yield {
+                        "id": record["id"],
+                        "session_id": record["session_id"],
+                        "layer": record["layer"],
+                        "file_path": record["file_path"],
+                        "language": record["language"],
+                        "content": record["content"],
+                        "content_hash": record["content_hash"],
+                        "created_at": record["created_at"].isoformat() if record["created_at"] else None,
+                    }
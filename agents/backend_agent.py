@@ -2,16 +2,30 @@
 Backend Agent - Generates FastAPI endpoints
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import Annotated, AsyncIterator, Dict, List, Optional
 import logging
+import os
 from datetime import datetime
 
+from architecture_diff import endpoint_key
+from generation_memo import GenerationMemo
+from instrumentation import instrument
+from ndjson import ndjson_response, wants_ndjson
+from offload import close_offload, get_offload
+from redis_store import close_redis, get_redis
+from task_queue import enable_queue_worker
+from template_engine import CompiledTemplate
+from wire import negotiate_encodings
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Backend Agent")
+negotiate_encodings(app)
+agent_metrics = instrument(app, "backend")
 
 class BackendTask(BaseModel):
     task_id: str
@@ -24,19 +38,13 @@ class BackendResponse(BaseModel):
     task_id: str
     generated_files: List[Dict[str, str]]
 
-def generate_fastapi_endpoint(endpoint: Dict) -> str:
-    """Generate FastAPI endpoint code"""
-    
-    path = endpoint.get("path", "/api/resource")
-    method = endpoint.get("method", "GET").upper()
-    auth_required = endpoint.get("auth_required", False)
-    
-    template = f"""from fastapi import APIRouter, Depends, HTTPException, status
+# Endpoint module templates, compiled once per (method, auth) combination
+ENDPOINT_HEADER = """from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 
-router = APIRouter(prefix="{path.rsplit('/', 1)[0]}", tags=["{path.split('/')[2] if len(path.split('/')) > 2 else 'api'}"])
+router = APIRouter(prefix="{prefix}", tags=["{tag}"])
 
 # Models
 class RequestModel(BaseModel):
@@ -49,27 +57,24 @@ class ResponseModel(BaseModel):
 
 """
 
-    if auth_required:
-        template += """# Authentication dependency
+AUTH_DEPENDENCY = """# Authentication dependency
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     # Implement JWT validation
-    return {{"user_id": 1}}
+    return {{{{"user_id": 1}}}}
 
 """
 
-    if method == "GET":
-        template += f"""@router.get("{path.split(path.rsplit('/', 1)[0])[-1]}", response_model=List[ResponseModel])
-async def get_items({f"current_user = Depends(get_current_user)" if auth_required else ""}):
+ENDPOINT_HANDLERS = {
+    "GET": """@router.get("{route}", response_model=List[ResponseModel])
+async def get_items({{dependencies}}):
     '''Retrieve all items'''
     # TODO: Implement database query
     return []
-"""
-    
-    elif method == "POST":
-        template += f"""@router.post("{path.split(path.rsplit('/', 1)[0])[-1]}", response_model=ResponseModel, status_code=status.HTTP_201_CREATED)
+""",
+    "POST": """@router.post("{route}", response_model=ResponseModel, status_code=status.HTTP_201_CREATED)
 async def create_item(
     item: RequestModel,
-    {f"current_user = Depends(get_current_user)" if auth_required else ""}
+    {{dependencies}}
 ):
     '''Create a new item'''
     # TODO: Implement database insert
@@ -78,9 +83,70 @@ async def create_item(
         data=item.data,
         created_at=datetime.utcnow()
     )
-"""
+""",
+}
+
+# The auth dependency parameter is fixed per variant, so it is baked in
+# at compile time rather than passed on every render
+ENDPOINT_TEMPLATES = {
+    (method, auth_required): CompiledTemplate(
+        ENDPOINT_HEADER
+        + (AUTH_DEPENDENCY if auth_required else "")
+        + ENDPOINT_HANDLERS.get(method, "").replace(
+            "{{dependencies}}",
+            "current_user = Depends(get_current_user)" if auth_required else ""
+        )
+    )
+    for method in (*ENDPOINT_HANDLERS, None)
+    for auth_required in (True, False)
+}
+
+def generate_fastapi_endpoint(endpoint: Dict) -> str:
+    """Generate FastAPI endpoint code"""
+    
+    path = endpoint.get("path", "/api/resource")
+    method = endpoint.get("method", "GET").upper()
+    auth_required = bool(endpoint.get("auth_required", False))
+    
+    # Split the path once: router prefix, tag and the route under the prefix
+    prefix = path.rsplit('/', 1)[0]
+    segments = path.split('/')
+    
+    tag = segments[2] if len(segments) > 2 else 'api'
     
-    return template
+    if method not in ENDPOINT_HANDLERS:
+        return ENDPOINT_TEMPLATES[(None, auth_required)].render(prefix=prefix, tag=tag)
+    return ENDPOINT_TEMPLATES[(method, auth_required)].render(
+        prefix=prefix,
+        tag=tag,
+        route=path[len(prefix):]
+    )
+
+def endpoint_memo_input(endpoint: Dict) -> Dict:
+    """The endpoint fields generate_fastapi_endpoint actually reads"""
+    return {
+        "path": endpoint.get("path", "/api/resource"),
+        "method": endpoint.get("method", "GET").upper(),
+        "auth_required": bool(endpoint.get("auth_required", False)),
+    }
+
+# Bump whenever the endpoint templates change so stale renders are not served
+GENERATOR_VERSION = "v1"
+
+endpoint_memo = GenerationMemo(
+    generate_fastapi_endpoint,
+    version=GENERATOR_VERSION,
+    normalize=endpoint_memo_input,
+    max_entries=int(os.getenv("GENERATION_MEMO_SIZE", "1024")),
+    redis_client=get_redis() if os.getenv("GENERATION_MEMO_REDIS", "0") == "1" else None,
+    namespace="genmemo:fastapi",
+    offload=get_offload()
+)
+
+@app.on_event("shutdown")
+async def shutdown():
+    close_offload()
+    await close_redis()
 
 @app.get("/health")
 async def health():
@@ -90,23 +156,47 @@ async def health():
         "timestamp": datetime.utcnow().isoformat()
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return (
+        agent_metrics.render_metrics("agent")
+        + endpoint_memo.render_metrics("backend_generation_memo")
+        + get_offload().render_metrics("backend_offload")
+    )
+
+# Endpoints rendered per batch when streaming NDJSON
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "32"))
+
+async def iter_endpoint_files(endpoints: List[Dict], chunk_size: Optional[int] = None) -> AsyncIterator[Dict]:
+    """Endpoint files in order, rendered chunk_size at a time (all at once by default)"""
+    chunk_size = chunk_size or len(endpoints) or 1
+    for start in range(0, len(endpoints), chunk_size):
+        chunk = endpoints[start:start + chunk_size]
+        codes = await endpoint_memo.render_many(chunk)
+        for endpoint, code in zip(chunk, codes):
+            path_name = endpoint["path"].replace("/", "_").replace("{", "").replace("}", "")
+            yield {
+                "file_path": f"app/routes{path_name}.py",
+                "content": code,
+                "language": "python",
+                "entity": endpoint_key(endpoint)
+            }
+
 @app.post("/agents/backend", response_model=BackendResponse)
-async def generate_backend(task: BackendTask):
+async def generate_backend(task: BackendTask, accept: Annotated[Optional[str], Header()] = None):
     logger.info(f"Backend generation for task: {task.task_id}")
+    agent_metrics.note_task(task.task_id)
+    
+    if wants_ndjson(accept):
+        return ndjson_response(
+            agent_metrics.count_files(iter_endpoint_files(task.endpoints, STREAM_CHUNK_SIZE)),
+            lambda count: {"status": "success", "task_id": task.task_id}
+        )
     
     try:
-        generated_files = []
-        
-        for endpoint in task.endpoints:
-            code = generate_fastapi_endpoint(endpoint)
-            path_name = endpoint["path"].replace("/", "_").replace("{", "").replace("}", "")
-            
-            generated_files.append({
-                "file_path": f"app/routes{path_name}.py",
-                "content": code,
-                "language": "python"
-            })
+        generated_files = [file async for file in iter_endpoint_files(task.endpoints)]
         
+        agent_metrics.record_files(generated_files)
         logger.info(f"Generated {len(generated_files)} endpoints")
         
         return BackendResponse(
@@ -119,6 +209,9 @@ async def generate_backend(task: BackendTask):
         logger.error(f"Backend generation failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Optionally also take tasks from RabbitMQ (AGENT_QUEUE_CONSUMERS > 0)
+enable_queue_worker(app, "backend")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8002)
@@ -2,16 +2,27 @@
 Database Agent - Generates database schemas
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import Annotated, AsyncIterator, Dict, List, Optional
+import asyncio
 import logging
 from datetime import datetime
 
+from instrumentation import instrument
+from ndjson import ndjson_response, wants_ndjson
+from offload import close_offload, get_offload
+from task_queue import enable_queue_worker
+from template_engine import CompiledTemplate
+from wire import negotiate_encodings
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Database Agent")
+negotiate_encodings(app)
+agent_metrics = instrument(app, "database")
 
 class DatabaseTask(BaseModel):
     task_id: str
@@ -24,36 +35,56 @@ class DatabaseResponse(BaseModel):
     task_id: str
     generated_files: List[Dict[str, str]]
 
+# Columns worth a secondary index: foreign keys (Postgres does not index the
+# referencing side) and the columns generated endpoints filter or sort on,
+# which is only created_at (newest first)
+INDEX_FILTER_COLUMNS = frozenset({"created_at"})
+
+def plan_indexes(columns: List[Dict]) -> List[str]:
+    """Existing columns to index; primary keys and unique columns already are"""
+    indexed = []
+    for col in columns:
+        name = col["name"]
+        constraints = col.get("constraints")
+        if constraints:
+            constraints = constraints.upper()
+            if "PRIMARY KEY" in constraints or "UNIQUE" in constraints:
+                continue
+            if "REFERENCES" in constraints:
+                indexed.append(name)
+                continue
+        if name.endswith("_id") or name in INDEX_FILTER_COLUMNS:
+            indexed.append(name)
+    return indexed
+
 def generate_sql_schema(tables: List[Dict]) -> str:
     """Generate SQL schema"""
     
-    sql = "-- Generated Database Schema\n\n"
+    parts = ["-- Generated Database Schema\n\n"]
     
     for table in tables:
         table_name = table.get("name", "table")
         columns = table.get("columns", [])
         
-        sql += f"CREATE TABLE IF NOT EXISTS {table_name} (\n"
-        
-        column_defs = []
-        for col in columns:
-            col_def = f"    {col['name']} {col['type']}"
-            if col.get("constraints"):
-                col_def += f" {col['constraints']}"
-            column_defs.append(col_def)
+        parts.append(f"CREATE TABLE IF NOT EXISTS {table_name} (\n")
+        parts.append(",\n".join([
+            f"    {col['name']} {col['type']} {col['constraints']}" if col.get("constraints")
+            else f"    {col['name']} {col['type']}"
+            for col in columns
+        ]))
+        parts.append("\n);\n\n")
         
-        sql += ",\n".join(column_defs)
-        sql += "\n);\n\n"
-        
-        # Add indexes
-        sql += f"CREATE INDEX IF NOT EXISTS idx_{table_name}_created ON {table_name}(created_at);\n\n"
+        index_columns = plan_indexes(columns)
+        if index_columns:
+            parts.extend([
+                f"CREATE INDEX IF NOT EXISTS idx_{table_name}_{column} ON {table_name}({column});\n"
+                for column in index_columns
+            ])
+            parts.append("\n")
     
-    return sql
+    return "".join(parts)
 
-def generate_sqlalchemy_models(tables: List[Dict]) -> str:
-    """Generate SQLAlchemy models"""
-    
-    code = """from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+SQLALCHEMY_HEADER = """from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -61,38 +92,77 @@ from datetime import datetime
 Base = declarative_base()
 
 """
+
+SQLALCHEMY_CLASS_TEMPLATE = CompiledTemplate("""class {class_name}(Base):
+    __tablename__ = '{table_name}'
+
+""")
+
+SQLALCHEMY_COLUMN_TEMPLATE = CompiledTemplate("""    {col_name} = Column({sa_type}, primary_key={primary_key})
+""")
+
+# SQL type markers -> SQLAlchemy type, first match wins
+SQLALCHEMY_TYPE_RULES = (
+    (("INT", "SERIAL"), "Integer"),
+    (("VARCHAR", "TEXT"), "String"),
+    (("TIMESTAMP",), "DateTime"),
+    (("BOOLEAN",), "Boolean"),
+)
+
+def _match_sqlalchemy_type(col_type: str) -> str:
+    for markers, sa_type in SQLALCHEMY_TYPE_RULES:
+        if any(marker in col_type for marker in markers):
+            return sa_type
+    return "String"
+
+# Precomputed for the types the planner emits; other spellings are added on
+# first use, so the rules run once per distinct type rather than per column
+SQLALCHEMY_TYPES: Dict[str, str] = {
+    col_type: _match_sqlalchemy_type(col_type)
+    for col_type in (
+        "SERIAL", "BIGSERIAL", "INTEGER", "INT", "BIGINT", "SMALLINT",
+        "VARCHAR(50)", "VARCHAR(100)", "VARCHAR(255)", "TEXT",
+        "TIMESTAMP", "TIMESTAMPTZ", "BOOLEAN", "JSONB", "UUID", "DATE",
+    )
+}
+SQLALCHEMY_TYPES_MAX = 4096
+
+def sqlalchemy_type(col_type: str) -> str:
+    sa_type = SQLALCHEMY_TYPES.get(col_type)
+    if sa_type is None:
+        sa_type = _match_sqlalchemy_type(col_type)
+        if len(SQLALCHEMY_TYPES) < SQLALCHEMY_TYPES_MAX:
+            SQLALCHEMY_TYPES[col_type] = sa_type
+    return sa_type
+
+def generate_sqlalchemy_models(tables: List[Dict]) -> str:
+    """Generate SQLAlchemy models"""
+    
+    parts = [SQLALCHEMY_HEADER]
     
     for table in tables:
         table_name = table.get("name", "table")
         class_name = "".join([word.capitalize() for word in table_name.split("_")])
         
-        code += f"class {class_name}(Base):\n"
-        code += f"    __tablename__ = '{table_name}'\n\n"
+        parts.append(SQLALCHEMY_CLASS_TEMPLATE.render(class_name=class_name, table_name=table_name))
         
         for col in table.get("columns", []):
-            col_name = col["name"]
-            col_type = col["type"]
-            
-            # Map SQL types to SQLAlchemy
-            if "INT" in col_type or "SERIAL" in col_type:
-                sa_type = "Integer"
-            elif "VARCHAR" in col_type or "TEXT" in col_type:
-                sa_type = "String"
-            elif "TIMESTAMP" in col_type:
-                sa_type = "DateTime"
-            elif "BOOLEAN" in col_type:
-                sa_type = "Boolean"
-            else:
-                sa_type = "String"
+            # Constraints may be missing or explicitly null
+            primary_key = "PRIMARY KEY" in (col.get("constraints") or "")
             
-            constraints = col.get("constraints", "")
-            primary_key = "PRIMARY KEY" in constraints
-            
-            code += f"    {col_name} = Column({sa_type}, primary_key={primary_key})\n"
+            parts.append(SQLALCHEMY_COLUMN_TEMPLATE.render(
+                col_name=col["name"],
+                sa_type=sqlalchemy_type(col["type"]),
+                primary_key="True" if primary_key else "False"
+            ))
         
-        code += "\n"
+        parts.append("\n")
     
-    return code
+    return "".join(parts)
+
+@app.on_event("shutdown")
+async def shutdown():
+    close_offload()
 
 @app.get("/health")
 async def health():
@@ -102,27 +172,43 @@ async def health():
         "timestamp": datetime.utcnow().isoformat()
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return agent_metrics.render_metrics("agent") + get_offload().render_metrics("database_offload")
+
+# (file_path, language, generator) of every file the agent produces
+DATABASE_FILES = [
+    ("database/schema.sql", "sql", generate_sql_schema),
+    ("app/models.py", "python", generate_sqlalchemy_models),
+]
+
+async def render_database_file(tables: List[Dict], file_path: str, language: str, generator) -> Dict:
+    # Rendered off the event loop; large schemas go to worker processes
+    content = await get_offload().run(len(tables), generator, tables)
+    return {"file_path": file_path, "content": content, "language": language}
+
+async def iter_database_files(tables: List[Dict]) -> AsyncIterator[Dict]:
+    """Database files in completion order"""
+    for rendered in asyncio.as_completed([render_database_file(tables, *spec) for spec in DATABASE_FILES]):
+        yield await rendered
+
 @app.post("/agents/database", response_model=DatabaseResponse)
-async def generate_database(task: DatabaseTask):
+async def generate_database(task: DatabaseTask, accept: Annotated[Optional[str], Header()] = None):
     logger.info(f"Database generation for task: {task.task_id}")
+    agent_metrics.note_task(task.task_id)
+    
+    if wants_ndjson(accept):
+        return ndjson_response(
+            agent_metrics.count_files(iter_database_files(task.tables)),
+            lambda count: {"status": "success", "task_id": task.task_id}
+        )
     
     try:
-        sql_schema = generate_sql_schema(task.tables)
-        sqlalchemy_models = generate_sqlalchemy_models(task.tables)
-        
-        generated_files = [
-            {
-                "file_path": "database/schema.sql",
-                "content": sql_schema,
-                "language": "sql"
-            },
-            {
-                "file_path": "app/models.py",
-                "content": sqlalchemy_models,
-                "language": "python"
-            }
-        ]
+        generated_files = await asyncio.gather(
+            *[render_database_file(task.tables, *spec) for spec in DATABASE_FILES]
+        )
         
+        agent_metrics.record_files(generated_files)
         logger.info(f"Generated database schema and models")
         
         return DatabaseResponse(
@@ -135,6 +221,9 @@ async def generate_database(task: DatabaseTask):
         logger.error(f"Database generation failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Optionally also take tasks from RabbitMQ (AGENT_QUEUE_CONSUMERS > 0)
+enable_queue_worker(app, "database")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8003)
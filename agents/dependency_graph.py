@@ -0,0 +1,134 @@
+"""
+Dependency Graph Executor - Runs pipeline stages in topological order
+Stages with no path between them in the graph run concurrently
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Used when the planner returns no (or an empty) dependency graph.
+# Database and frontend generation only read the architecture, so they are
+# independent; backend builds on the schema and testing covers every layer.
+DEFAULT_GRAPH = {
+    "nodes": ["database", "backend", "frontend", "testing"],
+    "edges": [
+        {"from_node": "database", "to": "backend"},
+        {"from_node": "backend", "to": "testing"},
+        {"from_node": "frontend", "to": "testing"},
+    ],
+}
+
+
+def _edge_endpoints(edge: Any) -> tuple:
+    """Accept edges as dicts or DependencyEdge models"""
+    if isinstance(edge, dict):
+        return edge.get("from_node", edge.get("from")), edge.get("to")
+    return edge.from_node, edge.to
+
+
+def with_default_stages(graph: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    The planner's graph with every DEFAULT_GRAPH stage it left out (or
+    renamed) added back, wired by DEFAULT_GRAPH's edges; a generation stage
+    must never silently not run. An empty graph becomes DEFAULT_GRAPH.
+    """
+    if not graph or not graph.get("nodes"):
+        return DEFAULT_GRAPH
+    nodes = list(graph["nodes"])
+    edges = list(graph.get("edges") or [])
+    present = set(nodes) | {node for edge in edges for node in _edge_endpoints(edge)}
+    missing = [node for node in DEFAULT_GRAPH["nodes"] if node not in present]
+    if not missing:
+        return graph
+    logger.warning(f"Dependency graph is missing {', '.join(missing)}; using the default edges for them")
+    edges += [edge for edge in DEFAULT_GRAPH["edges"] if set(_edge_endpoints(edge)) & set(missing)]
+    return {"nodes": nodes + missing, "edges": edges}
+
+
+def build_dependencies(nodes: List[str], edges: List[Any]) -> Dict[str, List[str]]:
+    """Map every node to the list of nodes it waits for"""
+    dependencies: Dict[str, List[str]] = {node: [] for node in nodes}
+    for edge in edges:
+        source, target = _edge_endpoints(edge)
+        if not source or not target:
+            continue
+        dependencies.setdefault(source, [])
+        dependencies.setdefault(target, [])
+        if source not in dependencies[target]:
+            dependencies[target].append(source)
+    return dependencies
+
+
+def topological_levels(nodes: List[str], edges: List[Any]) -> List[List[str]]:
+    """
+    Group nodes into levels (Kahn's algorithm); every node in a level only
+    depends on nodes from earlier levels. Raises ValueError on cycles.
+    """
+    dependencies = build_dependencies(nodes, edges)
+    remaining = {node: set(deps) for node, deps in dependencies.items()}
+    levels = []
+
+    while remaining:
+        ready = [node for node, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Dependency graph has a cycle between: {sorted(remaining)}")
+        levels.append(ready)
+        for node in ready:
+            del remaining[node]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+    return levels
+
+
+async def run_dependency_graph(
+    nodes: List[str],
+    edges: List[Any],
+    runners: Dict[str, Callable[[], Awaitable[Any]]],
+    skip_on_failure: bool = False,
+    on_complete: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Run each node's runner as soon as all of its dependencies have finished.
+
+    Nodes without a runner are treated as no-ops so edges through them still
+    constrain ordering. Returns {node: {"status", "result", "error"}}.
+    If skip_on_failure is set, dependents of a failed node are skipped.
+    """
+    dependencies = build_dependencies(nodes, edges)
+    # Validate up front so a cycle fails fast instead of deadlocking
+    topological_levels(list(dependencies), edges)
+
+    outcomes: Dict[str, Dict[str, Any]] = {}
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run_node(node: str):
+        if dependencies[node]:
+            await asyncio.gather(*(tasks[dep] for dep in dependencies[node]))
+
+        failed = [dep for dep in dependencies[node] if outcomes[dep]["status"] != "completed"]
+        runner = runners.get(node)
+
+        if failed and skip_on_failure:
+            outcomes[node] = {"status": "skipped", "result": None, "error": f"upstream failed: {', '.join(failed)}"}
+        elif runner is None:
+            outcomes[node] = {"status": "completed", "result": None, "error": None}
+        else:
+            try:
+                result = await runner()
+                outcomes[node] = {"status": "completed", "result": result, "error": None}
+            except Exception as e:
+                logger.error(f"Stage {node} failed: {e}")
+                outcomes[node] = {"status": "failed", "result": None, "error": str(e)}
+
+        if on_complete:
+            on_complete(node, outcomes[node])
+
+    for node in dependencies:
+        tasks[node] = asyncio.ensure_future(run_node(node))
+
+    await asyncio.gather(*tasks.values())
+    return outcomes
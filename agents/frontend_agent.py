@@ -2,26 +2,29 @@
 Frontend Agent - Generates React components
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-from typing import List, Dict
-import os
-import redis
+from typing import Annotated, AsyncIterator, Dict, List, Optional
 import json
 import logging
+import os
 from datetime import datetime
 
+from generation_memo import GenerationMemo
+from instrumentation import instrument
+from ndjson import ndjson_response, wants_ndjson
+from offload import close_offload, get_offload
+from redis_store import close_redis, get_redis
+from task_queue import enable_queue_worker
+from wire import negotiate_encodings
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Frontend Agent")
-
-redis_client = redis.Redis(
-    host=os.getenv("REDIS_HOST", "localhost"),
-    port=6379,
-    password=os.getenv("REDIS_PASSWORD", ""),
-    decode_responses=True
-)
+negotiate_encodings(app)
+agent_metrics = instrument(app, "frontend")
 
 class FrontendTask(BaseModel):
     task_id: str
@@ -117,6 +120,23 @@ export const {component_name}: React.FC<{component_name}Props> = ({{ onSuccess }
 """
     return template
 
+# Bump whenever the component templates change so stale renders are not served
+GENERATOR_VERSION = "v1"
+
+component_memo = GenerationMemo(
+    generate_react_component,
+    version=GENERATOR_VERSION,
+    max_entries=int(os.getenv("GENERATION_MEMO_SIZE", "1024")),
+    redis_client=get_redis() if os.getenv("GENERATION_MEMO_REDIS", "0") == "1" else None,
+    namespace="genmemo:react",
+    offload=get_offload()
+)
+
+@app.on_event("shutdown")
+async def shutdown():
+    close_offload()
+    await close_redis()
+
 @app.get("/health")
 async def health():
     return {
@@ -125,22 +145,47 @@ async def health():
         "timestamp": datetime.utcnow().isoformat()
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return (
+        agent_metrics.render_metrics("agent")
+        + component_memo.render_metrics("frontend_generation_memo")
+        + get_offload().render_metrics("frontend_offload")
+    )
+
+# Components rendered per batch when streaming NDJSON
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "32"))
+
+async def iter_component_files(components: List[str], chunk_size: Optional[int] = None) -> AsyncIterator[Dict]:
+    """Component files in order, rendered chunk_size at a time (all at once by default)"""
+    chunk_size = chunk_size or len(components) or 1
+    for start in range(0, len(components), chunk_size):
+        chunk = components[start:start + chunk_size]
+        # Shared components (Navigation, ErrorBoundary, ...) render once per process
+        codes = await component_memo.render_many(chunk)
+        for component_name, code in zip(chunk, codes):
+            yield {
+                "file_path": f"src/components/{component_name}.tsx",
+                "content": code,
+                "language": "typescript",
+                "entity": component_name
+            }
+
 @app.post("/agents/frontend", response_model=FrontendResponse)
-async def generate_frontend(task: FrontendTask):
+async def generate_frontend(task: FrontendTask, accept: Annotated[Optional[str], Header()] = None):
     logger.info(f"Frontend generation for task: {task.task_id}")
+    agent_metrics.note_task(task.task_id)
+    
+    if wants_ndjson(accept):
+        return ndjson_response(
+            agent_metrics.count_files(iter_component_files(task.components, STREAM_CHUNK_SIZE)),
+            lambda count: {"status": "success", "task_id": task.task_id}
+        )
     
     try:
-        generated_files = []
-        
-        for component_name in task.components:
-            code = generate_react_component(component_name)
-            
-            generated_files.append({
-                "file_path": f"src/components/{component_name}.tsx",
-                "content": code,
-                "language": "typescript"
-            })
+        generated_files = [file async for file in iter_component_files(task.components)]
         
+        agent_metrics.record_files(generated_files)
         logger.info(f"Generated {len(generated_files)} components")
         
         return FrontendResponse(
@@ -153,6 +198,9 @@ async def generate_frontend(task: FrontendTask):
         logger.error(f"Frontend generation failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Optionally also take tasks from RabbitMQ (AGENT_QUEUE_CONSUMERS > 0)
+enable_queue_worker(app, "frontend")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
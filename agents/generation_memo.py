@@ -0,0 +1,163 @@
+"""
+Generation Memo - Bounded memo for the per-entity code generators
+Keys are the generator version plus the normalized input, so a component
+or endpoint that recurs across stories is rendered once per process
+"""
+
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationMemo:
+    """
+    Wraps a pure generator (input -> source text). normalize() reduces an
+    input to exactly the fields the generator reads; its JSON form, prefixed
+    with the version, is the key, and the generator is called with the
+    normalized input so equal keys always mean equal output.
+
+    Rendering is cheap compared to a network hop, so Redis is off by default
+    and only worth enabling when several replicas should share warm entries;
+    it is consulted once per request (MGET) for all in-process misses.
+    """
+
+    def __init__(
+        self,
+        generator: Callable[[Any], str],
+        version: str,
+        normalize: Optional[Callable[[Any], Any]] = None,
+        max_entries: int = 1024,
+        redis_client=None,
+        ttl_seconds: int = 86400,
+        namespace: str = "genmemo",
+        offload=None,
+    ):
+        self.generator = generator
+        self.version = version
+        self.normalize = normalize or (lambda value: value)
+        self.max_entries = max_entries
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        # Optional offload.GenerationOffload that renders misses off the event loop
+        self.offload = offload
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key_for(self, normalized: Any) -> str:
+        return json.dumps([self.version, normalized], sort_keys=True, separators=(",", ":"))
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{hashlib.sha256(key.encode('utf-8')).hexdigest()}"
+
+    def _lookup(self, key: str) -> Optional[str]:
+        code = self._entries.get(key)
+        if code is not None:
+            self._entries.move_to_end(key)
+            self.memory_hits += 1
+        return code
+
+    def _remember(self, key: str, code: str):
+        self._entries[key] = code
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def render(self, value: Any) -> str:
+        """In-process only; for synchronous callers"""
+        normalized = self.normalize(value)
+        key = self.key_for(normalized)
+        code = self._lookup(key)
+        if code is None:
+            self.misses += 1
+            code = self.generator(normalized)
+            self._remember(key, code)
+        return code
+
+    async def render_many(self, values: List[Any]) -> List[str]:
+        normalized = [self.normalize(value) for value in values]
+        keys = [self.key_for(value) for value in normalized]
+        results: List[Optional[str]] = [self._lookup(key) for key in keys]
+        missing = [index for index, code in enumerate(results) if code is None]
+
+        if missing and self.redis_client is not None:
+            missing_keys = list(dict.fromkeys(keys[index] for index in missing))
+            try:
+                stored = await self.redis_client.mget([self._redis_key(key) for key in missing_keys])
+            except Exception as e:
+                logger.warning(f"Generation memo Redis read failed: {e}")
+                stored = [None] * len(missing_keys)
+            found: Dict[str, str] = {}
+            for key, code in zip(missing_keys, stored):
+                if code is not None:
+                    self.redis_hits += 1
+                    self._remember(key, code)
+                    found[key] = code
+            for index in missing:
+                results[index] = found.get(keys[index])
+            missing = [index for index in missing if results[index] is None]
+
+        pending: Dict[str, Any] = {}
+        for index in missing:
+            pending.setdefault(keys[index], normalized[index])
+
+        rendered: Dict[str, str] = {}
+        if pending:
+            inputs = list(pending.values())
+            if self.offload is not None:
+                codes = await self.offload.map(self.generator, inputs)
+            else:
+                codes = [self.generator(value) for value in inputs]
+            rendered = dict(zip(pending, codes))
+            self.misses += len(rendered)
+            for key, code in rendered.items():
+                self._remember(key, code)
+        for index in missing:
+            results[index] = rendered[keys[index]]
+
+        if rendered and self.redis_client is not None:
+            try:
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    for key, code in rendered.items():
+                        pipe.setex(self._redis_key(key), self.ttl_seconds, code)
+                    await pipe.execute()
+            except Exception as e:
+                logger.warning(f"Generation memo Redis write failed: {e}")
+
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_hits": self.memory_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+        }
+
+    def render_metrics(self, prefix: str) -> str:
+        """Prometheus text exposition of the memo counters"""
+        lookups = self.memory_hits + self.redis_hits + self.misses
+        hit_ratio = (self.memory_hits + self.redis_hits) / lookups if lookups else 0.0
+        return "\n".join([
+            f"# TYPE {prefix}_hits_total counter",
+            f'{prefix}_hits_total{{tier="memory"}} {self.memory_hits}',
+            f'{prefix}_hits_total{{tier="redis"}} {self.redis_hits}',
+            f"# TYPE {prefix}_misses_total counter",
+            f"{prefix}_misses_total {self.misses}",
+            f"# TYPE {prefix}_evictions_total counter",
+            f"{prefix}_evictions_total {self.evictions}",
+            f"# TYPE {prefix}_entries gauge",
+            f"{prefix}_entries {len(self._entries)}",
+            f"# TYPE {prefix}_hit_ratio gauge",
+            f"{prefix}_hit_ratio {hit_ratio:.4f}",
+        ]) + "\n"
@@ -0,0 +1,269 @@
+"""
+Instrumentation - Request latency, in-flight, file and token metrics for the agents
+An ASGI middleware times every request until its last body chunk (streamed
+responses included) and the agent exposes the result on /metrics in the
+Prometheus text format. With AGENT_METRICS_DB=1 every agent task is also
+recorded as an agent_metrics row, written in COPY batches.
+"""
+
+import bisect
+import contextvars
+import logging
+import os
+import time
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple
+
+from fastapi import FastAPI
+from starlette.routing import Match
+
+from log_sink import BufferedCopySink
+
+logger = logging.getLogger(__name__)
+
+# Seconds; generation is milliseconds, planning waits seconds on the LLM
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+AGENT_METRICS_COLUMNS = [
+    "agent_name", "task_id", "execution_time_seconds", "tokens_used", "success", "error_message", "created_at"
+]
+
+# The request being handled, so handlers and LLM calls deep inside them can
+# attach a task id, token usage or an error to it
+_current_request: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar("current_request", default=None)
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts are per bucket and made cumulative when rendered"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> Iterable[str]:
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {self.sum:.6f}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+class AgentMetrics:
+    """Counters for one agent app; `sink` (optional) receives one row per task"""
+
+    def __init__(self, agent: str, sink: Optional[BufferedCopySink] = None):
+        self.agent = agent
+        self.sink = sink
+        # (method, route, status) -> latency histogram
+        self.latency: Dict[Tuple[str, str, int], Histogram] = {}
+        # (method, route) -> requests in progress
+        self.in_flight: Dict[Tuple[str, str], int] = {}
+        self.generated_files = 0
+        self.generated_bytes = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    # --- recorded by the middleware ---
+
+    def request_started(self, method: str, route: str) -> Dict:
+        key = (method, route)
+        self.in_flight[key] = self.in_flight.get(key, 0) + 1
+        return {"task_id": None, "tokens": 0, "error": None}
+
+    def request_finished(self, method: str, route: str, status: int, seconds: float, record: Dict):
+        key = (method, route)
+        self.in_flight[key] -= 1
+        histogram = self.latency.get((method, route, status))
+        if histogram is None:
+            histogram = self.latency[(method, route, status)] = Histogram()
+        histogram.observe(seconds)
+
+        if self.sink is not None and record["task_id"] is not None:
+            error = record["error"] or (f"HTTP {status}" if status >= 400 else None)
+            self.sink.submit((
+                self.agent,
+                record["task_id"],
+                seconds,
+                record["tokens"],
+                error is None,
+                error,
+                datetime.utcnow(),
+            ))
+
+    # --- recorded by the handlers ---
+
+    def note_task(self, task_id: str):
+        """Attribute the current request to an agent task (one agent_metrics row)"""
+        record = _current_request.get()
+        if record is not None:
+            record["task_id"] = task_id
+
+    def note_error(self, error: str):
+        record = _current_request.get()
+        if record is not None:
+            record["error"] = error
+
+    def record_files(self, files: Iterable[Dict]):
+        for file in files:
+            self.generated_files += 1
+            self.generated_bytes += len(file.get("content") or "")
+
+    async def count_files(self, files: AsyncIterator[Dict]) -> AsyncIterator[Dict]:
+        """Pass a streamed file iterator through, counting every file it yields"""
+        try:
+            async for file in files:
+                self.record_files((file,))
+                yield file
+        except Exception as e:
+            self.note_error(str(e))
+            raise
+
+    def record_llm_usage(self, usage):
+        """Token usage of an OpenAI response (usage may be None, e.g. when streaming)"""
+        if usage is None:
+            return
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        record = _current_request.get()
+        if record is not None:
+            record["tokens"] += prompt_tokens + completion_tokens
+
+    def render_metrics(self, prefix: str) -> str:
+        """Prometheus text exposition of the request, file and token metrics"""
+        agent = f'agent="{self.agent}"'
+        lines = [f"# TYPE {prefix}_request_duration_seconds histogram"]
+        for (method, route, status), histogram in sorted(self.latency.items()):
+            lines.extend(histogram.render(
+                f"{prefix}_request_duration_seconds",
+                f'{agent},method="{method}",route="{route}",status="{status}"'
+            ))
+        lines.append(f"# TYPE {prefix}_requests_in_flight gauge")
+        for (method, route), count in sorted(self.in_flight.items()):
+            lines.append(f'{prefix}_requests_in_flight{{{agent},method="{method}",route="{route}"}} {count}')
+        lines.extend([
+            f"# TYPE {prefix}_generated_files_total counter",
+            f"{prefix}_generated_files_total{{{agent}}} {self.generated_files}",
+            f"# TYPE {prefix}_generated_bytes_total counter",
+            f"{prefix}_generated_bytes_total{{{agent}}} {self.generated_bytes}",
+            f"# TYPE {prefix}_llm_tokens_total counter",
+            f'{prefix}_llm_tokens_total{{{agent},kind="prompt"}} {self.prompt_tokens}',
+            f'{prefix}_llm_tokens_total{{{agent},kind="completion"}} {self.completion_tokens}',
+        ])
+        text = "\n".join(lines) + "\n"
+        if self.sink is not None:
+            text += self.sink.render_metrics(f"{prefix}_metrics_sink")
+        return text
+
+
+class InstrumentationMiddleware:
+    """
+    Pure ASGI (no BaseHTTPMiddleware) so streamed responses pass through
+    untouched. Requests are labelled with the matching route's path
+    template; unmatched paths share one label to bound cardinality.
+    """
+
+    def __init__(self, app, agent_app: FastAPI, metrics: AgentMetrics):
+        self.app = app
+        self.routes = agent_app.routes
+        self.metrics = metrics
+
+    def _route(self, scope) -> str:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route(scope)
+        status = 500
+        start = time.perf_counter()
+        record = self.metrics.request_started(method, route)
+        token = _current_request.set(record)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            record["error"] = record["error"] or str(e)
+            raise
+        finally:
+            _current_request.reset(token)
+            self.metrics.request_finished(method, route, status, time.perf_counter() - start, record)
+
+
+# ============================================
+# SETUP
+# ============================================
+
+_metrics_pool = None
+
+
+async def _init_metrics_pool():
+    """Small asyncpg pool of its own, so agents without a database can write metrics"""
+    global _metrics_pool
+    if _metrics_pool is None:
+        import asyncpg
+        _metrics_pool = await asyncpg.create_pool(
+            host=os.getenv("POSTGRES_HOST", "localhost"),
+            port=5432,
+            database=os.getenv("POSTGRES_DB", "autodev_platform"),
+            user=os.getenv("POSTGRES_USER", "postgres"),
+            password=os.getenv("POSTGRES_PASSWORD", ""),
+            min_size=1,
+            max_size=2
+        )
+    return _metrics_pool
+
+
+async def _close_metrics_pool():
+    global _metrics_pool
+    if _metrics_pool is not None:
+        await _metrics_pool.close()
+        _metrics_pool = None
+
+
+def instrument(agent_app: FastAPI, agent: str) -> AgentMetrics:
+    """
+    Add the middleware to an agent app and return its metrics (render them
+    on the agent's /metrics). AGENT_METRICS_DB=1 also writes agent_metrics rows.
+    """
+    sink = None
+    if os.getenv("AGENT_METRICS_DB", "0") == "1":
+        sink = BufferedCopySink(
+            _init_metrics_pool,
+            "agent_metrics",
+            AGENT_METRICS_COLUMNS,
+            batch_size=int(os.getenv("AGENT_METRICS_BATCH_SIZE", "500")),
+            flush_interval=float(os.getenv("AGENT_METRICS_FLUSH_INTERVAL", "5.0")),
+            max_pending=int(os.getenv("AGENT_METRICS_MAX_PENDING", "10000"))
+        )
+        agent_app.router.on_startup.append(sink.start)
+        agent_app.router.on_shutdown.append(sink.stop)
+        agent_app.router.on_shutdown.append(_close_metrics_pool)
+
+    metrics = AgentMetrics(agent, sink)
+    agent_app.add_middleware(InstrumentationMiddleware, agent_app=agent_app, metrics=metrics)
+    agent_app.state.metrics = metrics
+    return metrics
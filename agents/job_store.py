@@ -0,0 +1,145 @@
+"""
+Job Store - Durable story jobs with per-stage checkpoints in PostgreSQL
+A job is keyed by story_id plus a hash of the story's content, so submitting
+the same story again finds the existing job. Every finished stage is
+checkpointed as an execution_logs row tagged with the job id, and resuming a
+job skips each stage that already has a completed checkpoint, including the
+planning (LLM) stage.
+"""
+
+import hashlib
+import json
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from wire import json_text, loads
+
+JOB_STATUSES = ("running", "completed", "failed")
+
+
+def story_content_hash(request) -> str:
+    """Canonical SHA-256 of a PlanningRequest's content; session ids are not part of it"""
+    content = {
+        "title": request.title.strip(),
+        "description": request.description.strip(),
+        "acceptance_criteria": [[c.priority, c.text.strip()] for c in request.acceptance_criteria],
+        "tech_hints": request.tech_hints.dict(),
+        "project_id": request.project_id,
+    }
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    """
+    Checkpoints are written synchronously (not through the batched log sink):
+    a stage only counts as done once its output is in the database.
+    Duplicate submissions that race each other share the job row but may
+    both run a stage; the later checkpoint wins.
+    """
+
+    def __init__(self, pool_factory: Callable[[], Awaitable]):
+        self.pool_factory = pool_factory
+
+    async def open_job(self, request) -> Dict[str, Any]:
+        """
+        The job for this story and content, created if new. Returns the job
+        with "checkpoints" ({stage: output} of completed stages) and
+        "created" (False when an earlier job is being resumed).
+        """
+        digest = story_content_hash(request)
+        pool = await self.pool_factory()
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(
+                """
+                INSERT INTO story_jobs (job_id, story_id, content_hash, status, request)
+                VALUES ($1, $2, $3, 'running', $4)
+                ON CONFLICT (story_id, content_hash)
+                DO UPDATE SET updated_at = NOW(),
+                    status = CASE WHEN story_jobs.status = 'completed' THEN 'completed' ELSE 'running' END
+                RETURNING job_id, story_id, content_hash, status, session_id, (xmax = 0) AS created
+                """,
+                uuid.uuid4().hex,
+                request.story_id,
+                digest,
+                json_text(request.dict())
+            )
+            checkpoints = await self._checkpoints(conn, row["job_id"])
+        job = dict(row)
+        job["checkpoints"] = checkpoints
+        return job
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The job row (with its stored request) and each stage's latest checkpoint status"""
+        pool = await self.pool_factory()
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(
+                """
+                SELECT job_id, story_id, content_hash, status, session_id, request, created_at, updated_at
+                FROM story_jobs WHERE job_id = $1
+                """,
+                job_id
+            )
+            if row is None:
+                return None
+            stages = await conn.fetch(
+                """
+                SELECT DISTINCT ON (agent_name) agent_name, status
+                FROM execution_logs WHERE job_id = $1
+                ORDER BY agent_name, id DESC
+                """,
+                job_id
+            )
+        job = dict(row)
+        job["request"] = loads(job["request"])
+        job["stages"] = {stage["agent_name"]: stage["status"] for stage in stages}
+        return job
+
+    async def _checkpoints(self, conn, job_id: str) -> Dict[str, Any]:
+        rows = await conn.fetch(
+            """
+            SELECT DISTINCT ON (agent_name) agent_name, status, output
+            FROM execution_logs WHERE job_id = $1
+            ORDER BY agent_name, id DESC
+            """,
+            job_id
+        )
+        return {row["agent_name"]: loads(row["output"]) for row in rows if row["status"] == "completed"}
+
+    async def checkpoint(self, job_id: str, story_id: str, stage: str, status: str, output: Optional[Dict]):
+        """Record a finished stage; the planning checkpoint also pins the job's session id"""
+        pool = await self.pool_factory()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    """
+                    INSERT INTO execution_logs (story_id, agent_name, status, output, job_id)
+                    VALUES ($1, $2, $3, $4, $5)
+                    """,
+                    story_id,
+                    stage,
+                    status,
+                    json_text(output),
+                    job_id
+                )
+                session_id = output.get("session_id") if stage == "planning" and output else None
+                await conn.execute(
+                    """
+                    UPDATE story_jobs
+                    SET updated_at = NOW(), session_id = COALESCE($2, session_id)
+                    WHERE job_id = $1
+                    """,
+                    job_id,
+                    session_id
+                )
+
+    async def finish(self, job_id: str, status: str):
+        if status not in JOB_STATUSES:
+            raise ValueError(f"Unknown job status {status!r}, expected one of {', '.join(JOB_STATUSES)}")
+        pool = await self.pool_factory()
+        async with pool.acquire() as conn:
+            await conn.execute(
+                "UPDATE story_jobs SET status = $2, updated_at = NOW() WHERE job_id = $1",
+                job_id,
+                status
+            )
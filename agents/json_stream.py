@@ -0,0 +1,117 @@
+"""
+Incremental JSON parsing for streamed LLM output
+Emits each top-level member of a JSON object as soon as its value is complete
+"""
+
+import json
+from typing import Any, List, Tuple
+
+
+class TopLevelSectionParser:
+    """
+    Feed text chunks as they arrive; feed() returns the (key, value) pairs
+    of the outer object that were completed by that chunk.
+
+    Anything before the first "{" (e.g. a ```json fence) and after the
+    closing "}" is ignored, so fenced LLM answers parse as-is.
+    """
+
+    def __init__(self):
+        self.state = "start"
+        self.done = False
+        self._key: List[str] = []
+        self._value: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        sections = []
+
+        for ch in chunk:
+            state = self.state
+
+            if state == "start":
+                if ch == "{":
+                    self.state = "key"
+
+            elif state == "key":
+                if ch == '"':
+                    self._key = []
+                    self._escape = False
+                    self.state = "key_string"
+                elif ch == "}":
+                    self._finish()
+
+            elif state == "key_string":
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self.state = "colon"
+                    continue
+                self._key.append(ch)
+
+            elif state == "colon":
+                if ch == ":":
+                    self.state = "value_start"
+
+            elif state == "value_start":
+                if ch.isspace():
+                    continue
+                self._value = [ch]
+                self._depth = 1 if ch in "{[" else 0
+                self._in_string = ch == '"'
+                self._escape = False
+                self.state = "value"
+
+            elif state == "value":
+                if self._in_string:
+                    self._value.append(ch)
+                    if self._escape:
+                        self._escape = False
+                    elif ch == "\\":
+                        self._escape = True
+                    elif ch == '"':
+                        self._in_string = False
+                        if self._depth == 0:
+                            sections.append(self._complete_value())
+                elif self._depth > 0:
+                    self._value.append(ch)
+                    if ch == '"':
+                        self._in_string = True
+                    elif ch in "{[":
+                        self._depth += 1
+                    elif ch in "}]":
+                        self._depth -= 1
+                        if self._depth == 0:
+                            sections.append(self._complete_value())
+                elif ch in ",}" or ch.isspace():
+                    # End of a bare scalar (number, true, false, null)
+                    sections.append(self._complete_value())
+                    if ch == ",":
+                        self.state = "key"
+                    elif ch == "}":
+                        self._finish()
+                else:
+                    self._value.append(ch)
+
+            elif state == "after_value":
+                if ch == ",":
+                    self.state = "key"
+                elif ch == "}":
+                    self._finish()
+
+        return sections
+
+    def _complete_value(self) -> Tuple[str, Any]:
+        key = json.loads('"' + "".join(self._key) + '"')
+        value = json.loads("".join(self._value))
+        self._value = []
+        self.state = "after_value"
+        return key, value
+
+    def _finish(self):
+        self.state = "done"
+        self.done = True
@@ -0,0 +1,319 @@
+"""
+LLM Stub - Offline OpenAI-compatible chat completions server
+Answers planning prompts with a deterministic architecture after a
+configurable latency and decode speed, and injects errors, rate limits,
+markdown fences and malformed JSON at configurable rates, so the real
+planning path can be load-tested without network access.
+
+Point the planning agent at it with OPENAI_BASE_URL=http://localhost:8010/v1
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import time
+import uuid
+from typing import Any, Dict, List
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+app = FastAPI(title="LLM Stub", version="1.0.0")
+
+ARCHITECTURE_SECTIONS = ("database", "backend", "frontend", "dependency_graph")
+
+# Rough size of a token, used for decode timing and max_tokens
+CHARS_PER_TOKEN = 4
+STREAM_CHUNK_TOKENS = 8
+
+
+class StubConfig(BaseModel):
+    # Time to first token: median and log-normal spread (0 = fixed)
+    latency_ms: float = float(os.getenv("LLM_STUB_LATENCY_MS", "800"))
+    latency_sigma: float = float(os.getenv("LLM_STUB_LATENCY_SIGMA", "0.5"))
+    # Decode speed after the first token (0 = instant)
+    tokens_per_second: float = float(os.getenv("LLM_STUB_TOKENS_PER_SECOND", "60"))
+    # Fractions of requests answered with 500, 429, broken JSON or a ```json fence
+    error_rate: float = float(os.getenv("LLM_STUB_ERROR_RATE", "0"))
+    rate_limit_rate: float = float(os.getenv("LLM_STUB_RATE_LIMIT_RATE", "0"))
+    malformed_rate: float = float(os.getenv("LLM_STUB_MALFORMED_RATE", "0"))
+    fence_rate: float = float(os.getenv("LLM_STUB_FENCE_RATE", "0"))
+    # The same seed and request sequence inject the same faults and delays
+    seed: int = int(os.getenv("LLM_STUB_SEED", "0"))
+
+
+# ============================================
+# ANSWERS
+# ============================================
+
+def _prompt_field(prompt: str, label: str, default: str) -> str:
+    match = re.search(rf"^-?\s*{re.escape(label)}:\s*(.+)$", prompt, re.MULTILINE)
+    return match.group(1).strip() if match else default
+
+
+def requested_sections(prompt: str) -> List[str]:
+    """The section a fan-out prompt asks for, else the whole architecture"""
+    match = re.search(r"Generate only the (\w+) section", prompt)
+    if match and match.group(1) in ARCHITECTURE_SECTIONS:
+        return [match.group(1)]
+    return list(ARCHITECTURE_SECTIONS)
+
+
+def stub_architecture(prompt: str) -> Dict[str, Any]:
+    """A small valid architecture derived from the story title and hints"""
+    title = _prompt_field(prompt, "Title", "item")
+    requires_auth = _prompt_field(prompt, "Authentication Required", "False") == "True"
+
+    resource = re.sub(r"[^a-z0-9]+", "_", title.lower()).strip("_")[:40] or "item"
+    component = "".join([word.capitalize() for word in resource.split("_")])
+
+    tables = [{
+        "name": f"{resource}_items",
+        "columns": [
+            {"name": "id", "type": "SERIAL", "constraints": "PRIMARY KEY"},
+            {"name": "title", "type": "VARCHAR(255)", "constraints": "NOT NULL"},
+            {"name": "status", "type": "VARCHAR(50)", "constraints": "DEFAULT 'active'"},
+            {"name": "data", "type": "JSONB", "constraints": None},
+            {"name": "created_at", "type": "TIMESTAMP", "constraints": "DEFAULT NOW()"},
+        ],
+    }]
+    relationships = []
+    if requires_auth:
+        tables.insert(0, {
+            "name": "users",
+            "columns": [
+                {"name": "id", "type": "SERIAL", "constraints": "PRIMARY KEY"},
+                {"name": "email", "type": "VARCHAR(255)", "constraints": "UNIQUE NOT NULL"},
+                {"name": "password_hash", "type": "VARCHAR(255)", "constraints": "NOT NULL"},
+                {"name": "created_at", "type": "TIMESTAMP", "constraints": "DEFAULT NOW()"},
+            ],
+        })
+        tables[1]["columns"].insert(1, {
+            "name": "user_id", "type": "INTEGER", "constraints": "REFERENCES users(id)"
+        })
+        relationships.append(f"users.id -> {resource}_items.user_id")
+
+    path = f"/api/{resource}"
+    return {
+        "database": {"tables": tables, "relationships": relationships},
+        "backend": {
+            "endpoints": [
+                {"path": path, "method": "GET", "auth_required": requires_auth, "description": f"List {title}"},
+                {"path": path, "method": "POST", "auth_required": requires_auth, "description": f"Create {title}"},
+                {"path": f"{path}/{{id}}", "method": "PUT", "auth_required": requires_auth, "description": f"Update {title}"},
+            ],
+            "middleware": ["auth", "validation", "logging"],
+        },
+        "frontend": {
+            "components": [f"{component}List", f"{component}Form", f"{component}Detail"],
+            "state_management": "zustand",
+            "routing": "react-router",
+        },
+        "dependency_graph": {
+            "nodes": ["database", "backend", "frontend", "testing"],
+            "edges": [
+                {"from_node": "database", "to": "backend"},
+                {"from_node": "backend", "to": "testing"},
+                {"from_node": "frontend", "to": "testing"},
+            ],
+        },
+    }
+
+
+def stub_answer(prompt: str) -> str:
+    architecture = stub_architecture(prompt)
+    return json.dumps({section: architecture[section] for section in requested_sections(prompt)}, indent=2)
+
+
+# ============================================
+# STUB
+# ============================================
+
+class LLMStub:
+    """Fault injection, timing and counters for the completions endpoint"""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.malformed = 0
+        self.fenced = 0
+        self.truncated = 0
+        self.completion_tokens = 0
+
+    def next_rng(self) -> random.Random:
+        self.requests += 1
+        return random.Random(f"{self.config.seed}:{self.requests}")
+
+    def first_token_delay(self, rng: random.Random) -> float:
+        median = self.config.latency_ms / 1000
+        if median <= 0:
+            return 0.0
+        if self.config.latency_sigma <= 0:
+            return median
+        return rng.lognormvariate(math.log(median), self.config.latency_sigma)
+
+    def decode_delay(self, tokens: int) -> float:
+        if self.config.tokens_per_second <= 0:
+            return 0.0
+        return tokens / self.config.tokens_per_second
+
+    def injected_error(self, rng: random.Random):
+        """An OpenAI-style error response for this request, or None"""
+        roll = rng.random()
+        if roll < self.config.error_rate:
+            self.errors += 1
+            return JSONResponse(
+                status_code=500,
+                content={"error": {"message": "Injected server error", "type": "server_error"}},
+            )
+        if roll < self.config.error_rate + self.config.rate_limit_rate:
+            self.rate_limited += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Injected rate limit", "type": "rate_limit_exceeded"}},
+            )
+        return None
+
+    def completion_text(self, prompt: str, max_tokens: int, rng: random.Random):
+        """(content, finish_reason, completion_tokens) for a prompt"""
+        content = stub_answer(prompt)
+
+        if rng.random() < self.config.malformed_rate:
+            self.malformed += 1
+            content = content[:rng.randint(1, len(content) - 1)]
+        if rng.random() < self.config.fence_rate:
+            self.fenced += 1
+            content = f"```json\n{content}\n```"
+
+        finish_reason = "stop"
+        if max_tokens and len(content) > max_tokens * CHARS_PER_TOKEN:
+            self.truncated += 1
+            content = content[:max_tokens * CHARS_PER_TOKEN]
+            finish_reason = "length"
+
+        tokens = max(1, math.ceil(len(content) / CHARS_PER_TOKEN))
+        self.completion_tokens += tokens
+        return content, finish_reason, tokens
+
+    def render_metrics(self, prefix: str) -> str:
+        """Prometheus text exposition of the stub counters"""
+        return "\n".join([
+            f"# TYPE {prefix}_requests_total counter",
+            f"{prefix}_requests_total {self.requests}",
+            f"# TYPE {prefix}_injected_total counter",
+            f'{prefix}_injected_total{{fault="error"}} {self.errors}',
+            f'{prefix}_injected_total{{fault="rate_limit"}} {self.rate_limited}',
+            f'{prefix}_injected_total{{fault="malformed"}} {self.malformed}',
+            f'{prefix}_injected_total{{fault="fence"}} {self.fenced}',
+            f"# TYPE {prefix}_truncated_total counter",
+            f"{prefix}_truncated_total {self.truncated}",
+            f"# TYPE {prefix}_completion_tokens_total counter",
+            f"{prefix}_completion_tokens_total {self.completion_tokens}",
+        ]) + "\n"
+
+
+stub = LLMStub(StubConfig())
+
+
+def _completion_id() -> str:
+    return f"chatcmpl-{uuid.uuid4().hex[:24]}"
+
+
+def _chunk(completion_id: str, model: str, created: int, delta: Dict, finish_reason=None) -> str:
+    return "data: " + json.dumps({
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }) + "\n\n"
+
+
+# ============================================
+# API ENDPOINTS
+# ============================================
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: Dict[str, Any]):
+    rng = stub.next_rng()
+    delay = stub.first_token_delay(rng)
+    error = stub.injected_error(rng)
+    if error is not None:
+        await asyncio.sleep(delay)
+        return error
+
+    prompt = "\n".join([str(message.get("content", "")) for message in body.get("messages", [])])
+    model = body.get("model", "stub")
+    content, finish_reason, tokens = stub.completion_text(prompt, body.get("max_tokens") or 0, rng)
+    completion_id = _completion_id()
+    created = int(time.time())
+
+    if body.get("stream"):
+        async def chunks():
+            await asyncio.sleep(delay)
+            yield _chunk(completion_id, model, created, {"role": "assistant", "content": ""})
+            step = STREAM_CHUNK_TOKENS * CHARS_PER_TOKEN
+            for start in range(0, len(content), step):
+                await asyncio.sleep(stub.decode_delay(STREAM_CHUNK_TOKENS))
+                yield _chunk(completion_id, model, created, {"content": content[start:start + step]})
+            yield _chunk(completion_id, model, created, {}, finish_reason)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    await asyncio.sleep(delay + stub.decode_delay(tokens))
+    prompt_tokens = math.ceil(len(prompt) / CHARS_PER_TOKEN)
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": finish_reason,
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": tokens,
+            "total_tokens": prompt_tokens + tokens,
+        },
+    }
+
+
+@app.get("/v1/models")
+async def list_models():
+    return {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "llm-stub"}]}
+
+
+@app.get("/stub/config")
+async def get_config():
+    return stub.config.dict()
+
+
+@app.post("/stub/config")
+async def update_config(updates: Dict[str, Any]):
+    """Change latency, throughput or fault rates without restarting"""
+    stub.config = StubConfig(**{**stub.config.dict(), **updates})
+    return stub.config.dict()
+
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy", "agent": "llm_stub"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return stub.render_metrics("llm_stub")
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("LLM_STUB_PORT", "8010")))
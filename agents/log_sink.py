@@ -0,0 +1,132 @@
+"""
+Log Sink - Buffered, batched row writer for asyncpg
+Rows are queued in memory and bulk-loaded with COPY by a background task,
+so request handlers never wait on the database to record an event
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedCopySink:
+    """
+    submit() is non-blocking. A background task flushes a batch as soon as
+    batch_size rows are pending or flush_interval seconds have passed since
+    the first pending row, whichever comes first. At most max_pending rows
+    are held; beyond that new rows are dropped (and counted) rather than
+    growing memory without bound while the database is slow or down.
+    """
+
+    def __init__(
+        self,
+        pool_factory: Callable[[], Awaitable],
+        table: str,
+        columns: Sequence[str],
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000,
+    ):
+        self.pool_factory = pool_factory
+        self.table = table
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Rows taken off the queue but not yet handed to a write, and the
+        # write in progress; stop() must not lose either
+        self._batch: List[tuple] = []
+        self._inflight: Optional[asyncio.Future] = None
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._task = asyncio.ensure_future(self._run())
+
+    def submit(self, row: tuple):
+        if self._queue is None:
+            self.start()
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"{self.table} sink full, dropped {self.dropped} rows so far")
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _fill_batch(self):
+        self._batch.append(await self._queue.get())
+        deadline = time.monotonic() + self.flush_interval
+
+        while len(self._batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                self._batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def _run(self):
+        while True:
+            await self._fill_batch()
+            batch, self._batch = self._batch, []
+            self._inflight = asyncio.ensure_future(self._write(batch))
+            # Shielded so stop() can cancel the loop without aborting a COPY
+            await asyncio.shield(self._inflight)
+
+    async def _write(self, batch: List[tuple]):
+        try:
+            pool = await self.pool_factory()
+            async with pool.acquire() as conn:
+                await conn.copy_records_to_table(self.table, records=batch, columns=self.columns)
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Failed to write {len(batch)} rows to {self.table}: {e}")
+
+    async def stop(self):
+        """Stop the background task and flush everything still queued"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        if self._inflight is not None and not self._inflight.done():
+            await self._inflight
+
+        remaining, self._batch = self._batch, []
+        while not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        for start in range(0, len(remaining), self.batch_size):
+            await self._write(remaining[start:start + self.batch_size])
+
+    def render_metrics(self, prefix: str) -> str:
+        """Prometheus text exposition of the sink counters"""
+        return "\n".join([
+            f"# TYPE {prefix}_rows_written_total counter",
+            f"{prefix}_rows_written_total {self.written}",
+            f"# TYPE {prefix}_rows_dropped_total counter",
+            f"{prefix}_rows_dropped_total {self.dropped}",
+            f"# TYPE {prefix}_rows_failed_total counter",
+            f"{prefix}_rows_failed_total {self.failed}",
+            f"# TYPE {prefix}_rows_pending gauge",
+            f"{prefix}_rows_pending {self.pending}",
+        ]) + "\n"
@@ -0,0 +1,155 @@
+"""
+Monolith - All five agents in one process
+Serves every agent app from a single ASGI app (mounted under /planning,
+/frontend, /backend, /database, /testing) and provides an in-process
+transport so the orchestrator can call the agent handlers directly
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI
+
+import backend_agent
+import database_agent
+import frontend_agent
+import planning_agent
+import testing_agent
+from agent_routes import call_route, json_routes
+
+logger = logging.getLogger(__name__)
+
+MONOLITH_PORT = int(os.getenv("MONOLITH_PORT", "8000"))
+# Where this app can reach itself, for the status hub's health checks
+MONOLITH_URL = os.getenv("MONOLITH_URL", f"http://localhost:{MONOLITH_PORT}").rstrip("/")
+
+AGENT_APPS: Dict[str, FastAPI] = {
+    "planning": planning_agent.app,
+    "frontend": frontend_agent.app,
+    "backend": backend_agent.app,
+    "database": database_agent.app,
+    "testing": testing_agent.app,
+}
+
+
+async def _run_handlers(handlers):
+    for handler in handlers:
+        result = handler()
+        if inspect.isawaitable(result):
+            await result
+
+
+async def start_agents():
+    """Run each agent's startup handlers (mounted apps get no lifespan events)"""
+    for agent_app in AGENT_APPS.values():
+        await _run_handlers(agent_app.router.on_startup)
+
+
+async def stop_agents():
+    for name, agent_app in reversed(list(AGENT_APPS.items())):
+        try:
+            await _run_handlers(agent_app.router.on_shutdown)
+        except Exception as e:
+            logger.warning(f"{name} agent shutdown failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_agents()
+    yield
+    await stop_agents()
+
+
+app = FastAPI(title="AutoDev Monolith", lifespan=lifespan)
+
+for _name, _agent_app in AGENT_APPS.items():
+    app.mount(f"/{_name}", _agent_app)
+
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "healthy",
+        "service": "monolith",
+        "agents": list(AGENT_APPS),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+# ============================================
+# IN-PROCESS TRANSPORT
+# ============================================
+
+class InProcessTransport:
+    """
+    Drop-in for AgentClient in the orchestrator: call() validates the
+    payload into the route's request model, awaits the handler on the
+    caller's event loop and returns the response model as a dict, with no
+    HTTP or JSON encoding in between.
+
+    Agent resources (database pool, Redis, log sink) are bound to the event
+    loop that started them, so one transport serves one loop; call aclose()
+    on that loop when done. Streaming routes cannot be called in-process.
+    """
+
+    def __init__(self):
+        self.routes = {
+            agent: json_routes(agent_app) for agent, agent_app in AGENT_APPS.items()
+        }
+        self._startup: Optional[asyncio.Future] = None
+
+    async def start(self):
+        # Concurrent first calls all wait for the same startup
+        if self._startup is None:
+            self._startup = asyncio.ensure_future(start_agents())
+        await asyncio.shield(self._startup)
+
+    async def call(self, agent: str, path: str, payload: Dict) -> Dict[str, Any]:
+        if agent not in self.routes:
+            raise ValueError(f"Unknown agent {agent}")
+        await self.start()
+        return await call_route(self.routes[agent], path, payload)
+
+    async def aclose(self):
+        if self._startup is not None:
+            self._startup = None
+            await stop_agents()
+
+
+
+class MountedTransport:
+    """
+    Direct handler calls for the planning agent's /pipeline/run when served
+    by this app: the lifespan has already started every agent, and their
+    shutdown is the lifespan's job too
+    """
+
+    def __init__(self):
+        self.routes = {
+            agent: json_routes(agent_app) for agent, agent_app in AGENT_APPS.items()
+        }
+
+    async def call(self, agent: str, path: str, payload: Dict) -> Dict[str, Any]:
+        return await call_route(self.routes[agent], path, payload)
+
+    async def aclose(self):
+        pass
+
+
+# The other agents are in this process; no HTTP hop between pipeline stages
+planning_agent.pipeline_transport = MountedTransport()
+
+# Nothing listens on ports 8001-8004 here; the hub checks the mounts instead
+planning_agent.status_hub.health_urls = {
+    agent: f"{MONOLITH_URL}/{agent}/health" for agent in planning_agent.status_hub.health_urls
+}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=MONOLITH_PORT)
@@ -0,0 +1,40 @@
+"""
+NDJSON - Opt-in streaming of generated files from the code agents
+A client sending "Accept: application/x-ndjson" gets one generated file per
+line as soon as it is rendered, then one summary line
+"""
+
+import json
+import logging
+from typing import AsyncIterator, Callable, Dict, Optional
+
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(accept: Optional[str]) -> bool:
+    return bool(accept) and NDJSON_MEDIA_TYPE in accept
+
+
+def ndjson_response(files: AsyncIterator[Dict], summary: Callable[[int], Dict]) -> StreamingResponse:
+    """
+    Each file line is a file object ({"file_path", "content", ...}). The
+    last line is summary(file_count): the agent's usual response without
+    the file list, or {"error": ...} if generation failed midway.
+    """
+    async def lines():
+        count = 0
+        try:
+            async for file in files:
+                count += 1
+                yield json.dumps(file) + "\n"
+        except Exception as e:
+            logger.error(f"Streamed generation failed after {count} files: {e}")
+            yield json.dumps({"error": str(e)}) + "\n"
+            return
+        yield json.dumps(summary(count)) + "\n"
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,150 @@
+"""
+Offload - Runs CPU-bound code generation off the event loop
+Small jobs go to a thread pool and large ones to a process pool, chosen
+by job size, so a big render never stalls /health or other requests
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _map_chunk(fn: Callable, items: List[Any]) -> List[Any]:
+    """Module-level so it can be pickled into process pool workers"""
+    return [fn(item) for item in items]
+
+
+class GenerationOffload:
+    """
+    size is the number of entities in a job (tables, components,
+    endpoints). Jobs of at least process_threshold entities run in the
+    process pool, split into one chunk per worker for map(); everything
+    else runs in the thread pool. Functions sent to the process pool must
+    be picklable, i.e. defined at module level.
+
+    Process workers pay for pickling the inputs and the generated source,
+    so the threshold should sit well above typical story sizes. If the
+    process pool breaks (e.g. a worker was killed) it is recreated and the
+    job is retried once in the thread pool.
+    """
+
+    def __init__(
+        self,
+        process_threshold: int = 1000,
+        process_workers: Optional[int] = None,
+        thread_workers: int = 4,
+    ):
+        self.process_threshold = process_threshold
+        self.process_workers = process_workers or os.cpu_count() or 2
+        self.thread_workers = thread_workers
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+        self.thread_jobs = 0
+        self.process_jobs = 0
+        self.process_failures = 0
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="generation")
+        return self._threads
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        if self._processes is None:
+            self._processes = ProcessPoolExecutor(max_workers=self.process_workers)
+        return self._processes
+
+    def _use_processes(self, size: int) -> bool:
+        return self.process_threshold > 0 and size >= self.process_threshold
+
+    async def _submit(self, pool: Executor, call: Callable) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(pool, call)
+
+    async def run(self, size: int, fn: Callable, *args) -> Any:
+        """fn(*args) in the pool matching the job size"""
+        call = partial(fn, *args)
+        if self._use_processes(size):
+            try:
+                result = await self._submit(self._process_pool(), call)
+                self.process_jobs += 1
+                return result
+            except BrokenProcessPool as e:
+                self._reset_process_pool(e)
+
+        result = await self._submit(self._thread_pool(), call)
+        self.thread_jobs += 1
+        return result
+
+    async def map(self, fn: Callable, items: List[Any]) -> List[Any]:
+        """[fn(item) for item in items], parallelised across processes when large"""
+        if not items:
+            return []
+
+        if self._use_processes(len(items)):
+            chunk_size = -(-len(items) // self.process_workers)
+            chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+            try:
+                pool = self._process_pool()
+                results = await asyncio.gather(*[
+                    self._submit(pool, partial(_map_chunk, fn, chunk)) for chunk in chunks
+                ])
+                self.process_jobs += 1
+                return [code for chunk in results for code in chunk]
+            except BrokenProcessPool as e:
+                self._reset_process_pool(e)
+
+        result = await self._submit(self._thread_pool(), partial(_map_chunk, fn, items))
+        self.thread_jobs += 1
+        return result
+
+    def _reset_process_pool(self, error: Exception):
+        self.process_failures += 1
+        logger.warning(f"Generation process pool broke ({error}), retrying in a thread")
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            self._processes = None
+
+    def shutdown(self):
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+            self._threads = None
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            self._processes = None
+
+    def render_metrics(self, prefix: str) -> str:
+        """Prometheus text exposition of the offload counters"""
+        return "\n".join([
+            f"# TYPE {prefix}_jobs_total counter",
+            f'{prefix}_jobs_total{{pool="thread"}} {self.thread_jobs}',
+            f'{prefix}_jobs_total{{pool="process"}} {self.process_jobs}',
+            f"# TYPE {prefix}_process_failures_total counter",
+            f"{prefix}_process_failures_total {self.process_failures}",
+        ]) + "\n"
+
+
+_offload: Optional[GenerationOffload] = None
+
+
+def get_offload() -> GenerationOffload:
+    """Process-wide offload shared by every agent loaded in this process"""
+    global _offload
+    if _offload is None:
+        _offload = GenerationOffload(
+            process_threshold=int(os.getenv("OFFLOAD_PROCESS_THRESHOLD", "1000")),
+            process_workers=int(os.getenv("OFFLOAD_PROCESS_WORKERS", "0")) or None,
+            thread_workers=int(os.getenv("OFFLOAD_THREAD_WORKERS", "4")),
+        )
+    return _offload
+
+
+def close_offload():
+    """Stop the worker pools; they are recreated if the offload is used again"""
+    if _offload is not None:
+        _offload.shutdown()
@@ -0,0 +1,146 @@
+"""
+Pipeline - Runs a planned story through the generator agents server-side
+The planning agent calls the database, backend, frontend and testing agents
+itself, scheduled from the architecture's dependency_graph, so a browser
+makes one request per story instead of chaining five cross-origin POSTs
+and shipping the architecture back and forth.
+"""
+
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from agent_urls import default_base_url
+from dependency_graph import run_dependency_graph, with_default_stages
+from wire import DecodedResponse, encode_request
+
+# httpx is only needed to call the generator agents (pip install httpx)
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+GENERATION_STAGES = ("database", "backend", "frontend", "testing")
+
+# stage -> (agent path, task id prefix)
+STAGE_ROUTES = {
+    "database": ("/agents/database", "db"),
+    "backend": ("/agents/backend", "backend"),
+    "frontend": ("/agents/frontend", "frontend"),
+    "testing": ("/agents/testing", "testing"),
+}
+
+
+def stage_request(stage: str, story_id: str, session_id: str, architecture: Dict) -> Tuple[str, Dict]:
+    """(path, payload) for one generation stage; each agent only gets its slice of the architecture"""
+    path, prefix = STAGE_ROUTES[stage]
+    payload = {"task_id": f"{prefix}_{story_id}", "story_id": story_id, "session_id": session_id}
+    if stage == "database":
+        payload["tables"] = architecture["database"]["tables"]
+    elif stage == "backend":
+        payload["endpoints"] = architecture["backend"]["endpoints"]
+    elif stage == "frontend":
+        payload["components"] = architecture["frontend"]["components"]
+    else:
+        payload["code_layers"] = ["database", "backend", "frontend"]
+    return path, payload
+
+
+def result_files(result: Dict) -> List[Dict]:
+    return result.get("generated_files") or result.get("test_files") or []
+
+
+def without_file_contents(result: Dict) -> Dict:
+    """A stage result with each file reduced to its path, language and size"""
+    summary = dict(result)
+    for key in ("generated_files", "test_files"):
+        if key in summary:
+            summary[key] = [
+                {"file_path": file["file_path"], "language": file.get("language"), "size": len(file.get("content") or "")}
+                for file in summary[key]
+            ]
+    return summary
+
+
+class AgentTransport:
+    """Pooled keep-alive HTTP calls from the planning agent to the generator agents"""
+
+    def __init__(self, pool_size: int = 64, timeout: float = 30.0):
+        self.base_urls = {stage: default_base_url(stage) for stage in GENERATION_STAGES}
+        self.pool_size = pool_size
+        self.timeout = timeout
+        # Agents that answered 415 to a compact body get plain JSON
+        self.json_agents = set()
+        self._client = None
+
+    def _session(self):
+        if self._client is None:
+            if not HTTPX_AVAILABLE:
+                raise RuntimeError("httpx is required to run the pipeline over HTTP (pip install httpx)")
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                timeout=httpx.Timeout(self.timeout, connect=3.0),
+            )
+        return self._client
+
+    async def call(self, agent: str, path: str, payload: Dict) -> Dict[str, Any]:
+        """msgpack (compressed when large) unless the agent answered 415 before"""
+        url = f"{self.base_urls[agent]}{path}"
+        body, headers = encode_request(payload, compact=agent not in self.json_agents)
+        response = await self._session().post(url, content=body, headers=headers)
+        if response.status_code == 415 and agent not in self.json_agents:
+            self.json_agents.add(agent)
+            return await self.call(agent, path, payload)
+        response.raise_for_status()
+        return DecodedResponse(response).json()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+async def run_pipeline(
+    story_id: str,
+    session_id: str,
+    architecture: Dict,
+    call: Callable[[str, str, Dict], Awaitable[Dict]],
+    on_stage: Optional[Callable[[str, str, Dict[str, Any]], None]] = None,
+    completed: Optional[Dict[str, Dict]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the generation stages from the architecture's dependency graph;
+    stages with no edge between them run concurrently and dependents of a
+    failed stage are skipped. on_stage(stage, status, outcome) is called
+    when a stage starts ("running") and when it finishes. Stages in
+    completed ({stage: result}, e.g. checkpoints of a resumed job) are not
+    called again; their stored result is reused, but they are still
+    reported as running and then completed.
+    Returns {stage: {"status", "result", "error"}} like run_dependency_graph.
+    """
+    graph = with_default_stages(architecture.get("dependency_graph"))
+
+    def runner(stage: str):
+        async def run():
+            # Resumed stages report "running" too, so status views see the new run start
+            if on_stage:
+                on_stage(stage, "running", {})
+            if completed and stage in completed:
+                return completed[stage]
+            path, payload = stage_request(stage, story_id, session_id, architecture)
+            return await call(stage, path, payload)
+        return run
+
+    def finished(stage: str, outcome: Dict[str, Any]):
+        if on_stage and stage in STAGE_ROUTES:
+            on_stage(stage, outcome["status"], outcome)
+
+    return await run_dependency_graph(
+        graph["nodes"],
+        graph["edges"],
+        {stage: runner(stage) for stage in GENERATION_STAGES},
+        skip_on_failure=True,
+        on_complete=finished,
+    )
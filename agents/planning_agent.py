@@ -2,17 +2,31 @@
 Planning Agent - Generates architecture blueprints from user stories
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 import os
 import json
-import redis
+import asyncio
 import asyncpg
 import logging
 from datetime import datetime
 
+from architecture_cache import ArchitectureCache
+from architecture_diff import diff_architectures
+from artifact_store import ArtifactStore
+from redis_store import close_redis, get_redis
+from resilience import Resilience
+from status_hub import StatusHub, _sse
+from instrumentation import instrument
+from job_store import JobStore
+from json_stream import TopLevelSectionParser
+from log_sink import BufferedCopySink
+from pipeline import GENERATION_STAGES, AgentTransport, result_files, run_pipeline, without_file_contents
+from wire import negotiate_encodings, json_text, pack_value, unpack_value
+
 # Direct OpenAI import instead of LangChain (Python 3.12 compatibility)
 try:
     from openai import AsyncOpenAI
@@ -26,6 +40,8 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Planning Agent", version="1.0.0")
+negotiate_encodings(app)
+agent_metrics = instrument(app, "planning")
 
 app.add_middleware(
     CORSMiddleware,
@@ -35,26 +51,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Redis client
-redis_client = redis.Redis(
-    host=os.getenv("REDIS_HOST", "localhost"),
-    port=6379,
-    password=os.getenv("REDIS_PASSWORD", ""),
-    decode_responses=True
-)
+# Initialize OpenAI client (only if an API key or an OpenAI-compatible
+# endpoint such as the offline llm_stub is configured)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+if OPENAI_API_KEY == "your-openai-key-here":
+    OPENAI_API_KEY = None
 
-# Initialize OpenAI client (only if API key is provided)
 openai_client = None
-if OPENAI_AVAILABLE and os.getenv("OPENAI_API_KEY") and os.getenv("OPENAI_API_KEY") != "your-openai-key-here":
+if OPENAI_AVAILABLE and (OPENAI_API_KEY or OPENAI_BASE_URL):
     try:
-        openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        logger.info("OpenAI client initialized successfully")
+        openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY or "offline", base_url=OPENAI_BASE_URL)
+        logger.info(f"OpenAI client initialized successfully ({OPENAI_BASE_URL or 'api.openai.com'})")
     except Exception as e:
         logger.warning(f"Failed to initialize OpenAI client: {e}")
         openai_client = None
 else:
     logger.info("No OpenAI API key provided, will use mock architecture generation")
 
+PLANNING_MODEL = "gpt-4-turbo-preview"
+
+# Answers from a non-default endpoint (e.g. the stub) are cached separately
+ARCHITECTURE_CACHE_MODEL = f"{PLANNING_MODEL}@{OPENAI_BASE_URL}" if OPENAI_BASE_URL else PLANNING_MODEL
+
+# "single": one completion for the whole architecture. "fanout": one smaller
+# completion per section, run concurrently (falls back to "single")
+PLANNING_MODE = os.getenv("PLANNING_MODE", "single")
+PLANNING_SECTION_MAX_TOKENS = int(os.getenv("PLANNING_SECTION_MAX_TOKENS", "1536"))
+
+# Bounds in-flight section requests across all planning requests
+planning_fanout_slots = asyncio.Semaphore(int(os.getenv("PLANNING_FANOUT_CONCURRENCY", "8")))
+
+# Identical stories are planned once; repeats are served from memory/Redis
+architecture_cache = ArchitectureCache(
+    redis_client=get_redis(binary=True),
+    max_entries=int(os.getenv("ARCHITECTURE_CACHE_SIZE", "256")),
+    ttl_seconds=int(os.getenv("ARCHITECTURE_CACHE_TTL", "86400"))
+)
+
 db_pool = None
 
 # ============================================
@@ -81,6 +115,8 @@ class PlanningRequest(BaseModel):
     acceptance_criteria: List[AcceptanceCriterion]
     tech_hints: TechHints
     project_id: str
+    # Re-planning: diff against this session's stored architecture
+    previous_session_id: Optional[str] = None
 
 class TableColumn(BaseModel):
     name: str
@@ -132,6 +168,44 @@ class PlanningResponse(BaseModel):
     session_id: str
     architecture: Architecture
     execution_time_seconds: float
+    # {layer: {"added", "changed", "removed", "unchanged"}} entity keys, when
+    # previous_session_id was given and its architecture is still stored
+    changes: Optional[Dict[str, Dict[str, List[str]]]] = None
+
+class GeneratedFile(BaseModel):
+    layer: str
+    file_path: str
+    content: str
+    language: Optional[str] = None
+
+class ArtifactBatch(BaseModel):
+    story_id: str
+    session_id: str
+    files: List[GeneratedFile]
+
+class JobCheckpoint(BaseModel):
+    job_id: str
+    story_id: str
+    stage: str
+    # completed or failed; only completed stages are skipped on resume
+    status: str
+    output: Optional[Dict[str, Any]] = None
+
+class JobFinish(BaseModel):
+    job_id: str
+    # running, completed or failed
+    status: str
+
+class JobResume(BaseModel):
+    job_id: str
+
+class StageUpdate(BaseModel):
+    story_id: str
+    stage: str
+    # pending, running, completed, failed or skipped
+    status: str
+    title: Optional[str] = None
+    detail: Optional[str] = None
 
 # ============================================
 # DATABASE
@@ -151,42 +225,119 @@ async def init_db():
         )
     return db_pool
 
+# Execution logs are written off the request path in COPY batches
+execution_log = BufferedCopySink(
+    init_db,
+    "execution_logs",
+    ["story_id", "agent_name", "status", "output", "created_at"],
+    batch_size=int(os.getenv("EXECUTION_LOG_BATCH_SIZE", "500")),
+    flush_interval=float(os.getenv("EXECUTION_LOG_FLUSH_INTERVAL", "1.0")),
+    max_pending=int(os.getenv("EXECUTION_LOG_MAX_PENDING", "10000"))
+)
+
 async def log_execution(story_id: str, agent_name: str, status: str, output: Dict):
-    pool = await init_db()
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO execution_logs 
-            (story_id, agent_name, status, output, created_at)
-            VALUES ($1, $2, $3, $4, NOW())
-            """,
-            story_id, agent_name, status, json.dumps(output)
-        )
+    """Queue an execution log row; it is timestamped now and written in the background"""
+    execution_log.submit((story_id, agent_name, status, json_text(output), datetime.utcnow()))
+
+artifact_store = ArtifactStore(init_db)
+
+# Durable /pipeline/run jobs, checkpointed stage by stage into execution_logs
+job_store = JobStore(init_db)
+
+# Agent health, story progress and throughput, pushed to dashboards over SSE
+status_hub = StatusHub(
+    self_agent="planning",
+    poll_interval=float(os.getenv("STATUS_POLL_INTERVAL", "10")),
+    throughput_window=float(os.getenv("STATUS_THROUGHPUT_WINDOW", "60")),
+    story_ttl=float(os.getenv("STATUS_STORY_TTL", "600"))
+)
+
+# Generator agents called by /pipeline/run (the monolith swaps in direct handler calls)
+pipeline_transport = AgentTransport(
+    pool_size=int(os.getenv("PIPELINE_POOL_SIZE", "64")),
+    timeout=float(os.getenv("PIPELINE_AGENT_TIMEOUT", "30"))
+)
+
+# Retries, circuit breakers and latency-based timeouts for those calls
+pipeline_resilience = Resilience(
+    default_timeout=float(os.getenv("PIPELINE_AGENT_TIMEOUT", "30")),
+    retries=int(os.getenv("PIPELINE_RETRIES", "2")),
+    hedge_agents=GENERATION_STAGES if os.getenv("PIPELINE_HEDGE", "0") == "1" else ()
+)
 
 # ============================================
 # ARCHITECTURE GENERATION
 # ============================================
 
-async def generate_real_architecture(request: PlanningRequest) -> Architecture:
-    """
-    Generate architecture using real OpenAI API (direct, no LangChain)
-    """
-    
-    logger.info(f"Generating real architecture with OpenAI for: {request.title}")
+# Top-level Architecture sections, in the order the prompt asks for them
+ARCHITECTURE_SECTIONS = {
+    "database": DatabaseSchema,
+    "backend": BackendArchitecture,
+    "frontend": FrontendArchitecture,
+    "dependency_graph": DependencyGraph,
+}
+
+# Per section: the output requirement and the JSON shape the model must follow
+SECTION_PROMPTS = {
+    "database": (
+        "Database schema with proper normalization",
+        """{
+    "tables": [
+      {
+        "name": "table_name",
+        "columns": [
+          {"name": "id", "type": "SERIAL", "constraints": "PRIMARY KEY"},
+          {"name": "email", "type": "VARCHAR(255)", "constraints": "UNIQUE NOT NULL"}
+        ]
+      }
+    ],
+    "relationships": ["users.id -> sessions.user_id"]
+  }"""
+    ),
+    "backend": (
+        "RESTful API design with proper HTTP methods",
+        """{
+    "endpoints": [
+      {
+        "path": "/api/users",
+        "method": "POST",
+        "auth_required": true,
+        "description": "Create new user"
+      }
+    ],
+    "middleware": ["auth", "validation", "logging"]
+  }"""
+    ),
+    "frontend": (
+        "React component hierarchy",
+        """{
+    "components": ["LoginForm", "Dashboard"],
+    "state_management": "zustand",
+    "routing": "react-router"
+  }"""
+    ),
+    "dependency_graph": (
+        "Dependency graph for execution order (only add an edge where a layer consumes another layer's output)",
+        """{
+    "nodes": ["database", "backend", "frontend", "testing"],
+    "edges": [
+      {"from_node": "database", "to": "backend"},
+      {"from_node": "backend", "to": "testing"},
+      {"from_node": "frontend", "to": "testing"}
+    ]
+  }"""
+    ),
+}
+
+def build_system_prompt(sections) -> str:
+    """System prompt asking for the given architecture sections"""
     
-    # Build comprehensive prompt
-    criteria_text = "\n".join([
-        f"{i+1}. [{c.priority.upper()}] {c.text}"
-        for i, c in enumerate(request.acceptance_criteria)
-    ])
+    requirements = "\n".join([f"- {SECTION_PROMPTS[name][0]}" for name in sections])
     
-    system_prompt = """You are an expert software architect. Analyze user stories and generate comprehensive technical architecture blueprints.
+    return f"""You are an expert software architect. Analyze user stories and generate comprehensive technical architecture blueprints.
 
 **Output Requirements:**
-- Database schema with proper normalization
-- RESTful API design with proper HTTP methods
-- React component hierarchy
-- Dependency graph for execution order
+{requirements}
 
 **Quality Standards:**
 - Security-first design (JWT, input validation)
@@ -195,8 +346,16 @@ async def generate_real_architecture(request: PlanningRequest) -> Architecture:
 - WCAG 2.1 AA accessibility
 
 **CRITICAL: Output ONLY valid JSON. No markdown, no explanations.**"""
+
+def build_story_summary(request: PlanningRequest) -> str:
+    """The story part of the user prompt, shared by every planning prompt"""
+    
+    criteria_text = "\n".join([
+        f"{i+1}. [{c.priority.upper()}] {c.text}"
+        for i, c in enumerate(request.acceptance_criteria)
+    ])
     
-    user_prompt = f"""**User Story:**
+    return f"""**User Story:**
 Title: {request.title}
 Description: {request.description}
 
@@ -208,88 +367,160 @@ Description: {request.description}
 - Database Required: {request.tech_hints.requires_database}
 - API Required: {request.tech_hints.requires_api}
 - UI Required: {request.tech_hints.requires_ui}
-- Complexity: {request.tech_hints.complexity}
+- Complexity: {request.tech_hints.complexity}"""
+
+def _json_structure(sections) -> str:
+    body = ",\n".join([f'  "{name}": {SECTION_PROMPTS[name][1]}' for name in sections])
+    return f"{{\n{body}\n}}"
+
+def build_planning_prompts(request: PlanningRequest) -> Tuple[str, str]:
+    """Build the (system, user) prompts for a planning request"""
+    
+    user_prompt = f"""{build_story_summary(request)}
 
 Generate a complete architecture blueprint as JSON with this exact structure:
-{{
-  "database": {{
-    "tables": [
-      {{
-        "name": "table_name",
-        "columns": [
-          {{"name": "id", "type": "SERIAL", "constraints": "PRIMARY KEY"}},
-          {{"name": "email", "type": "VARCHAR(255)", "constraints": "UNIQUE NOT NULL"}}
-        ]
-      }}
-    ],
-    "relationships": ["users.id -> sessions.user_id"]
-  }},
-  "backend": {{
-    "endpoints": [
-      {{
-        "path": "/api/users",
-        "method": "POST",
-        "auth_required": true,
-        "description": "Create new user"
-      }}
-    ],
-    "middleware": ["auth", "validation", "logging"]
-  }},
-  "frontend": {{
-    "components": ["LoginForm", "Dashboard"],
-    "state_management": "zustand",
-    "routing": "react-router"
-  }},
-  "dependency_graph": {{
-    "nodes": ["database", "backend", "frontend", "testing"],
-    "edges": [
-      {{"from_node": "database", "to": "backend"}},
-      {{"from_node": "backend", "to": "frontend"}},
-      {{"from_node": "frontend", "to": "testing"}}
-    ]
-  }}
-}}"""
+{_json_structure(ARCHITECTURE_SECTIONS)}"""
+    
+    return build_system_prompt(ARCHITECTURE_SECTIONS), user_prompt
+
+def build_section_prompts(story_summary: str, section: str) -> Tuple[str, str]:
+    """Build the (system, user) prompts asking for one architecture section"""
+    
+    user_prompt = f"""{story_summary}
+
+Generate only the {section} section of the architecture blueprint as JSON with this exact structure:
+{_json_structure([section])}"""
+    
+    return build_system_prompt([section]), user_prompt
+
+def parse_llm_json(content: str) -> Dict:
+    """Parse a JSON answer, tolerating a markdown code fence around it"""
+    
+    content = content.strip()
+    
+    # Remove markdown code blocks if present
+    if content.startswith("```"):
+        content = content.split("```")[1]
+        if content.startswith("json"):
+            content = content[4:]
+        content = content.strip()
     
     try:
+        return json.loads(content)
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse OpenAI JSON response: {e}")
+        logger.error(f"Response content: {content[:500]}")
+        raise
+
+async def generate_single_prompt_architecture(request: PlanningRequest) -> Architecture:
+    """One completion for the whole architecture"""
+    
+    system_prompt, user_prompt = build_planning_prompts(request)
+    
+    response = await openai_client.chat.completions.create(
+        model=PLANNING_MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        temperature=0.2,
+        max_tokens=4096
+    )
+    agent_metrics.record_llm_usage(response.usage)
+    
+    return Architecture(**parse_llm_json(response.choices[0].message.content))
+
+async def generate_section(story_summary: str, section: str) -> Tuple[str, BaseModel]:
+    """One smaller completion for a single architecture section"""
+    
+    system_prompt, user_prompt = build_section_prompts(story_summary, section)
+    
+    async with planning_fanout_slots:
         response = await openai_client.chat.completions.create(
-            model="gpt-4-turbo-preview",
+            model=PLANNING_MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
             temperature=0.2,
-            max_tokens=4096
+            max_tokens=PLANNING_SECTION_MAX_TOKENS
         )
-        
-        # Extract JSON from response
-        content = response.choices[0].message.content.strip()
-        
-        # Remove markdown code blocks if present
-        if content.startswith("```"):
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-            content = content.strip()
-        
-        # Parse JSON
-        architecture_data = json.loads(content)
-        architecture = Architecture(**architecture_data)
-        
-        logger.info(f"Successfully generated architecture with {len(architecture.database.tables)} tables")
-        return architecture
-        
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse OpenAI JSON response: {e}")
-        logger.error(f"Response content: {content[:500]}")
-        
-        # Fallback to mock if LLM fails
-        logger.warning("Falling back to mock architecture generation")
-        return generate_mock_architecture(request)
-        
+    agent_metrics.record_llm_usage(response.usage)
+    
+    data = parse_llm_json(response.choices[0].message.content)
+    # Asked for {"<section>": {...}}; accept the bare section too
+    if isinstance(data.get(section), dict):
+        data = data[section]
+    return section, ARCHITECTURE_SECTIONS[section](**data)
+
+async def iter_fanout_sections(request: PlanningRequest) -> AsyncIterator[Tuple[str, BaseModel]]:
+    """
+    Request every section concurrently and yield (section_name, section) in
+    completion order. The first failure cancels the other requests and is raised.
+    """
+    story_summary = build_story_summary(request)
+    tasks = [
+        asyncio.ensure_future(generate_section(story_summary, section))
+        for section in ARCHITECTURE_SECTIONS
+    ]
+    try:
+        for next_section in asyncio.as_completed(tasks):
+            yield await next_section
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def generate_fanout_architecture(request: PlanningRequest) -> Architecture:
+    sections = {name: section async for name, section in iter_fanout_sections(request)}
+    return Architecture(**sections)
+
+async def generate_real_architecture(request: PlanningRequest) -> Architecture:
+    """
+    Generate architecture using real OpenAI API (direct, no LangChain)
+    In fanout mode the sections are requested concurrently, with the single
+    prompt as fallback. Raises on API, parse or validation errors; see
+    plan_architecture for the mock fallback.
+    """
+    
+    logger.info(f"Generating real architecture with OpenAI ({PLANNING_MODE}) for: {request.title}")
+    
+    architecture = None
+    if PLANNING_MODE == "fanout":
+        try:
+            architecture = await generate_fanout_architecture(request)
+        except Exception as e:
+            logger.warning(f"Fan-out planning failed, retrying with the single prompt: {e}")
+    
+    if architecture is None:
+        architecture = await generate_single_prompt_architecture(request)
+    
+    logger.info(f"Successfully generated architecture with {len(architecture.database.tables)} tables")
+    return architecture
+
+async def plan_architecture(request: PlanningRequest) -> Tuple[Architecture, Optional[str]]:
+    """
+    Pick the generation path for a request: cache, real LLM, or mock.
+    Returns the architecture plus the cache key to store it under, which is
+    only set for fresh, validated LLM output (never for the mock fallback).
+    """
+    
+    if openai_client is None:
+        logger.warning("Using mock architecture (no OpenAI key)")
+        return generate_mock_architecture(request), None
+    
+    cache_key = ArchitectureCache.key_for(request, ARCHITECTURE_CACHE_MODEL)
+    cached = await architecture_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"Architecture cache hit for: {request.title}")
+        return Architecture(**unpack_value(cached)), None
+    
+    logger.info("Using real OpenAI API")
+    try:
+        return await generate_real_architecture(request), cache_key
     except Exception as e:
-        logger.error(f"OpenAI API call failed: {e}")
-        # Fallback to mock
-        return generate_mock_architecture(request)
+        logger.error(f"OpenAI architecture generation failed: {e}")
+        logger.warning("Falling back to mock architecture generation")
+        return generate_mock_architecture(request), None
 
 def generate_mock_architecture(request: PlanningRequest) -> Architecture:
     """
@@ -381,11 +612,12 @@ def generate_mock_architecture(request: PlanningRequest) -> Architecture:
         routing="react-router"
     )
     
-    # Dependency graph
+    # Dependency graph - only real data dependencies, so the orchestrator can
+    # generate the database and frontend layers concurrently
     nodes = ["database", "backend", "frontend", "testing"]
     edges = [
         DependencyEdge(from_node="database", to="backend"),
-        DependencyEdge(from_node="backend", to="frontend"),
+        DependencyEdge(from_node="backend", to="testing"),
         DependencyEdge(from_node="frontend", to="testing")
     ]
     
@@ -398,6 +630,293 @@ def generate_mock_architecture(request: PlanningRequest) -> Architecture:
         dependency_graph=dependency_graph
     )
 
+async def stream_real_architecture(request: PlanningRequest) -> AsyncIterator[Tuple[str, BaseModel]]:
+    """
+    Stream the completion and yield (section_name, section) as soon as each
+    top-level section of the JSON answer is complete and validated. In
+    fanout mode each section is its own request and arrives as it finishes.
+    Raises on API, parse or validation errors so callers can fall back.
+    """
+    
+    logger.info(f"Streaming real architecture with OpenAI ({PLANNING_MODE}) for: {request.title}")
+    
+    if PLANNING_MODE == "fanout":
+        async for name, section in iter_fanout_sections(request):
+            yield name, section
+        return
+    
+    system_prompt, user_prompt = build_planning_prompts(request)
+    
+    stream = await openai_client.chat.completions.create(
+        model=PLANNING_MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        temperature=0.2,
+        max_tokens=4096,
+        stream=True
+    )
+    
+    parser = TopLevelSectionParser()
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        for name, value in parser.feed(delta):
+            section_model = ARCHITECTURE_SECTIONS.get(name)
+            if section_model is not None:
+                yield name, section_model(**value)
+    
+    if not parser.done:
+        raise ValueError("Streamed architecture JSON ended before the closing brace")
+
+async def save_architecture(session_id: str, architecture: Architecture, cache_key: Optional[str] = None):
+    """Store the session's architecture (and a fresh cache entry) in one round trip"""
+    packed = pack_value(architecture.dict())
+    async with get_redis(binary=True).pipeline(transaction=False) as pipe:
+        pipe.setex(f"architecture:{session_id}", 3600, packed)
+        if cache_key is not None:
+            architecture_cache.queue_set(pipe, cache_key, packed)
+        await pipe.execute()
+
+async def diff_against_previous(request: PlanningRequest, architecture: Architecture) -> Optional[Dict]:
+    """Entity-level changes since the previous session, or None for a full build"""
+    if not request.previous_session_id:
+        return None
+    try:
+        previous = await get_redis(binary=True).get(f"architecture:{request.previous_session_id}")
+    except Exception as e:
+        logger.warning(f"Could not load previous architecture: {e}")
+        return None
+    if not previous:
+        logger.info(f"Previous architecture {request.previous_session_id} expired, planning in full")
+        return None
+    return diff_architectures(unpack_value(previous), architecture.dict())
+
+async def planning_events(request: PlanningRequest) -> AsyncIterator[str]:
+    """
+    Server-sent events for a planning request:
+      section  - {"name", "data"} for each finished top-level section
+      fallback - the LLM output was unusable; sections restart from the mock
+      complete - the full PlanningResponse
+      error    - planning failed
+    """
+    start_time = datetime.utcnow()
+    
+    try:
+        await log_execution(
+            request.story_id,
+            "planning_agent",
+            "started",
+            {"request": request.dict(), "streaming": True}
+        )
+        
+        emitted: Dict[str, BaseModel] = {}
+        architecture = None
+        fresh_cache_key = None
+        
+        if openai_client is not None:
+            cache_key = ArchitectureCache.key_for(request, ARCHITECTURE_CACHE_MODEL)
+            cached = await architecture_cache.get(cache_key)
+            if cached is not None:
+                architecture = Architecture(**unpack_value(cached))
+            else:
+                try:
+                    async for name, section in stream_real_architecture(request):
+                        emitted[name] = section
+                        yield _sse("section", {"name": name, "data": section.dict()})
+                    architecture = Architecture(**emitted)
+                    fresh_cache_key = cache_key
+                except Exception as e:
+                    logger.error(f"Streaming architecture failed: {e}")
+                    logger.warning("Falling back to mock architecture generation")
+                    yield _sse("fallback", {"reason": str(e)})
+                    emitted = {}
+        
+        if architecture is None:
+            architecture = generate_mock_architecture(request)
+        
+        # Cache hits and the mock are complete already; send what is left
+        for name in ARCHITECTURE_SECTIONS:
+            if name not in emitted:
+                yield _sse("section", {"name": name, "data": getattr(architecture, name).dict()})
+        
+        changes = await diff_against_previous(request, architecture)
+        await save_architecture(request.session_id, architecture, fresh_cache_key)
+        
+        execution_time = (datetime.utcnow() - start_time).total_seconds()
+        
+        await log_execution(
+            request.story_id,
+            "planning_agent",
+            "completed",
+            {"architecture": architecture.dict(), "streaming": True}
+        )
+        
+        logger.info(f"Streamed planning completed in {execution_time:.2f}s")
+        
+        yield _sse("complete", PlanningResponse(
+            status="success",
+            story_id=request.story_id,
+            session_id=request.session_id,
+            architecture=architecture,
+            execution_time_seconds=execution_time,
+            changes=changes
+        ).dict())
+        
+    except Exception as e:
+        logger.error(f"Streamed planning failed: {str(e)}")
+        agent_metrics.note_error(str(e))
+        try:
+            await log_execution(request.story_id, "planning_agent", "failed", {"error": str(e)})
+        except Exception:
+            pass
+        yield _sse("error", {"detail": str(e)})
+
+async def checkpoint_stage(job: Optional[Dict], story_id: str, stage: str, status: str, output: Optional[Dict]):
+    """Best effort: a lost checkpoint only means the stage runs again on resume"""
+    if job is None:
+        return
+    try:
+        await job_store.checkpoint(job["job_id"], story_id, stage, status, output)
+    except Exception as e:
+        logger.warning(f"Checkpoint of {stage} for job {job['job_id']} failed: {e}")
+
+async def finish_job(job: Optional[Dict], status: str):
+    if job is None:
+        return
+    try:
+        await job_store.finish(job["job_id"], status)
+    except Exception as e:
+        logger.warning(f"Could not mark job {job['job_id']} {status}: {e}")
+
+async def pipeline_events(request: PlanningRequest, include_files: bool, persist: bool) -> AsyncIterator[str]:
+    """
+    Server-sent events for a whole story run server-side:
+      job      - {"job_id", "created", "resumed_stages"}; absent without a database
+      stage    - {"stage", "status"} when a stage starts; finished stages add
+                 "result" (planning: the PlanningResponse) or "error", and
+                 "resumed" when the result came from a checkpoint
+      complete - {"status", "job_id", "story_id", "session_id", "stages", "execution_time_seconds", "artifacts"}
+      error    - planning or scheduling failed
+    
+    The run is a durable job keyed by story_id and content hash: every stage
+    is checkpointed, and submitting the same story again skips the stages
+    (planning included) that already completed.
+    """
+    start_time = datetime.utcnow()
+    story_id = request.story_id
+    
+    job = None
+    try:
+        job = await job_store.open_job(request)
+    except Exception as e:
+        logger.warning(f"Job store unavailable, running {story_id} without checkpoints: {e}")
+    checkpoints = job["checkpoints"] if job else {}
+    if job is not None:
+        yield _sse("job", {"job_id": job["job_id"], "created": job["created"], "resumed_stages": sorted(checkpoints)})
+    
+    # Reported as running even when resumed: the status hub starts a new run on "running"
+    status_hub.update_stage(story_id, "planning", "running", title=request.title)
+    yield _sse("stage", {"stage": "planning", "status": "running"})
+    if "planning" in checkpoints:
+        planning = PlanningResponse(**checkpoints["planning"])
+        status_hub.update_stage(story_id, "planning", "completed")
+    else:
+        try:
+            planning = await create_planning(request)
+        except HTTPException as e:
+            status_hub.update_stage(story_id, "planning", "failed", detail=str(e.detail))
+            await checkpoint_stage(job, story_id, "planning", "failed", {"error": e.detail})
+            await finish_job(job, "failed")
+            yield _sse("stage", {"stage": "planning", "status": "failed", "error": e.detail})
+            yield _sse("error", {"detail": e.detail})
+            return
+        await checkpoint_stage(job, story_id, "planning", "completed", planning.dict())
+        status_hub.update_stage(story_id, "planning", "completed")
+    yield _sse("stage", {
+        "stage": "planning", "status": "completed", "result": planning.dict(), "resumed": "planning" in checkpoints
+    })
+    
+    events: asyncio.Queue = asyncio.Queue()
+    
+    def on_stage(stage: str, status: str, outcome: Dict):
+        status_hub.update_stage(story_id, stage, status, detail=outcome.get("error"))
+        event = {"stage": stage, "status": status}
+        if outcome.get("error"):
+            event["error"] = outcome["error"]
+        if outcome.get("result") is not None:
+            event["result"] = outcome["result"] if include_files else without_file_contents(outcome["result"])
+            event["resumed"] = stage in checkpoints
+        events.put_nowait(_sse("stage", event))
+    
+    async def call(agent: str, path: str, payload: Dict) -> Dict:
+        try:
+            result = await pipeline_resilience.call(
+                agent, path, lambda timeout: pipeline_transport.call(agent, path, payload)
+            )
+        except Exception as e:
+            await checkpoint_stage(job, story_id, agent, "failed", {"error": str(e)})
+            raise
+        await checkpoint_stage(job, story_id, agent, "completed", result)
+        return result
+    
+    async def run():
+        try:
+            return await run_pipeline(
+                story_id, planning.session_id, planning.architecture.dict(), call, on_stage, completed=checkpoints
+            )
+        finally:
+            events.put_nowait(None)
+    
+    task = asyncio.ensure_future(run())
+    try:
+        # Stage events go out as the stages finish, in completion order
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield event
+        outcomes = await task
+    except ValueError as e:
+        logger.error(f"Pipeline scheduling failed: {str(e)}")
+        for stage in GENERATION_STAGES:
+            status_hub.update_stage(story_id, stage, "failed", detail=str(e))
+        await finish_job(job, "failed")
+        yield _sse("error", {"detail": str(e)})
+        return
+    finally:
+        task.cancel()
+    
+    # Files of resumed stages were stored by the run that produced them
+    artifacts = None
+    files = [
+        {"layer": stage, "file_path": file["file_path"], "content": file["content"], "language": file.get("language")}
+        for stage, outcome in outcomes.items() if stage not in checkpoints
+        for file in result_files(outcome["result"] or {})
+    ]
+    if persist and files:
+        try:
+            artifacts = await artifact_store.save(story_id, planning.session_id, files)
+        except Exception as e:
+            logger.error(f"Artifact persistence failed: {str(e)}")
+    
+    stages = {"planning": "completed", **{stage: outcome["status"] for stage, outcome in outcomes.items()}}
+    status = "success" if all(stage_status == "completed" for stage_status in stages.values()) else "failed"
+    await finish_job(job, "completed" if status == "success" else "failed")
+    yield _sse("complete", {
+        "status": status,
+        "job_id": job["job_id"] if job else None,
+        "story_id": story_id,
+        "session_id": planning.session_id,
+        "stages": stages,
+        "execution_time_seconds": (datetime.utcnow() - start_time).total_seconds(),
+        "artifacts": artifacts
+    })
+
 # ============================================
 # API ENDPOINTS
 # ============================================
@@ -411,12 +930,27 @@ async def startup():
     except Exception as e:
         logger.warning(f"Database connection failed (will retry on first request): {e}")
     
+    execution_log.start()
+    status_hub.start()
+    
     try:
-        redis_client.ping()
+        await get_redis().ping()
         logger.info("Redis connected")
     except Exception as e:
         logger.warning(f"Redis connection failed: {e}")
 
+@app.on_event("shutdown")
+async def shutdown():
+    global db_pool
+    await status_hub.stop()
+    await pipeline_transport.aclose()
+    # Flush queued execution logs before the pool goes away
+    await execution_log.stop()
+    if db_pool is not None:
+        await db_pool.close()
+        db_pool = None
+    await close_redis()
+
 @app.get("/health")
 async def health():
     return {
@@ -425,10 +959,21 @@ async def health():
         "timestamp": datetime.utcnow().isoformat()
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return (
+        agent_metrics.render_metrics("agent")
+        + architecture_cache.render_metrics()
+        + execution_log.render_metrics("planning_execution_log")
+        + status_hub.render_metrics("planning_status_hub")
+        + pipeline_resilience.render_metrics("planning_pipeline_resilience")
+    )
+
 @app.post("/agents/planning", response_model=PlanningResponse)
 async def create_planning(request: PlanningRequest):
     start_time = datetime.utcnow()
     logger.info(f"Planning request for story: {request.story_id}")
+    agent_metrics.note_task(request.session_id)
     
     try:
         # Log start
@@ -439,20 +984,15 @@ async def create_planning(request: PlanningRequest):
             {"request": request.dict()}
         )
         
-        # Use real LLM if available, otherwise use mock
-        if openai_client is not None:
-            logger.info("Using real OpenAI API")
-            architecture = await generate_real_architecture(request)
-        else:
-            logger.warning("Using mock architecture (no OpenAI key)")
-            architecture = generate_mock_architecture(request)
+        # Use real LLM (or its cache) if available, otherwise use mock
+        architecture, cache_key = await plan_architecture(request)
         
-        # Save to Redis
-        redis_client.setex(
-            f"architecture:{request.session_id}",
-            3600,
-            architecture.json()
-        )
+        # Entity-level diff against the previous session, read before saving
+        # in case a caller reuses the session id
+        changes = await diff_against_previous(request, architecture)
+        
+        # Save to Redis (session architecture + cache entry, pipelined)
+        await save_architecture(request.session_id, architecture, cache_key)
         
         execution_time = (datetime.utcnow() - start_time).total_seconds()
         
@@ -471,7 +1011,8 @@ async def create_planning(request: PlanningRequest):
             story_id=request.story_id,
             session_id=request.session_id,
             architecture=architecture,
-            execution_time_seconds=execution_time
+            execution_time_seconds=execution_time,
+            changes=changes
         )
         
     except Exception as e:
@@ -484,18 +1025,169 @@ async def create_planning(request: PlanningRequest):
         )
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/agents/planning/stream")
+async def stream_planning(request: PlanningRequest):
+    """Like /agents/planning, but emits each architecture section over SSE as it is ready"""
+    agent_metrics.note_task(request.session_id)
+    return StreamingResponse(
+        planning_events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/agents/planning/{session_id}")
 async def get_planning(session_id: str):
     try:
-        arch_json = redis_client.get(f"architecture:{session_id}")
-        if not arch_json:
+        packed = await get_redis(binary=True).get(f"architecture:{session_id}")
+        if not packed:
             raise HTTPException(status_code=404, detail="Architecture not found")
-        return json.loads(arch_json)
+        return unpack_value(packed)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/agents/artifacts")
+async def save_artifacts(batch: ArtifactBatch):
+    """Persist a story's generated files (bodies deduplicated by content hash)"""
+    try:
+        stats = await artifact_store.save(
+            batch.story_id,
+            batch.session_id,
+            [file.dict() for file in batch.files]
+        )
+        return {"status": "success", "story_id": batch.story_id, **stats}
+    except Exception as e:
+        logger.error(f"Artifact persistence failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/agents/artifacts/{story_id}")
+async def get_artifacts(
+    story_id: str,
+    after_id: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Stream one page of a story's files as NDJSON, one file per line.
+    The last line is {"next_after_id": ...} (null when there are no more pages).
+    """
+    async def lines():
+        last_id = None
+        count = 0
+        try:
+            async for file in artifact_store.iter_files(story_id, after_id, limit):
+                last_id = file["id"]
+                count += 1
+                yield json.dumps(file) + "\n"
+        except Exception as e:
+            logger.error(f"Artifact read failed: {str(e)}")
+            yield json.dumps({"error": str(e)}) + "\n"
+            return
+        yield json.dumps({"next_after_id": last_id if count == limit else None}) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/pipeline/run")
+async def run_story_pipeline(
+    request: PlanningRequest,
+    files: bool = Query(True, description="Include generated file contents in the stage results"),
+    persist: bool = Query(True, description="Store the generated files as artifacts")
+):
+    """
+    Plan a story and run every generation stage server-side, concurrently where
+    the dependency graph allows, streaming each stage's result over SSE
+    """
+    return StreamingResponse(
+        pipeline_events(request, files, persist),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/pipeline/resume")
+async def resume_story_pipeline(
+    resume: JobResume,
+    files: bool = Query(True, description="Include generated file contents in the stage results"),
+    persist: bool = Query(True, description="Store the generated files as artifacts")
+):
+    """Re-run a job's story from its stored request; completed stages are replayed from their checkpoints"""
+    try:
+        job = await job_store.get_job(resume.job_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(
+        pipeline_events(PlanningRequest(**job["request"]), files, persist),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/jobs")
+async def open_job(request: PlanningRequest):
+    """
+    The durable job for a story (keyed by story_id and content hash), created
+    if new, with the outputs of its completed stages under "checkpoints"
+    """
+    try:
+        return await job_store.open_job(request)
+    except Exception as e:
+        logger.error(f"Opening job failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/jobs/checkpoint")
+async def checkpoint_job(checkpoint: JobCheckpoint):
+    try:
+        await job_store.checkpoint(
+            checkpoint.job_id, checkpoint.story_id, checkpoint.stage, checkpoint.status, checkpoint.output
+        )
+        return {"status": "success", "job_id": checkpoint.job_id, "stage": checkpoint.stage}
+    except Exception as e:
+        logger.error(f"Checkpoint failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/jobs/finish")
+async def mark_job_finished(finish: JobFinish):
+    try:
+        await job_store.finish(finish.job_id, finish.status)
+        return {"status": "success", "job_id": finish.job_id, "job_status": finish.status}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """The job, its stored request and the latest checkpoint status of each stage"""
+    try:
+        job = await job_store.get_job(job_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/status")
+async def get_status():
+    """Current agent health, in-flight and recent stories, and throughput"""
+    return status_hub.snapshot()
+
+@app.get("/status/stream")
+async def stream_status():
+    """One SSE stream per dashboard; replaces polling /health on every agent"""
+    return StreamingResponse(
+        status_hub.subscribe(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/status/stories")
+async def report_stage(update: StageUpdate):
+    """Pipeline runners (orchestrator, dashboard) report each stage transition here"""
+    try:
+        return status_hub.update_stage(update.story_id, update.stage, update.status, update.title, update.detail)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,39 @@
+"""
+Redis Store - Shared async Redis client for the agents
+The pool is created on first use and connections are opened lazily,
+so importing an agent never touches the network
+"""
+
+import os
+from typing import Dict
+
+import redis.asyncio as aioredis
+
+# decode_responses -> client; packed (binary) values need undecoded bytes
+_clients: Dict[bool, aioredis.Redis] = {}
+
+
+def get_redis(binary: bool = False) -> aioredis.Redis:
+    """
+    Process-wide asyncio Redis client backed by a bounded connection pool.
+    Strings come back as str; binary=True returns bytes (for wire.pack_value).
+    """
+    client = _clients.get(binary)
+    if client is None:
+        pool = aioredis.ConnectionPool(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", "6379")),
+            password=os.getenv("REDIS_PASSWORD", "") or None,
+            decode_responses=not binary,
+            max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "50")),
+            socket_connect_timeout=2,
+        )
+        client = _clients[binary] = aioredis.Redis(connection_pool=pool)
+    return client
+
+
+async def close_redis():
+    for binary, client in list(_clients.items()):
+        await client.aclose()
+        await client.connection_pool.disconnect()
+        del _clients[binary]
@@ -0,0 +1,317 @@
+"""
+Resilience - Retries, circuit breakers, hedging and adaptive timeouts for agent calls
+Wraps any async "send one request" callable, so the orchestrator (HTTP,
+in-process or queue transports) and the planning agent's pipeline share the
+same policy. Timeout budgets follow each route's observed latency instead of
+a fixed 30 seconds.
+"""
+
+import asyncio
+import logging
+import math
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth another attempt; other 4xx mean the request itself is wrong
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """The agent failed repeatedly; calls fail fast until its breaker half-opens"""
+
+    def __init__(self, agent: str, retry_in: float):
+        super().__init__(f"{agent} agent circuit is open, next trial in {retry_in:.1f}s")
+        self.agent = agent
+        self.retry_in = retry_in
+
+
+def status_code_of(error: BaseException) -> Optional[int]:
+    """HTTP status of an error from requests, httpx, FastAPI or the task queue, if it has one"""
+    for source in (error, getattr(error, "response", None)):
+        code = getattr(source, "status_code", None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, connection failures, 429 and 5xx; never circuit-open errors"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    code = status_code_of(error)
+    if code is not None:
+        return code in RETRYABLE_STATUSES
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError, OSError)):
+        # requests' exceptions are OSErrors too
+        return True
+    # httpx transport errors (ConnectError, ReadTimeout, ...) are not OSErrors
+    return type(error).__module__.startswith("httpx") and "Status" not in type(error).__name__
+
+
+class LatencyWindow:
+    """The last `size` successful latencies of one route, for percentile-based budgets"""
+
+    def __init__(self, size: int = 256):
+        self.samples: Deque[float] = deque(maxlen=size)
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def percentile(self, quantile: float) -> float:
+        ordered = sorted(self.samples)
+        return ordered[max(0, math.ceil(quantile * len(ordered)) - 1)]
+
+
+class CircuitBreaker:
+    """
+    Closed until `threshold` consecutive failures, then open for
+    `reset_timeout` seconds; after that one trial call is let through
+    (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, agent: str, threshold: int = 5, reset_timeout: float = 30.0):
+        self.agent = agent
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.opens = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def check(self) -> bool:
+        """Raise CircuitOpenError unless a call may go out now; True if it is the half-open trial"""
+        state = self.state
+        if state == "closed":
+            return False
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        raise CircuitOpenError(self.agent, retry_in)
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def abandon_trial(self):
+        """A trial call was cancelled before it finished; the next call may try again"""
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.trial_in_flight or self.failures >= self.threshold:
+            if self.opened_at is None or self.trial_in_flight:
+                self.opens += 1
+                logger.warning(f"Circuit for {self.agent} agent opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+        self.trial_in_flight = False
+
+
+class Resilience:
+    """
+    call(agent, route, send) runs send(timeout) with:
+      - a timeout budget of timeout_multiplier x the route's p99 (timeout_quantile),
+        clamped to [min_timeout, the agent's max timeout]; the max until
+        min_samples successes have been seen
+      - up to `retries` extra attempts on retryable errors, after full-jitter
+        exponential backoff (uniform in [0, min(max_delay, base_delay * 2^n)])
+      - a per-agent circuit breaker
+      - for idempotent calls to agents in hedge_agents: a second, parallel
+        attempt once the first has run longer than the route's p95
+        (hedge_quantile); the first success wins and the other is cancelled
+    """
+
+    def __init__(
+        self,
+        max_timeouts: Optional[Dict[str, float]] = None,
+        default_timeout: float = 30.0,
+        retries: int = 2,
+        base_delay: float = 0.2,
+        max_delay: float = 5.0,
+        breaker_threshold: int = 5,
+        breaker_reset: float = 30.0,
+        hedge_agents: Iterable[str] = (),
+        hedge_quantile: float = 0.95,
+        timeout_quantile: float = 0.99,
+        timeout_multiplier: float = 3.0,
+        min_timeout: float = 1.0,
+        min_samples: int = 20,
+        seed: Optional[int] = None,
+    ):
+        self.max_timeouts = dict(max_timeouts or {})
+        self.default_timeout = default_timeout
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.hedge_agents = set(hedge_agents)
+        self.hedge_quantile = hedge_quantile
+        self.timeout_quantile = timeout_quantile
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self.min_samples = min_samples
+        self.rng = random.Random(seed)
+
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.latency: Dict[Tuple[str, str], LatencyWindow] = {}
+
+        self.calls = 0
+        self.retried = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    def breaker(self, agent: str) -> CircuitBreaker:
+        breaker = self.breakers.get(agent)
+        if breaker is None:
+            breaker = self.breakers[agent] = CircuitBreaker(agent, self.breaker_threshold, self.breaker_reset)
+        return breaker
+
+    def _window(self, agent: str, route: str) -> LatencyWindow:
+        window = self.latency.get((agent, route))
+        if window is None:
+            window = self.latency[(agent, route)] = LatencyWindow()
+        return window
+
+    def timeout_for(self, agent: str, route: str) -> float:
+        ceiling = self.max_timeouts.get(agent, self.default_timeout)
+        window = self._window(agent, route)
+        if len(window) < self.min_samples:
+            return ceiling
+        budget = window.percentile(self.timeout_quantile) * self.timeout_multiplier
+        return min(ceiling, max(self.min_timeout, budget))
+
+    def hedge_delay(self, agent: str, route: str) -> Optional[float]:
+        """Seconds before a hedge is sent, or None while there is too little history"""
+        window = self._window(agent, route)
+        if agent not in self.hedge_agents or len(window) < self.min_samples:
+            return None
+        return window.percentile(self.hedge_quantile)
+
+    def backoff(self, attempt: int) -> float:
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def _timed(self, agent: str, route: str, send: Callable[[float], Awaitable[Any]], timeout: float):
+        start = time.perf_counter()
+        result = await asyncio.wait_for(send(timeout), timeout)
+        self._window(agent, route).observe(time.perf_counter() - start)
+        return result
+
+    async def _attempt(self, agent: str, route: str, send: Callable[[float], Awaitable[Any]], hedge: bool):
+        timeout = self.timeout_for(agent, route)
+        delay = self.hedge_delay(agent, route) if hedge else None
+        primary = asyncio.ensure_future(self._timed(agent, route, send, timeout))
+        if delay is None or delay >= timeout:
+            return await primary
+
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.hedged += 1
+                tasks.add(asyncio.ensure_future(self._timed(agent, route, send, timeout - delay)))
+            error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def call(
+        self,
+        agent: str,
+        route: str,
+        send: Callable[[float], Awaitable[Any]],
+        idempotent: bool = True,
+        hedge: bool = True,
+    ) -> Any:
+        """
+        send(timeout) makes one request and returns its result. Non-idempotent
+        calls are never retried or hedged, only timed and circuit-broken;
+        hedge=False keeps the retries but never runs two attempts at once.
+        """
+        self.calls += 1
+        breaker = self.breaker(agent)
+        attempts = 1 + (self.retries if idempotent else 0)
+
+        for attempt in range(attempts):
+            try:
+                trial = breaker.check()
+            except CircuitOpenError:
+                self.rejected += 1
+                raise
+            try:
+                result = await self._attempt(agent, route, send, idempotent and hedge)
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                if not is_retryable(e):
+                    # The agent answered; a bad request says nothing about its health
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                if attempt + 1 >= attempts:
+                    raise
+                self.retried += 1
+                delay = self.backoff(attempt)
+                logger.warning(f"{agent} {route} failed ({type(e).__name__}: {e}), retry {attempt + 1} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled (hedge loser, client gone): no verdict on the agent
+                if trial:
+                    breaker.abandon_trial()
+                raise
+            breaker.record_success()
+            return result
+
+    def render_metrics(self, prefix: str) -> str:
+        """Prometheus text exposition of retries, hedges, breakers and timeout budgets"""
+        lines = [
+            f"# TYPE {prefix}_calls_total counter",
+            f"{prefix}_calls_total {self.calls}",
+            f"# TYPE {prefix}_retries_total counter",
+            f"{prefix}_retries_total {self.retried}",
+            f"# TYPE {prefix}_hedges_total counter",
+            f"{prefix}_hedges_total {self.hedged}",
+            f"# TYPE {prefix}_hedge_wins_total counter",
+            f"{prefix}_hedge_wins_total {self.hedge_wins}",
+            f"# TYPE {prefix}_timeouts_total counter",
+            f"{prefix}_timeouts_total {self.timeouts}",
+            f"# TYPE {prefix}_rejected_total counter",
+            f"{prefix}_rejected_total {self.rejected}",
+            f"# TYPE {prefix}_circuit_open gauge",
+        ]
+        for agent, breaker in sorted(self.breakers.items()):
+            lines.append(f'{prefix}_circuit_open{{agent="{agent}"}} {0 if breaker.state == "closed" else 1}')
+        lines.append(f"# TYPE {prefix}_timeout_budget_seconds gauge")
+        for agent, route in sorted(self.latency):
+            lines.append(
+                f'{prefix}_timeout_budget_seconds{{agent="{agent}",route="{route}"}} {self.timeout_for(agent, route):.3f}'
+            )
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,308 @@
+"""
+Status Hub - Server-side agent health, story progress and throughput for the dashboard
+One background task polls every agent's /health for all viewers, pipeline
+runners report stage transitions, and each viewer holds a single SSE
+stream instead of polling five ports from the browser.
+
+Events on the stream:
+  snapshot   - the full state, sent on connect (and to resync a slow viewer)
+  health     - {agent: {"status", "latency_ms", "checked_at"}} when any agent changes
+  story      - one story's stages after every transition
+  throughput - completions in the last window, sent every poll
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, Deque, Dict, Optional, Set, Tuple
+
+from agent_urls import AGENT_PORTS, default_base_url
+
+# httpx is only needed to poll the other agents (pip install httpx)
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+STORY_STAGES = ("planning", "database", "backend", "frontend", "testing")
+STAGE_STATUSES = ("pending", "running", "completed", "failed", "skipped")
+FINISHED_STATUSES = ("completed", "failed", "skipped")
+
+
+def _sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class StatusHub:
+    """
+    In-memory state of one process (run the planning agent with a single
+    worker). Health is only polled while at least one viewer is connected.
+    Stories that stop reporting for story_ttl seconds are dropped.
+    """
+
+    def __init__(
+        self,
+        self_agent: Optional[str] = None,
+        poll_interval: float = 10.0,
+        health_timeout: float = 2.0,
+        throughput_window: float = 60.0,
+        story_ttl: float = 600.0,
+        recent_stories: int = 20,
+        subscriber_buffer: int = 100,
+        keepalive: float = 15.0,
+    ):
+        # The agent serving the hub is healthy if it can answer; not polled
+        self.self_agent = self_agent
+        self.health_urls = {agent: f"{default_base_url(agent)}/health" for agent in AGENT_PORTS if agent != self_agent}
+        self.poll_interval = poll_interval
+        self.health_timeout = health_timeout
+        self.throughput_window = throughput_window
+        self.story_ttl = story_ttl
+        self.subscriber_buffer = subscriber_buffer
+        self.keepalive = keepalive
+
+        self.health: Dict[str, Dict] = {
+            agent: {"status": "unknown", "latency_ms": None, "checked_at": None} for agent in AGENT_PORTS
+        }
+        # story_id -> {"story_id", "title", "status", "stages", "started_at", "updated_at"}
+        self.stories: Dict[str, Dict] = {}
+        self.recent: Deque[Dict] = deque(maxlen=recent_stories)
+        # (monotonic time, name, status) of finished stories and stages
+        self._finished_stories: Deque[Tuple[float, str]] = deque()
+        self._finished_stages: Deque[Tuple[float, str, str]] = deque()
+
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._client = None
+
+        self.polls = 0
+        self.events_sent = 0
+        self.resyncs = 0
+
+    # --- lifecycle ---
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            if HTTPX_AVAILABLE:
+                self._client = httpx.AsyncClient(timeout=self.health_timeout)
+            else:
+                logger.warning("httpx not installed, the status hub cannot poll agent health")
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _run(self):
+        while True:
+            if not self._subscribers:
+                # Nobody is watching; sleep until a viewer connects
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            try:
+                await self.poll_health()
+                self._expire_stories()
+                self.publish("throughput", self.throughput())
+            except Exception as e:
+                logger.error(f"Status poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    # --- health ---
+
+    async def _check(self, agent: str, url: str) -> Dict:
+        start = time.perf_counter()
+        try:
+            response = await self._client.get(url)
+            healthy = response.status_code == 200 and response.json().get("status") == "healthy"
+            status = "healthy" if healthy else "unhealthy"
+        except Exception:
+            status = "offline"
+        latency_ms = round((time.perf_counter() - start) * 1000, 1)
+        return {"status": status, "latency_ms": latency_ms if status != "offline" else None}
+
+    async def poll_health(self):
+        """Check every agent concurrently and publish the health table if anything changed"""
+        self.polls += 1
+        checked_at = datetime.utcnow().isoformat()
+        results: Dict[str, Dict] = {}
+        if self.self_agent is not None:
+            results[self.self_agent] = {"status": "healthy", "latency_ms": 0.0}
+        if self._client is not None:
+            agents = list(self.health_urls)
+            checks = await asyncio.gather(*(self._check(agent, self.health_urls[agent]) for agent in agents))
+            results.update(zip(agents, checks))
+
+        changed = any(self.health[agent]["status"] != result["status"] for agent, result in results.items())
+        for agent, result in results.items():
+            self.health[agent] = {**result, "checked_at": checked_at}
+        if changed:
+            self.publish("health", self.health)
+
+    # --- stories ---
+
+    def update_stage(
+        self,
+        story_id: str,
+        stage: str,
+        status: str,
+        title: Optional[str] = None,
+        detail: Optional[str] = None,
+    ) -> Dict:
+        """Record a stage transition reported by a pipeline runner and publish the story"""
+        if status not in STAGE_STATUSES:
+            raise ValueError(f"Unknown stage status {status!r}, expected one of {', '.join(STAGE_STATUSES)}")
+
+        now = datetime.utcnow().isoformat()
+        story = self.stories.get(story_id)
+        if story is None:
+            finished = next((entry for entry in self.recent if entry["story_id"] == story_id), None)
+            if finished is not None and status != "running":
+                # Late report for a finished story (e.g. stages skipped after a failed plan);
+                # a re-run of the story starts with a running stage instead
+                finished["stages"][stage] = {"status": status, "detail": detail}
+                return finished
+            story = self.stories[story_id] = {
+                "story_id": story_id,
+                "title": title,
+                "status": "running",
+                "stages": {name: {"status": "pending", "detail": None} for name in STORY_STAGES},
+                "started_at": now,
+                "updated_at": now,
+                "_touched": time.monotonic(),
+            }
+        if title:
+            story["title"] = title
+        story["stages"][stage] = {"status": status, "detail": detail}
+        story["updated_at"] = now
+        story["_touched"] = time.monotonic()
+
+        if status in FINISHED_STATUSES:
+            self._finished_stages.append((time.monotonic(), stage, status))
+
+        stages = story["stages"]
+        # Nothing runs after a failed plan; otherwise every stage must finish
+        if stages["planning"]["status"] == "failed" or all(
+            stages[name]["status"] in FINISHED_STATUSES for name in stages
+        ):
+            self._finish(story)
+
+        public = self._public(story)
+        self.publish("story", public)
+        return public
+
+    def _finish(self, story: Dict):
+        failed = any(stage["status"] == "failed" for stage in story["stages"].values())
+        story["status"] = "failed" if failed else "completed"
+        self.stories.pop(story["story_id"], None)
+        self.recent.appendleft(self._public(story))
+        self._finished_stories.append((time.monotonic(), story["status"]))
+
+    def _expire_stories(self):
+        cutoff = time.monotonic() - self.story_ttl
+        for story in [story for story in self.stories.values() if story["_touched"] < cutoff]:
+            story["status"] = "abandoned"
+            self.stories.pop(story["story_id"], None)
+            self.recent.appendleft(self._public(story))
+            self.publish("story", self._public(story))
+
+    @staticmethod
+    def _public(story: Dict) -> Dict:
+        return {key: value for key, value in story.items() if not key.startswith("_")}
+
+    # --- throughput ---
+
+    def throughput(self) -> Dict:
+        """Stories and stages finished in the last throughput_window seconds"""
+        cutoff = time.monotonic() - self.throughput_window
+        while self._finished_stories and self._finished_stories[0][0] < cutoff:
+            self._finished_stories.popleft()
+        while self._finished_stages and self._finished_stages[0][0] < cutoff:
+            self._finished_stages.popleft()
+
+        per_minute = 60.0 / self.throughput_window
+        completed = sum(1 for _, status in self._finished_stories if status == "completed")
+        stages: Dict[str, int] = {name: 0 for name in STORY_STAGES}
+        for _, stage, status in self._finished_stages:
+            if status == "completed":
+                stages[stage] = stages.get(stage, 0) + 1
+        return {
+            "window_seconds": self.throughput_window,
+            "stories_in_flight": len(self.stories),
+            "stories_completed": completed,
+            "stories_failed": len(self._finished_stories) - completed,
+            "stories_per_minute": round(len(self._finished_stories) * per_minute, 2),
+            "stages_per_minute": {stage: round(count * per_minute, 2) for stage, count in stages.items()},
+        }
+
+    # --- viewers ---
+
+    def snapshot(self) -> Dict:
+        return {
+            "health": self.health,
+            "stories": [self._public(story) for story in self.stories.values()],
+            "recent": list(self.recent),
+            "throughput": self.throughput(),
+        }
+
+    def publish(self, event: str, data: Dict):
+        """Queue an event for every viewer; a viewer that fell behind gets a fresh snapshot instead"""
+        if not self._subscribers:
+            return
+        message = _sse(event, data)
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self.resyncs += 1
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_sse("snapshot", self.snapshot()))
+        self.events_sent += len(self._subscribers)
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        """SSE text for one viewer: a snapshot, then events as they happen"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.subscriber_buffer)
+        self._subscribers.add(queue)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        try:
+            yield _sse("snapshot", self.snapshot())
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), self.keepalive)
+                except asyncio.TimeoutError:
+                    # Comment line; keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+        finally:
+            self._subscribers.discard(queue)
+
+    def render_metrics(self, prefix: str) -> str:
+        """Prometheus text exposition of the hub counters"""
+        return "\n".join([
+            f"# TYPE {prefix}_subscribers gauge",
+            f"{prefix}_subscribers {len(self._subscribers)}",
+            f"# TYPE {prefix}_stories_in_flight gauge",
+            f"{prefix}_stories_in_flight {len(self.stories)}",
+            f"# TYPE {prefix}_health_polls_total counter",
+            f"{prefix}_health_polls_total {self.polls}",
+            f"# TYPE {prefix}_events_sent_total counter",
+            f"{prefix}_events_sent_total {self.events_sent}",
+            f"# TYPE {prefix}_resyncs_total counter",
+            f"{prefix}_resyncs_total {self.resyncs}",
+        ]) + "\n"
@@ -0,0 +1,50 @@
+"""
+Template Engine - Precompiled code templates for the generator agents
+Each template is parsed once at import into static segments plus named
+slots and compiled into a single string-building expression, so rendering
+is one call with no intermediate concatenation
+"""
+
+from string import Formatter
+from typing import List, Tuple
+
+
+class CompiledTemplate:
+    """
+    Source uses str.format syntax: {name} is a slot, {{ and }} are literal
+    braces. Slot names must be identifiers; format specs and conversions are
+    not supported. Render with one keyword argument per slot:
+
+        REACT = CompiledTemplate("export const {name} = () => null;")
+        REACT.render(name="LoginForm")
+    """
+
+    def __init__(self, source: str):
+        segments: List[Tuple[str, bool]] = []
+
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if literal:
+                segments.append((literal, False))
+            if field is not None:
+                if spec or conversion or not field.isidentifier():
+                    raise ValueError(f"Unsupported template slot {{{field}}}")
+                segments.append((field, True))
+
+        self.source = source
+        self.slot_names = sorted({text for text, is_slot in segments if is_slot})
+        self._segments = segments
+        self.render = self._compile()
+
+    def _compile(self):
+        # Adjacent literals and f-strings compile to a single BUILD_STRING,
+        # the same code CPython emits for a hand-written f-string template
+        if not self._segments:
+            return lambda: ""
+        body = " ".join(
+            f"f'{{{text}}}'" if is_slot else repr(text)
+            for text, is_slot in self._segments
+        )
+        signature = ", ".join(["*"] + self.slot_names) if self.slot_names else ""
+        namespace: dict = {}
+        exec(f"def render({signature}):\n    return ({body})\n", namespace)
+        return namespace["render"]
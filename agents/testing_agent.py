@@ -2,16 +2,25 @@
 Testing Agent - Generates and runs tests
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import Annotated, Dict, Iterator, List, Optional
 import logging
 from datetime import datetime
 
+from instrumentation import instrument
+from ndjson import ndjson_response, wants_ndjson
+from task_queue import enable_queue_worker
+from template_engine import CompiledTemplate
+from wire import negotiate_encodings
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Testing Agent")
+negotiate_encodings(app)
+agent_metrics = instrument(app, "testing")
 
 class TestingTask(BaseModel):
     task_id: str
@@ -27,34 +36,35 @@ class TestingResponse(BaseModel):
     total_tests: int
     test_files: List[Dict[str, str]]
 
-def generate_pytest_tests(component_name: str) -> str:
-    """Generate pytest test file"""
-    
-    template = f"""import pytest
+PYTEST_TEMPLATE = CompiledTemplate("""import pytest
 from fastapi.testclient import TestClient
 from app.main import app
 
 client = TestClient(app)
 
-def test_{component_name.lower()}_get():
+def test_{name}_get():
     '''Test GET endpoint'''
-    response = client.get("/api/{component_name.lower()}")
+    response = client.get("/api/{name}")
     assert response.status_code == 200
     assert isinstance(response.json(), list)
 
-def test_{component_name.lower()}_post():
+def test_{name}_post():
     '''Test POST endpoint'''
     data = {{"data": {{"test": "value"}}}}
-    response = client.post("/api/{component_name.lower()}", json=data)
+    response = client.post("/api/{name}", json=data)
     assert response.status_code == 201
     assert "id" in response.json()
 
-def test_{component_name.lower()}_invalid_data():
+def test_{name}_invalid_data():
     '''Test invalid data handling'''
-    response = client.post("/api/{component_name.lower()}", json={{}})
+    response = client.post("/api/{name}", json={{}})
     assert response.status_code == 422
-"""
-    return template
+""")
+
+def generate_pytest_tests(component_name: str) -> str:
+    """Generate pytest test file"""
+    
+    return PYTEST_TEMPLATE.render(name=component_name.lower())
 
 def generate_jest_tests(component_name: str) -> str:
     """Generate Jest test file"""
@@ -104,44 +114,57 @@ async def health():
         "timestamp": datetime.utcnow().isoformat()
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return agent_metrics.render_metrics("agent")
+
+def iter_test_files(code_layers: List[str]) -> Iterator[Dict]:
+    # Generate backend tests
+    if "backend" in code_layers:
+        yield {
+            "file_path": "tests/test_api.py",
+            "content": generate_pytest_tests("resource"),
+            "language": "python"
+        }
+    
+    # Generate frontend tests
+    if "frontend" in code_layers:
+        yield {
+            "file_path": "src/components/__tests__/Component.test.tsx",
+            "content": generate_jest_tests("Component"),
+            "language": "typescript"
+        }
+
+def test_results(task_id: str, file_count: int) -> Dict:
+    """Mock test results"""
+    return {
+        "status": "success",
+        "task_id": task_id,
+        "tests_passed": True,
+        "coverage": 87.5,
+        "total_tests": file_count * 3
+    }
+
 @app.post("/agents/testing", response_model=TestingResponse)
-async def generate_tests(task: TestingTask):
+async def generate_tests(task: TestingTask, accept: Annotated[Optional[str], Header()] = None):
     logger.info(f"Test generation for task: {task.task_id}")
+    agent_metrics.note_task(task.task_id)
     
-    try:
-        test_files = []
+    if wants_ndjson(accept):
+        async def files():
+            for file in iter_test_files(task.code_layers):
+                yield file
         
-        # Generate backend tests
-        if "backend" in task.code_layers:
-            pytest_code = generate_pytest_tests("resource")
-            test_files.append({
-                "file_path": "tests/test_api.py",
-                "content": pytest_code,
-                "language": "python"
-            })
-        
-        # Generate frontend tests
-        if "frontend" in task.code_layers:
-            jest_code = generate_jest_tests("Component")
-            test_files.append({
-                "file_path": "src/components/__tests__/Component.test.tsx",
-                "content": jest_code,
-                "language": "typescript"
-            })
-        
-        # Mock test results
-        tests_passed = True
-        coverage = 87.5
-        total_tests = len(test_files) * 3
+        return ndjson_response(agent_metrics.count_files(files()), lambda count: test_results(task.task_id, count))
+    
+    try:
+        test_files = list(iter_test_files(task.code_layers))
         
+        agent_metrics.record_files(test_files)
         logger.info(f"Generated {len(test_files)} test files")
         
         return TestingResponse(
-            status="success",
-            task_id=task.task_id,
-            tests_passed=tests_passed,
-            coverage=coverage,
-            total_tests=total_tests,
+            **test_results(task.task_id, len(test_files)),
             test_files=test_files
         )
         
@@ -149,6 +172,9 @@ async def generate_tests(task: TestingTask):
         logger.error(f"Test generation failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Optionally also take tasks from RabbitMQ (AGENT_QUEUE_CONSUMERS > 0)
+enable_queue_worker(app, "testing")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8004)
@@ -0,0 +1,403 @@
+"""
+Wire - Compact encodings for agent traffic, cached architectures and log payloads
+Agents negotiate msgpack bodies (Content-Type / Accept: application/msgpack)
+and zstd or gzip compression of large bodies (Content-Encoding /
+Accept-Encoding); anything else still gets plain JSON. Values stored in
+Redis or sent through the task queue are packed with a small header that
+names their encoding, so JSON written by older agents still reads back.
+"""
+
+import contextvars
+import gzip
+import json
+import os
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+# orjson, msgpack and zstandard are optional; without them bodies fall back
+# to the standard json module and gzip (pip install orjson msgpack zstandard)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+
+# Bodies and values smaller than this are not worth compressing
+COMPRESS_MIN_BYTES = int(os.getenv("WIRE_COMPRESS_MIN_BYTES", "1024"))
+ZSTD_LEVEL = int(os.getenv("WIRE_ZSTD_LEVEL", "3"))
+GZIP_LEVEL = int(os.getenv("WIRE_GZIP_LEVEL", "5"))
+# Largest body or value accepted, before and after decompression
+MAX_BODY_BYTES = int(os.getenv("WIRE_MAX_BODY_BYTES", str(64 * 1024 * 1024)))
+
+# Preferred first
+ENCODINGS = ("zstd", "gzip") if ZSTD_AVAILABLE else ("gzip",)
+
+# Header of a packed value: marker, format (m = msgpack, j = JSON), compression (z, g or -)
+_VALUE_MARKER = b"\x00"
+_VALUE_COMPRESSION = {"zstd": b"z", "gzip": b"g", None: b"-"}
+
+
+class UnsupportedEncoding(ValueError):
+    """A body in a content type or content encoding this process cannot decode"""
+
+
+class BodyTooLarge(ValueError):
+    """A body (or what it decompresses to) over the size limit"""
+
+    def __init__(self, limit: int):
+        super().__init__(f"Body exceeds {limit} bytes")
+        self.limit = limit
+
+
+# ============================================
+# JSON AND MSGPACK
+# ============================================
+
+def dumps(obj: Any) -> bytes:
+    """Compact JSON bytes (orjson when installed); unknown types become strings"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=str, separators=(",", ":")).encode("utf-8")
+
+
+def json_text(obj: Any) -> str:
+    """dumps() as a str, e.g. for a JSONB column"""
+    return dumps(obj).decode("utf-8")
+
+
+def loads(data) -> Any:
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+
+def preferred_format() -> str:
+    """AGENT_WIRE_FORMAT=json turns msgpack off for outgoing agent requests"""
+    if os.getenv("AGENT_WIRE_FORMAT", "msgpack").lower() == "json" or not MSGPACK_AVAILABLE:
+        return JSON
+    return MSGPACK
+
+
+def encode(obj: Any, content_type: str = JSON) -> bytes:
+    if content_type == MSGPACK:
+        return msgpack.packb(obj, default=str, use_bin_type=True)
+    return dumps(obj)
+
+
+def decode(data: bytes, content_type: Optional[str] = JSON) -> Any:
+    media_type = (content_type or JSON).split(";")[0].strip().lower()
+    if media_type == MSGPACK:
+        if not MSGPACK_AVAILABLE:
+            raise UnsupportedEncoding("msgpack body received but msgpack is not installed")
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    return loads(data)
+
+
+# ============================================
+# COMPRESSION
+# ============================================
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def decompress(data: bytes, encoding: Optional[str], limit: int = MAX_BODY_BYTES) -> bytes:
+    """
+    Undo a content encoding, raising BodyTooLarge as soon as the output
+    passes limit bytes; a small compressed body can expand to gigabytes
+    """
+    encoding = (encoding or "identity").strip().lower()
+    if encoding == "identity":
+        output = data
+    elif encoding == "gzip":
+        output = _gunzip(data, limit)
+    elif encoding == "zstd" and ZSTD_AVAILABLE:
+        output = _unzstd(data, limit)
+    else:
+        raise UnsupportedEncoding(f"Unsupported content encoding {encoding!r}")
+    if len(output) > limit:
+        raise BodyTooLarge(limit)
+    return output
+
+
+def _gunzip(data: bytes, limit: int) -> bytes:
+    chunks, size = [], 0
+    while data:
+        # One decompressor per gzip member, like gzip.decompress
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        chunk = decompressor.decompress(data, limit - size + 1)
+        size += len(chunk)
+        if size > limit:
+            raise BodyTooLarge(limit)
+        chunks.append(chunk)
+        if not decompressor.eof:
+            raise ValueError("Truncated gzip body")
+        data = decompressor.unused_data.lstrip(b"\x00")
+    return b"".join(chunks)
+
+
+def _unzstd(data: bytes, limit: int) -> bytes:
+    # Streamed frames may not record their size up front, so read in bounded steps
+    chunks, size = [], 0
+    with zstandard.ZstdDecompressor().stream_reader(data) as reader:
+        while True:
+            chunk = reader.read(min(1024 * 1024, limit - size + 1))
+            if not chunk:
+                return b"".join(chunks)
+            size += len(chunk)
+            if size > limit:
+                raise BodyTooLarge(limit)
+            chunks.append(chunk)
+
+
+def _accepted(header: Optional[str]) -> set:
+    """Lower-cased values of an Accept or Accept-Encoding header, without those weighted q=0"""
+    accepted = set()
+    for item in (header or "").lower().split(","):
+        name, *params = [part.strip() for part in item.split(";")]
+        weight = next((param[2:] for param in params if param.startswith("q=")), "1")
+        try:
+            if float(weight) <= 0:
+                continue
+        except ValueError:
+            continue
+        if name:
+            accepted.add(name)
+    return accepted
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best encoding of ours listed in an Accept-Encoding header, or None"""
+    accepted = _accepted(accept_encoding)
+    for encoding in ENCODINGS:
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def encode_request(payload: Dict, compact: bool = True) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Body and headers for an agent request: the preferred format, compressed
+    when large; compact=False is plain JSON that any agent accepts
+    """
+    headers = {"Accept": f"{MSGPACK}, {JSON};q=0.9"} if MSGPACK_AVAILABLE else {"Accept": JSON}
+    if not compact:
+        headers["Content-Type"] = JSON
+        return dumps(payload), headers
+    content_type = preferred_format()
+    body = encode(payload, content_type)
+    headers["Content-Type"] = content_type
+    if len(body) >= COMPRESS_MIN_BYTES:
+        body = compress(body, ENCODINGS[0])
+        headers["Content-Encoding"] = ENCODINGS[0]
+    return body, headers
+
+
+class DecodedResponse:
+    """
+    An HTTP response (requests or httpx) whose json() also reads msgpack
+    bodies; everything else is the wrapped response. The HTTP library has
+    already undone any Content-Encoding it advertised.
+    """
+
+    def __init__(self, response):
+        self._response = response
+
+    def json(self) -> Any:
+        return decode(self._response.content, self._response.headers.get("content-type"))
+
+    def __getattr__(self, name: str):
+        return getattr(self._response, name)
+
+
+# ============================================
+# STORED VALUES (Redis, task queue messages)
+# ============================================
+
+def pack_value(obj: Any) -> bytes:
+    """msgpack (or JSON) with a 3-byte header, compressed when large"""
+    content_type = MSGPACK if MSGPACK_AVAILABLE else JSON
+    body = encode(obj, content_type)
+    encoding = None
+    if len(body) >= COMPRESS_MIN_BYTES:
+        encoding = ENCODINGS[0]
+        body = compress(body, encoding)
+    header = _VALUE_MARKER + (b"m" if content_type == MSGPACK else b"j") + _VALUE_COMPRESSION[encoding]
+    return header + body
+
+
+def unpack_value(data) -> Any:
+    """Inverse of pack_value; plain JSON (str or bytes) from before packing is read as is"""
+    if isinstance(data, str) or not data.startswith(_VALUE_MARKER):
+        return loads(data)
+    fmt, compression, body = data[1:2], data[2:3], data[3:]
+    encodings = {tag: encoding for encoding, tag in _VALUE_COMPRESSION.items()}
+    if compression not in encodings:
+        raise UnsupportedEncoding(f"Unknown packed value compression {compression!r}")
+    return decode(decompress(body, encodings[compression]), MSGPACK if fmt == b"m" else JSON)
+
+
+# ============================================
+# SERVER SIDE
+# ============================================
+
+# The response format negotiated for the request being handled
+_response_format: contextvars.ContextVar[str] = contextvars.ContextVar("response_format", default=JSON)
+
+
+class WireResponse(JSONResponse):
+    """Default response class of the agents: msgpack when the client asked for it, else compact JSON"""
+
+    def __init__(self, content: Any, *args, **kwargs):
+        if "media_type" not in kwargs and _response_format.get() == MSGPACK:
+            self.media_type = MSGPACK
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return encode(content, MSGPACK if self.media_type == MSGPACK else JSON)
+
+
+class WireMiddleware:
+    """
+    Decodes compressed and msgpack request bodies into the JSON FastAPI
+    parses, and compresses complete (not streamed) JSON and msgpack
+    responses of at least COMPRESS_MIN_BYTES for clients that accept it.
+    Bodies it cannot decode get 415, so clients can fall back to JSON;
+    bodies over max_body bytes, compressed or decompressed, get 413.
+    """
+
+    def __init__(self, app, min_size: int = COMPRESS_MIN_BYTES, max_body: int = MAX_BODY_BYTES):
+        self.app = app
+        self.min_size = min_size
+        self.max_body = max_body
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        content_encoding = headers.get("content-encoding")
+
+        if content_type == MSGPACK or content_encoding:
+            try:
+                body = await self._read_body(receive, self.max_body)
+                body = decompress(body, content_encoding, self.max_body)
+                if content_type == MSGPACK:
+                    body = dumps(decode(body, MSGPACK))
+            except Exception as e:
+                if isinstance(e, BodyTooLarge):
+                    status = 413
+                else:
+                    status = 415 if isinstance(e, UnsupportedEncoding) else 400
+                await WireResponse({"detail": f"Could not decode request body: {e}"}, status_code=status)(scope, receive, send)
+                return
+            scope = dict(scope)
+            scope["headers"] = [
+                (key, value) for key, value in scope["headers"]
+                if key not in (b"content-type", b"content-encoding", b"content-length")
+            ] + [(b"content-type", JSON.encode()), (b"content-length", str(len(body)).encode())]
+            receive = self._replay(body, receive)
+
+        accepts_msgpack = MSGPACK_AVAILABLE and MSGPACK in _accepted(headers.get("accept"))
+        token = _response_format.set(MSGPACK if accepts_msgpack else JSON)
+        try:
+            encoding = choose_encoding(headers.get("accept-encoding"))
+            await self.app(scope, receive, send if encoding is None else self._compressing(send, encoding))
+        finally:
+            _response_format.reset(token)
+
+    @staticmethod
+    async def _read_body(receive, limit: int) -> bytes:
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise ConnectionError("Client disconnected while sending the body")
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            if size > limit:
+                raise BodyTooLarge(limit)
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    @staticmethod
+    def _replay(body: bytes, receive):
+        sent = False
+
+        async def replay():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+        return replay
+
+    def _compressing(self, send, encoding: str):
+        start = None
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                # Held until the first body chunk shows whether the response streams
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            held, start = start, None
+            response_headers = {key.lower(): value for key, value in held["headers"]}
+            media_type = response_headers.get(b"content-type", b"").split(b";")[0].strip().decode("latin-1")
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or media_type not in (JSON, MSGPACK)
+                or b"content-encoding" in response_headers
+                or len(body) < self.min_size
+            ):
+                await send(held)
+                await send(message)
+                return
+
+            body = compress(body, encoding)
+            held = dict(held)
+            held["headers"] = [
+                (key, value) for key, value in held["headers"] if key.lower() != b"content-length"
+            ] + [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send(held)
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+        return send_wrapper
+
+
+def negotiate_encodings(agent_app):
+    """
+    Make msgpack and compressed bodies available on an agent app. Call it
+    right after creating the app: routes declared before it keep plain JSON
+    responses.
+    """
+    agent_app.router.default_response_class = WireResponse
+    agent_app.add_middleware(WireMiddleware)
@@ -0,0 +1,160 @@
+"""
+Schema Generation Benchmark - Bulk SQL and SQLAlchemy output for a large schema
+Run from the repository root: python benchmarks/bench_schema.py [--tables N] [--columns N]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "agents"))
+
+from database_agent import generate_sql_schema, generate_sqlalchemy_models, plan_indexes
+
+# ============================================
+# ORIGINAL GENERATORS (reference implementations)
+# ============================================
+
+# The original SQL generator always indexed created_at. Here it emits the
+# planned indexes instead, so both generators produce the same output and
+# the timings compare rendering only.
+
+def legacy_generate_sql_schema(tables: List[Dict]) -> str:
+    """Generate SQL schema"""
+
+    sql = "-- Generated Database Schema\n\n"
+
+    for table in tables:
+        table_name = table.get("name", "table")
+        columns = table.get("columns", [])
+
+        sql += f"CREATE TABLE IF NOT EXISTS {table_name} (\n"
+
+        column_defs = []
+        for col in columns:
+            col_def = f"    {col['name']} {col['type']}"
+            if col.get("constraints"):
+                col_def += f" {col['constraints']}"
+            column_defs.append(col_def)
+
+        sql += ",\n".join(column_defs)
+        sql += "\n);\n\n"
+
+        # Add indexes
+        index_columns = plan_indexes(columns)
+        for column in index_columns:
+            sql += f"CREATE INDEX IF NOT EXISTS idx_{table_name}_{column} ON {table_name}({column});\n"
+        if index_columns:
+            sql += "\n"
+
+    return sql
+
+def legacy_generate_sqlalchemy_models(tables: List[Dict]) -> str:
+    """Generate SQLAlchemy models"""
+
+    code = """from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
+from datetime import datetime
+
+Base = declarative_base()
+
+"""
+
+    for table in tables:
+        table_name = table.get("name", "table")
+        class_name = "".join([word.capitalize() for word in table_name.split("_")])
+
+        code += f"class {class_name}(Base):\n"
+        code += f"    __tablename__ = '{table_name}'\n\n"
+
+        for col in table.get("columns", []):
+            col_name = col["name"]
+            col_type = col["type"]
+
+            # Map SQL types to SQLAlchemy
+            if "INT" in col_type or "SERIAL" in col_type:
+                sa_type = "Integer"
+            elif "VARCHAR" in col_type or "TEXT" in col_type:
+                sa_type = "String"
+            elif "TIMESTAMP" in col_type:
+                sa_type = "DateTime"
+            elif "BOOLEAN" in col_type:
+                sa_type = "Boolean"
+            else:
+                sa_type = "String"
+
+            constraints = col.get("constraints") or ""
+            primary_key = "PRIMARY KEY" in constraints
+
+            code += f"    {col_name} = Column({sa_type}, primary_key={primary_key})\n"
+
+        code += "\n"
+
+    return code
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+# Cycled to fill each table after its id column
+COLUMN_SHAPES = [
+    ("owner_id", "INTEGER", "REFERENCES users(id)"),
+    ("title", "VARCHAR(255)", "NOT NULL"),
+    ("slug", "VARCHAR(100)", "UNIQUE"),
+    ("body", "TEXT", None),
+    ("status", "VARCHAR(50)", "DEFAULT 'draft'"),
+    ("is_active", "BOOLEAN", "DEFAULT TRUE"),
+    ("payload", "JSONB", None),
+    ("score", "NUMERIC(10, 2)", None),
+    ("created_at", "TIMESTAMP", "DEFAULT NOW()"),
+    ("updated_at", "TIMESTAMPTZ", None),
+]
+
+def build_tables(table_count: int, column_count: int) -> List[Dict]:
+    tables = []
+    for i in range(table_count):
+        columns = [{"name": "id", "type": "SERIAL", "constraints": "PRIMARY KEY"}]
+        for j in range(column_count - 1):
+            name, col_type, constraints = COLUMN_SHAPES[j % len(COLUMN_SHAPES)]
+            if j >= len(COLUMN_SHAPES):
+                name = f"{name}_{j // len(COLUMN_SHAPES)}"
+            columns.append({"name": name, "type": col_type, "constraints": constraints})
+        tables.append({"name": f"entity_{i}", "columns": columns})
+    return tables
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tables", type=int, default=1000, help="Tables in the schema")
+    parser.add_argument("--columns", type=int, default=20, help="Columns per table")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing rounds per case (best is reported)")
+    parser.add_argument("--number", type=int, default=3, help="Calls per timing round")
+    args = parser.parse_args()
+
+    tables = build_tables(args.tables, args.columns)
+
+    # Identical output is a precondition for comparing speed
+    assert legacy_generate_sqlalchemy_models(tables) == generate_sqlalchemy_models(tables), \
+        "sqlalchemy models differ from the original"
+    sql = generate_sql_schema(tables)
+    assert legacy_generate_sql_schema(tables) == sql, "sql schema differs from the original"
+
+    print(f"Schema: {args.tables} tables x {args.columns} columns")
+    print(f"Output: {sql.count('CREATE INDEX')} indexes, {len(sql)} bytes")
+    print()
+    print(f"{'Case':<20} {'Original':>12} {'Bulk':>12} {'Speedup':>8}")
+    print("-" * 56)
+
+    cases = [
+        ("sql schema", lambda: legacy_generate_sql_schema(tables), lambda: generate_sql_schema(tables)),
+        ("sqlalchemy models", lambda: legacy_generate_sqlalchemy_models(tables), lambda: generate_sqlalchemy_models(tables)),
+    ]
+    for name, legacy, bulk in cases:
+        legacy_time = min(timeit.repeat(legacy, number=args.number, repeat=args.repeat)) / args.number
+        bulk_time = min(timeit.repeat(bulk, number=args.number, repeat=args.repeat)) / args.number
+        print(f"{name:<20} {legacy_time * 1000:>10.3f}ms {bulk_time * 1000:>10.3f}ms {legacy_time / bulk_time:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
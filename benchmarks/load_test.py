@@ -0,0 +1,521 @@
+"""
+Load Test - Latency percentiles, throughput and error rate for the agent pipeline
+Drives every /agents/* endpoint, or whole stories through the orchestrator, at a
+fixed request rate with bounded concurrency, using synthetic stories of varying
+size. Results can be written as a JSON baseline and compared across commits.
+
+Run from the repository root with the agents up (or --in-process):
+  python benchmarks/load_test.py --target agents --rps 20 --duration 30 --output baseline.json
+  python benchmarks/load_test.py --target pipeline --rps 2 --duration 60 --compare baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "agents"))
+
+from agent_client import AGENT_PORTS, AgentClient
+from orchestrator import DEFAULT_AGENT_CONCURRENCY, SimpleOrchestrator
+
+# Entities per story (criteria, tables, endpoints, components) for each size
+STORY_SIZES = {"small": 2, "medium": 8, "large": 32}
+
+COMPLEXITY = {"small": "low", "medium": "medium", "large": "high"}
+
+NOUNS = ["task", "invoice", "order", "ticket", "project", "message", "report", "booking", "profile", "payment"]
+
+# ============================================
+# SYNTHETIC WORKLOAD
+# ============================================
+
+def synthetic_story(index: int, size: str, rng: random.Random) -> Dict:
+    """A story with STORY_SIZES[size] acceptance criteria; titles are unique per index"""
+    noun = rng.choice(NOUNS)
+    count = STORY_SIZES[size]
+    return {
+        "id": f"LOAD-{index:06d}",
+        "title": f"{noun.capitalize()} Management {index}",
+        "description": f"As a user, I want to create, list and update {noun}s ({size} story)",
+        "acceptance_criteria": [
+            {"id": i + 1, "text": f"User can manage {noun} attribute {i + 1}", "priority": "must-have"}
+            for i in range(count)
+        ],
+        "tech_hints": {
+            "requires_auth": rng.random() < 0.5,
+            "requires_database": True,
+            "requires_api": True,
+            "requires_ui": True,
+            "complexity": COMPLEXITY[size],
+        },
+        "project_id": "load-test",
+    }
+
+
+def synthetic_tables(index: int, count: int) -> List[Dict]:
+    return [
+        {
+            "name": f"load_{index}_table_{i}",
+            "columns": [
+                {"name": "id", "type": "SERIAL", "constraints": "PRIMARY KEY"},
+                {"name": "user_id", "type": "INTEGER", "constraints": "REFERENCES users(id)"},
+                {"name": "title", "type": "VARCHAR(255)", "constraints": "NOT NULL"},
+                {"name": "status", "type": "VARCHAR(50)", "constraints": None},
+                {"name": "created_at", "type": "TIMESTAMP", "constraints": "DEFAULT NOW()"},
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def synthetic_endpoints(index: int, count: int) -> List[Dict]:
+    methods = ["GET", "POST", "PUT", "DELETE"]
+    return [
+        {
+            "path": f"/api/load_{index}_{i // 4}" + ("/{id}" if methods[i % 4] in ("PUT", "DELETE") else ""),
+            "method": methods[i % 4],
+            "auth_required": i % 2 == 0,
+        }
+        for i in range(count)
+    ]
+
+
+def synthetic_components(index: int, count: int) -> List[str]:
+    return [f"Load{index}Component{i}" for i in range(count)]
+
+
+def agent_request(agent: str, index: int, size: str, rng: random.Random):
+    """(path, payload) for one direct call to an agent"""
+    count = STORY_SIZES[size]
+    task = {"task_id": f"load_{agent}_{index}", "story_id": f"LOAD-{index:06d}", "session_id": f"load_session_{index}"}
+
+    if agent == "planning":
+        story = synthetic_story(index, size, rng)
+        return "/agents/planning", {
+            "story_id": story["id"],
+            "session_id": task["session_id"],
+            "title": story["title"],
+            "description": story["description"],
+            "acceptance_criteria": story["acceptance_criteria"],
+            "tech_hints": story["tech_hints"],
+            "project_id": story["project_id"],
+        }
+    if agent == "database":
+        return "/agents/database", {**task, "tables": synthetic_tables(index, count)}
+    if agent == "backend":
+        return "/agents/backend", {**task, "endpoints": synthetic_endpoints(index, count)}
+    if agent == "frontend":
+        return "/agents/frontend", {**task, "components": synthetic_components(index, count)}
+    if agent == "testing":
+        return "/agents/testing", {**task, "code_layers": ["database", "backend", "frontend"]}
+    raise ValueError(f"Unknown agent: {agent}")
+
+# ============================================
+# MEASUREMENT
+# ============================================
+
+class Recorder:
+    """Latency samples and errors per series name (e.g. "agent.backend")"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, Dict[str, int]] = {}
+
+    def record(self, names: List[str], latency: float, error: Optional[str] = None):
+        for name in names:
+            self.samples.setdefault(name, []).append(latency)
+            if error is not None:
+                errors = self.errors.setdefault(name, {})
+                errors[error] = errors.get(error, 0) + 1
+
+    def summary(self, wall_seconds: float) -> Dict[str, Dict]:
+        return {
+            name: summarize(latencies, self.errors.get(name, {}), wall_seconds)
+            for name, latencies in sorted(self.samples.items())
+        }
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], error_types: Dict[str, int], wall_seconds: float) -> Dict:
+    ordered = sorted(latencies)
+    errors = sum(error_types.values())
+    count = len(ordered)
+    return {
+        "count": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "throughput_rps": round((count - errors) / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+        "mean_ms": round(sum(ordered) / count * 1000, 2) if count else 0.0,
+        "max_ms": round(ordered[-1] * 1000, 2) if count else 0.0,
+        "error_types": error_types,
+    }
+
+
+def _error_name(error: Exception) -> str:
+    status_code = getattr(getattr(error, "response", None), "status_code", None) or getattr(error, "status_code", None)
+    return f"HTTP {status_code}" if status_code else type(error).__name__
+
+
+class TimedClient:
+    """AgentClient wrapper recording each agent call as a pipeline stage"""
+
+    def __init__(self, client: AgentClient, recorder: Recorder):
+        self.client = client
+        self.recorder = recorder
+
+    def post(self, agent: str, path: str, payload: Dict, timeout: Optional[float] = None):
+        start = time.perf_counter()
+        try:
+            response = self.client.post(agent, path, payload, timeout)
+        except Exception as e:
+            self.recorder.record([f"stage.{agent}"], time.perf_counter() - start, _error_name(e))
+            raise
+        error = f"HTTP {response.status_code}" if response.status_code >= 400 else None
+        self.recorder.record([f"stage.{agent}"], time.perf_counter() - start, error)
+        return response
+
+    def post_stream(self, agent: str, path: str, payload: Dict, timeout: Optional[float] = None) -> Iterator[Dict]:
+        start = time.perf_counter()
+        error = None
+        try:
+            yield from self.client.post_stream(agent, path, payload, timeout)
+        except Exception as e:
+            error = _error_name(e)
+            raise
+        finally:
+            self.recorder.record([f"stage.{agent}"], time.perf_counter() - start, error)
+
+    def health(self, agent: str, timeout: float = 3.0) -> bool:
+        return self.client.health(agent, timeout)
+
+    def close(self):
+        self.client.close()
+
+
+class TimedTransport:
+    """Same as TimedClient for transports with an async call() (in-process, queue)"""
+
+    def __init__(self, transport, recorder: Recorder):
+        self.transport = transport
+        self.recorder = recorder
+
+    async def call(self, agent: str, path: str, payload: Dict) -> Dict:
+        start = time.perf_counter()
+        error = None
+        try:
+            return await self.transport.call(agent, path, payload)
+        except Exception as e:
+            error = _error_name(e)
+            raise
+        finally:
+            self.recorder.record([f"stage.{agent}"], time.perf_counter() - start, error)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+# ============================================
+# LOAD GENERATION
+# ============================================
+
+async def run_open_loop(send: Callable[[int, float], Awaitable], rps: float, total: int, concurrency: int):
+    """
+    Start request i at start + i/rps regardless of earlier responses, with at
+    most `concurrency` in flight. send(i, scheduled) measures from the
+    scheduled time, so waiting for a free slot under overload counts as
+    latency instead of silently lowering the offered rate.
+    """
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+    start = loop.time()
+
+    async def one(index: int, scheduled: float):
+        async with slots:
+            await send(index, scheduled)
+
+    tasks = []
+    for index in range(total):
+        scheduled = start + index / rps
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(one(index, scheduled)))
+    await asyncio.gather(*tasks)
+
+
+async def call_agent(client, agent: str, path: str, payload: Dict) -> Dict:
+    if hasattr(client, "call"):
+        return await client.call(agent, path, payload)
+    response = await asyncio.to_thread(client.post, agent, path, payload)
+    response.raise_for_status()
+    return response.json()
+
+
+async def load_agents(client, args, recorder: Optional[Recorder], total: int, index_offset: int = 0):
+    """Every selected agent is driven at args.rps with its own concurrency limit"""
+    loop = asyncio.get_running_loop()
+
+    def sender(agent: str):
+        rng = random.Random(f"{args.seed}:{agent}:{index_offset}")
+
+        async def send(index: int, scheduled: float):
+            index += index_offset
+            size = args.sizes[index % len(args.sizes)]
+            path, payload = agent_request(agent, index, size, rng)
+            error = None
+            try:
+                await call_agent(client, agent, path, payload)
+            except Exception as e:
+                error = _error_name(e)
+            if recorder is not None:
+                recorder.record([f"agent.{agent}", f"agent.{agent}.{size}"], loop.time() - scheduled, error)
+        return send
+
+    await asyncio.gather(*[
+        run_open_loop(sender(agent), args.rps, total, args.concurrency)
+        for agent in args.agents
+    ])
+
+
+async def load_pipeline(orchestrator: SimpleOrchestrator, args, recorder: Optional[Recorder], total: int, index_offset: int = 0):
+    """Whole stories through the orchestrator at args.rps"""
+    loop = asyncio.get_running_loop()
+    rng = random.Random(f"{args.seed}:pipeline:{index_offset}")
+
+    async def send(index: int, scheduled: float):
+        index += index_offset
+        size = args.sizes[index % len(args.sizes)]
+        story = synthetic_story(index, size, rng)
+        error = None
+        try:
+            result = await orchestrator.process_story_async(story)
+            if result["status"] != "success":
+                error = f"{result.get('stage', 'pipeline')} failed"
+            else:
+                failed = [stage for stage, status in result["stages"].items() if status != "completed"]
+                if failed:
+                    error = f"{failed[0]} {result['stages'][failed[0]]}"
+        except Exception as e:
+            error = _error_name(e)
+        if recorder is not None:
+            recorder.record(["pipeline", f"pipeline.{size}"], loop.time() - scheduled, error)
+
+    await run_open_loop(send, args.rps, total, args.concurrency)
+
+# ============================================
+# REPORTING
+# ============================================
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def print_results(results: Dict[str, Dict]):
+    print(f"{'Series':<28} {'Count':>7} {'Err%':>7} {'RPS':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    print("-" * 83)
+    for name, row in results.items():
+        print(
+            f"{name:<28} {row['count']:>7} {row['error_rate'] * 100:>6.2f}% {row['throughput_rps']:>8.2f} "
+            f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}"
+        )
+
+
+def compare(baseline: Dict, results: Dict[str, Dict], tolerance: float) -> List[str]:
+    """
+    Print the change of every series present in both runs and return the
+    regressions: p95 or p99 up, or throughput down, by more than tolerance,
+    or error rate up by more than a percentage point
+    """
+    regressions = []
+    old_results = baseline.get("results", {})
+    print(f"\nCompared with {baseline.get('meta', {}).get('commit') or 'baseline'}:")
+    print(f"{'Series':<28} {'p50':>16} {'p95':>16} {'p99':>16} {'RPS':>14} {'Err%':>13}")
+    print("-" * 108)
+
+    def change(old: float, new: float) -> float:
+        return (new - old) / old if old else 0.0
+
+    for name, new in results.items():
+        old = old_results.get(name)
+        if old is None:
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            cells.append(f"{old[key]:.0f}->{new[key]:.0f} {change(old[key], new[key]):+.0%}")
+        cells.append(f"{old['throughput_rps']:.1f}->{new['throughput_rps']:.1f}")
+        cells.append(f"{old['error_rate'] * 100:.1f}->{new['error_rate'] * 100:.1f}")
+        print(f"{name:<28} {cells[0]:>16} {cells[1]:>16} {cells[2]:>16} {cells[3]:>14} {cells[4]:>13}")
+
+        for key in ("p95_ms", "p99_ms"):
+            if change(old[key], new[key]) > tolerance:
+                regressions.append(f"{name} {key} {old[key]:.1f} -> {new[key]:.1f}")
+        if change(old["throughput_rps"], new["throughput_rps"]) < -tolerance:
+            regressions.append(f"{name} throughput {old['throughput_rps']:.2f} -> {new['throughput_rps']:.2f} rps")
+        if new["error_rate"] - old["error_rate"] > 0.01:
+            regressions.append(f"{name} error rate {old['error_rate']:.2%} -> {new['error_rate']:.2%}")
+
+    return regressions
+
+# ============================================
+# MAIN
+# ============================================
+
+def make_client(args, recorder: Optional[Recorder] = None):
+    if args.in_process:
+        from monolith import InProcessTransport
+        transport = InProcessTransport()
+    elif args.queue:
+        from task_queue import QueueTransport
+        transport = QueueTransport(http_client=AgentClient(pool_sizes=DEFAULT_AGENT_CONCURRENCY))
+    else:
+        pool_sizes = {agent: args.concurrency for agent in AGENT_PORTS}
+        client = AgentClient(pool_sizes=pool_sizes)
+        return TimedClient(client, recorder) if recorder is not None else client
+    return TimedTransport(transport, recorder) if recorder is not None else transport
+
+
+async def run(args) -> Dict[str, Dict]:
+    # Agent calls run in worker threads; never let the default executor cap concurrency
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=max(32, args.concurrency * len(AGENT_PORTS)))
+    )
+    total = args.requests or max(1, int(args.rps * args.duration))
+    recorder = Recorder()
+
+    if args.target == "agents":
+        client = make_client(args)
+        try:
+            if args.warmup:
+                await load_agents(client, args, None, args.warmup, index_offset=10 ** 6)
+            start = time.perf_counter()
+            await load_agents(client, args, recorder, total)
+            wall_seconds = time.perf_counter() - start
+        finally:
+            await _close(client)
+    else:
+        client = make_client(args, recorder)
+        orchestrator = SimpleOrchestrator(
+            verbose=False,
+            client=client,
+            persist_artifacts=not args.no_persist,
+            stream_files=args.stream_files
+        )
+        try:
+            if args.warmup:
+                await load_pipeline(orchestrator, args, None, args.warmup, index_offset=10 ** 6)
+                recorder.samples.clear()
+                recorder.errors.clear()
+            start = time.perf_counter()
+            await load_pipeline(orchestrator, args, recorder, total)
+            wall_seconds = time.perf_counter() - start
+        finally:
+            await _close(client)
+
+    return recorder.summary(wall_seconds)
+
+
+async def _close(client):
+    if hasattr(client, "aclose"):
+        await client.aclose()
+    else:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["agents", "pipeline"], default="agents",
+                        help="Call each /agents/* endpoint directly, or run whole stories through the orchestrator")
+    parser.add_argument("--agents", default=",".join(AGENT_PORTS),
+                        help="Agents to drive with --target agents (comma-separated)")
+    parser.add_argument("--rps", type=float, default=5.0, help="Requests started per second (per agent with --target agents)")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load (ignored with --requests)")
+    parser.add_argument("--requests", type=int, help="Requests to send (per agent with --target agents)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Max in-flight requests (per agent with --target agents)")
+    parser.add_argument("--sizes", default="small,medium,large",
+                        help=f"Story sizes to cycle through ({', '.join(f'{k}={v}' for k, v in STORY_SIZES.items())} entities)")
+    parser.add_argument("--warmup", type=int, default=2, help="Unrecorded requests sent first (per agent with --target agents)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic workload")
+    parser.add_argument("--in-process", action="store_true", help="Load the agents into this process instead of HTTP")
+    parser.add_argument("--queue", action="store_true", help="Send generation tasks through RabbitMQ (RABBITMQ_URL)")
+    parser.add_argument("--stream-files", action="store_true", help="Pipeline: read code agent responses as NDJSON")
+    parser.add_argument("--no-persist", action="store_true", help="Pipeline: skip saving artifacts to the planning agent")
+    parser.add_argument("--output", help="Write the results as a JSON baseline to this file")
+    parser.add_argument("--compare", help="Baseline JSON to compare against; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Relative change counted as a regression")
+    args = parser.parse_args()
+
+    args.agents = [agent.strip() for agent in args.agents.split(",") if agent.strip()]
+    args.sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = [agent for agent in args.agents if agent not in AGENT_PORTS] + [size for size in args.sizes if size not in STORY_SIZES]
+    if unknown:
+        parser.error(f"Unknown agents or sizes: {', '.join(unknown)}")
+
+    if not (args.in_process or args.queue):
+        with AgentClient() as client:
+            needed = args.agents if args.target == "agents" else list(AGENT_PORTS)
+            down = [agent for agent in needed if not client.health(agent)]
+        if down:
+            parser.error(f"Agents not reachable: {', '.join(down)} (start them or use --in-process)")
+
+    results = asyncio.run(run(args))
+    print_results(results)
+
+    if args.output:
+        baseline = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "python": platform.python_version(),
+                "config": {
+                    key: getattr(args, key)
+                    for key in ("target", "agents", "rps", "duration", "requests", "concurrency", "sizes",
+                                "warmup", "seed", "in_process", "queue", "stream_files", "no_persist")
+                },
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nBaseline written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("config", {}).get("target") not in (None, args.target):
+            print(f"\n⚠️  Baseline was recorded with --target {baseline['meta']['config']['target']}")
+        regressions = compare(baseline, results, args.tolerance)
+        if regressions:
+            print("\n❌ Regressions:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,29 @@
 import React, { useState, useEffect } from 'react';
-import axios from 'axios';
 import './App.css';
 
 const API_BASE = 'http://localhost:8000';
 
+const STAGES = ['planning', 'database', 'backend', 'frontend', 'testing'];
+const STAGE_ICONS = { pending: '⏸️', running: '⏳', completed: '✅', failed: '❌', skipped: '⏭️' };
+
+const STAGE_LABELS = {
+    planning: '📋 Planning',
+    database: '🗄️ Database',
+    backend: '⚙️ Backend',
+    frontend: '🎨 Frontend',
+    testing: '🧪 Testing'
+};
+
+const describeStage = (stage, result) => {
+    if (stage === 'planning') {
+        return `Planning completed (${result.execution_time_seconds.toFixed(2)}s)`;
+    }
+    if (stage === 'testing') {
+        return `Tests: ${result.total_tests} total, Coverage: ${result.coverage}%`;
+    }
+    return `Generated ${result.generated_files.length} ${stage} files`;
+};
+
 function App() {
     const [agents, setAgents] = useState([
         { name: 'Planning', port: 8000, status: 'unknown', color: '#3b82f6', icon: '🧠' },
@@ -23,31 +43,52 @@ function App() {
     const [result, setResult] = useState(null);
     const [isLoading, setIsLoading] = useState(true);
     const [progress, setProgress] = useState(0);
+    const [stories, setStories] = useState({});
+    const [throughput, setThroughput] = useState(null);
 
-    // Check agent health
+    // Agent health, story progress and throughput are pushed by the planning
+    // agent's status hub over one stream (it polls the agents for everyone)
     useEffect(() => {
-        const checkHealth = async () => {
-            const updatedAgents = await Promise.all(
-                agents.map(async (agent) => {
-                    try {
-                        const response = await axios.get(`http://localhost:${agent.port}/health`, {
-                            timeout: 2000
-                        });
-                        return { ...agent, status: response.data.status === 'healthy' ? 'healthy' : 'unhealthy' };
-                    } catch (error) {
-                        return { ...agent, status: 'offline' };
-                    }
-                })
-            );
-            setAgents(updatedAgents);
-            setIsLoading(false);
+        const applyHealth = (health) => {
+            setAgents(prev => prev.map(agent => ({
+                ...agent,
+                status: health[agent.name.toLowerCase()]?.status || 'unknown'
+            })));
+            if (Object.values(health).some(entry => entry.checked_at)) {
+                setIsLoading(false);
+            }
         };
 
-        checkHealth();
-        const interval = setInterval(checkHealth, 10000); // Check every 10s
+        const source = new EventSource(`${API_BASE}/status/stream`);
+
+        source.addEventListener('snapshot', (event) => {
+            const snapshot = JSON.parse(event.data);
+            applyHealth(snapshot.health);
+            setStories(Object.fromEntries(snapshot.stories.map(story => [story.story_id, story])));
+            setThroughput(snapshot.throughput);
+        });
+        source.addEventListener('health', (event) => applyHealth(JSON.parse(event.data)));
+        source.addEventListener('story', (event) => {
+            const story = JSON.parse(event.data);
+            setStories(prev => {
+                const next = { ...prev };
+                if (story.status === 'running') {
+                    next[story.story_id] = story;
+                } else {
+                    delete next[story.story_id];
+                }
+                return next;
+            });
+        });
+        source.addEventListener('throughput', (event) => setThroughput(JSON.parse(event.data)));
+
+        // The planning agent is down; EventSource keeps retrying on its own
+        source.onerror = () => {
+            setAgents(prev => prev.map(agent => ({ ...agent, status: 'offline' })));
+            setIsLoading(false);
+        };
 
-        return () => clearInterval(interval);
-        // eslint-disable-next-line react-hooks/exhaustive-deps
+        return () => source.close();
     }, []);
 
     const addLog = (message, type = 'info') => {
@@ -61,93 +102,87 @@ function App() {
         setProgress(0);
         addLog('🚀 Starting story processing...', 'info');
 
-        try {
-            // Step 1: Planning (20% progress)
-            setProgress(10);
-            addLog('📋 Calling Planning Agent...', 'info');
-
-            const planningResponse = await axios.post(`${API_BASE}/agents/planning`, {
-                story_id: `US-${Date.now()}`,
-                session_id: `session_${Date.now()}`,
-                title: storyInput.title,
-                description: storyInput.description,
-                acceptance_criteria: storyInput.criteria.split('\n').map((text, idx) => ({
-                    id: idx + 1,
-                    text: text.trim(),
-                    priority: 'must-have'
-                })),
-                tech_hints: {
-                    requires_auth: true,
-                    requires_database: true,
-                    requires_api: true,
-                    requires_ui: true,
-                    complexity: 'medium'
-                },
-                project_id: 'demo-project'
-            });
-
-            setProgress(20);
-            addLog(`✅ Planning completed (${planningResponse.data.execution_time_seconds.toFixed(2)}s)`, 'success');
-
-            const architecture = planningResponse.data.architecture;
+        // One request runs the whole story server-side; stages arrive over SSE
+        // as they finish (independent stages run concurrently)
+        const outputs = {};
+        let finished = 0;
+        const handleEvent = (event, data) => {
+            if (event === 'stage') {
+                if (data.status === 'running') {
+                    addLog(`${STAGE_LABELS[data.stage]} started...`, 'info');
+                    return;
+                }
+                if (data.status === 'completed') {
+                    outputs[data.stage] = data.result;
+                    addLog(`✅ ${describeStage(data.stage, data.result)}`, 'success');
+                } else {
+                    addLog(`${data.status === 'skipped' ? '⏭️' : '❌'} ${STAGE_LABELS[data.stage]} ${data.status}${data.error ? `: ${data.error}` : ''}`, 'error');
+                }
+                finished += 1;
+                setProgress(Math.round((finished / STAGES.length) * 100));
+            } else if (event === 'complete') {
+                if (data.status !== 'success') {
+                    throw new Error(`Pipeline ${data.status}`);
+                }
+                setResult({
+                    architecture: outputs.planning.architecture,
+                    database: outputs.database,
+                    backend: outputs.backend,
+                    frontend: outputs.frontend,
+                    testing: outputs.testing
+                });
+                addLog(`🎉 Story processing complete! (${data.execution_time_seconds.toFixed(2)}s)`, 'success');
+            } else if (event === 'error') {
+                throw new Error(data.detail);
+            }
+        };
 
-            // Step 2: Database (40% progress)
-            setProgress(30);
-            addLog('🗄️  Calling Database Agent...', 'info');
-            const dbResponse = await axios.post('http://localhost:8003/agents/database', {
-                task_id: `db_${Date.now()}`,
-                story_id: planningResponse.data.story_id,
-                session_id: planningResponse.data.session_id,
-                tables: architecture.database.tables
-            });
-            setProgress(40);
-            addLog(`✅ Generated ${dbResponse.data.generated_files.length} database files`, 'success');
-
-            // Step 3: Backend (60% progress)
-            setProgress(50);
-            addLog('⚙️  Calling Backend Agent...', 'info');
-            const backendResponse = await axios.post('http://localhost:8002/agents/backend', {
-                task_id: `backend_${Date.now()}`,
-                story_id: planningResponse.data.story_id,
-                session_id: planningResponse.data.session_id,
-                endpoints: architecture.backend.endpoints
-            });
-            setProgress(60);
-            addLog(`✅ Generated ${backendResponse.data.generated_files.length} backend files`, 'success');
-
-            // Step 4: Frontend (80% progress)
-            setProgress(70);
-            addLog('🎨 Calling Frontend Agent...', 'info');
-            const frontendResponse = await axios.post('http://localhost:8001/agents/frontend', {
-                task_id: `frontend_${Date.now()}`,
-                story_id: planningResponse.data.story_id,
-                session_id: planningResponse.data.session_id,
-                components: architecture.frontend.components
-            });
-            setProgress(80);
-            addLog(`✅ Generated ${frontendResponse.data.generated_files.length} frontend files`, 'success');
-
-            // Step 5: Testing (100% progress)
-            setProgress(90);
-            addLog('🧪 Calling Testing Agent...', 'info');
-            const testingResponse = await axios.post('http://localhost:8004/agents/testing', {
-                task_id: `testing_${Date.now()}`,
-                story_id: planningResponse.data.story_id,
-                session_id: planningResponse.data.session_id,
-                code_layers: ['database', 'backend', 'frontend']
-            });
-            setProgress(100);
-            addLog(`✅ Tests: ${testingResponse.data.total_tests} total, Coverage: ${testingResponse.data.coverage}%`, 'success');
-
-            setResult({
-                architecture,
-                database: dbResponse.data,
-                backend: backendResponse.data,
-                frontend: frontendResponse.data,
-                testing: testingResponse.data
+        try {
+            const response = await fetch(`${API_BASE}/pipeline/run?files=false`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    story_id: `US-${Date.now()}`,
+                    session_id: `session_${Date.now()}`,
+                    title: storyInput.title,
+                    description: storyInput.description,
+                    acceptance_criteria: storyInput.criteria.split('\n').map((text, idx) => ({
+                        id: idx + 1,
+                        text: text.trim(),
+                        priority: 'must-have'
+                    })),
+                    tech_hints: {
+                        requires_auth: true,
+                        requires_database: true,
+                        requires_api: true,
+                        requires_ui: true,
+                        complexity: 'medium'
+                    },
+                    project_id: 'demo-project'
+                })
             });
-
-            addLog('🎉 Story processing complete!', 'success');
+            if (!response.ok) {
+                throw new Error(`Pipeline request failed with status ${response.status}`);
+            }
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const block = buffer.slice(0, boundary);
+                    buffer = buffer.slice(boundary + 2);
+                    const event = block.match(/^event: (.*)$/m);
+                    const data = block.match(/^data: (.*)$/m);
+                    if (event && data) {
+                        handleEvent(event[1], JSON.parse(data[1]));
+                    }
+                }
+            }
 
         } catch (error) {
             addLog(`❌ Error: ${error.message}`, 'error');
@@ -206,6 +241,37 @@ function App() {
                     </div>
                 </section>
 
+                {/* Pipeline Activity */}
+                <section className="logs-section pipeline-activity">
+                    <h2>Pipeline Activity</h2>
+                    {throughput && (
+                        <p className="throughput">
+                            {throughput.stories_in_flight} in flight · {throughput.stories_per_minute} stories/min
+                            · {throughput.stories_completed} completed, {throughput.stories_failed} failed
+                            in the last {throughput.window_seconds}s
+                        </p>
+                    )}
+                    {Object.keys(stories).length === 0 ? (
+                        <p className="no-logs">No stories in flight.</p>
+                    ) : (
+                        <div className="logs-container">
+                            {Object.values(stories).map(story => (
+                                <div key={story.story_id} className="log-entry info">
+                                    <span className="log-time">{story.story_id}</span>
+                                    <span className="log-message">
+                                        {story.title || 'Untitled'}{' '}
+                                        {STAGES.map(name => (
+                                            <span key={name} title={story.stages[name]?.detail || ''}>
+                                                {STAGE_ICONS[story.stages[name]?.status] || '⏸️'} {name}{' '}
+                                            </span>
+                                        ))}
+                                    </span>
+                                </div>
+                            ))}
+                        </div>
+                    )}
+                </section>
+
                 {/* Story Input Form */}
                 <section className="story-input">
                     <h2>Process User Story</h2>
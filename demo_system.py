@@ -3,11 +3,12 @@ AutoDev Platform - System Demo (Windows Compatible)
 Tests all components and shows the full workflow
 """
 
-import requests
 import json
 import time
 from datetime import datetime
 
+from agent_client import get_client
+
 def print_header(title):
     print("\n" + "=" * 70)
     print(f"  {title}")
@@ -23,7 +24,7 @@ def print_info(message):
     print(f"[INFO] {message}")
 
 # Demo Configuration
-PLANNING_URL = "http://localhost:8000"
+client = get_client()
 
 print_header("AutoDev Platform - Complete System Demo")
 print(f"Demo Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -32,7 +33,7 @@ print(f"Demo Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 print_header("Test 1: Infrastructure Health Check")
 
 try:
-    response = requests.get(f"{PLANNING_URL}/health", timeout=5)
+    response = client.get("planning", "/health", timeout=5)
     if response.status_code == 200:
         data = response.json()
         print_success(f"Planning Agent: {data['status']}")
@@ -76,11 +77,7 @@ try:
     print("\nSending request to Planning Agent...")
     start_time = time.time()
     
-    response = requests.post(
-        f"{PLANNING_URL}/agents/planning",
-        json=test_story,
-        timeout=30
-    )
+    response = client.post("planning", "/agents/planning", test_story)
     
     execution_time = time.time() - start_time
     
@@ -10,17 +10,51 @@ CREATE TABLE IF NOT EXISTS execution_logs (
     updated_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Durable story jobs, one per story_id and content hash; each finished
+-- stage is checkpointed as an execution_logs row carrying the job_id
+CREATE TABLE IF NOT EXISTS story_jobs (
+    job_id VARCHAR(32) PRIMARY KEY,
+    story_id VARCHAR(100) NOT NULL,
+    content_hash CHAR(64) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    session_id VARCHAR(200),
+    request JSONB NOT NULL,
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW(),
+    UNIQUE (story_id, content_hash)
+);
+
+ALTER TABLE execution_logs ADD COLUMN IF NOT EXISTS job_id VARCHAR(32) REFERENCES story_jobs(job_id);
+
+-- Log payloads (whole architectures for planning) are large and repetitive;
+-- lz4 TOAST compression is faster than the default pglz (PostgreSQL 14+)
+ALTER TABLE execution_logs ALTER COLUMN output SET COMPRESSION lz4;
+ALTER TABLE story_jobs ALTER COLUMN request SET COMPRESSION lz4;
+
+-- Generated file bodies, stored once per distinct content (SHA-256)
+CREATE TABLE IF NOT EXISTS code_blobs (
+    content_hash CHAR(64) PRIMARY KEY,
+    content TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
 CREATE TABLE IF NOT EXISTS generated_code (
     id SERIAL PRIMARY KEY,
     story_id VARCHAR(100) NOT NULL,
     session_id VARCHAR(200),
     layer VARCHAR(20) NOT NULL,
     file_path TEXT NOT NULL,
-    content TEXT NOT NULL,
+    content TEXT,
+    content_hash CHAR(64) REFERENCES code_blobs(content_hash),
     language VARCHAR(20),
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Upgrade databases created before content deduplication
+ALTER TABLE generated_code ADD COLUMN IF NOT EXISTS content_hash CHAR(64) REFERENCES code_blobs(content_hash);
+ALTER TABLE generated_code ALTER COLUMN content DROP NOT NULL;
+
 CREATE TABLE IF NOT EXISTS test_results (
     id SERIAL PRIMARY KEY,
     story_id VARCHAR(100) NOT NULL,
@@ -37,17 +71,21 @@ CREATE TABLE IF NOT EXISTS agent_metrics (
     id SERIAL PRIMARY KEY,
     agent_name VARCHAR(50) NOT NULL,
     task_id VARCHAR(200),
-    execution_time_seconds INTEGER,
+    execution_time_seconds REAL,
     tokens_used INTEGER,
     success BOOLEAN,
     error_message TEXT,
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Upgrade databases created with whole-second task timings
+ALTER TABLE agent_metrics ALTER COLUMN execution_time_seconds TYPE REAL;
+
 -- Indexes
 CREATE INDEX IF NOT EXISTS idx_execution_logs_story ON execution_logs(story_id);
 CREATE INDEX IF NOT EXISTS idx_execution_logs_agent ON execution_logs(agent_name);
-CREATE INDEX IF NOT EXISTS idx_generated_code_story ON generated_code(story_id);
+CREATE INDEX IF NOT EXISTS idx_execution_logs_job ON execution_logs(job_id, agent_name, id) WHERE job_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_generated_code_story_page ON generated_code(story_id, id);
 CREATE INDEX IF NOT EXISTS idx_test_results_story ON test_results(story_id);
 CREATE INDEX IF NOT EXISTS idx_agent_metrics_agent ON agent_metrics(agent_name);
 
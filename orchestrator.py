@@ -3,30 +3,364 @@ Simple Orchestrator - Coordinates agents without n8n
 Use this for testing before setting up n8n
 """
 
-import requests
+import argparse
+import asyncio
+import os
+import sys
 import json
 import time
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+
+# Shared pipeline helpers live next to the agents
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "agents"))
+
+from agent_client import DEFAULT_TIMEOUTS, AgentClient
+from architecture_diff import changed_entities, is_dirty, layer_entities, merge_files
+from dependency_graph import run_dependency_graph, with_default_stages
+from resilience import Resilience
+
+# Maximum in-flight requests per agent when processing stories in batch
+DEFAULT_AGENT_CONCURRENCY = {
+    "planning": 8,
+    "database": 16,
+    "backend": 16,
+    "frontend": 16,
+    "testing": 16,
+}
+
+# Pure functions of their payload: safe to send twice and keep the first answer
+HEDGED_AGENTS = ("database", "backend", "frontend", "testing")
+
+def _story_id(story: Dict) -> str:
+    """Stories from test_stories.json use "id", API payloads use "story_id" """
+    return story.get("id") or story.get("story_id")
 
 class SimpleOrchestrator:
-    def __init__(self):
-        self.planning_url = "http://localhost:8000"
-        self.frontend_url = "http://localhost:8001"
-        self.backend_url = "http://localhost:8002"
-        self.database_url = "http://localhost:8003"
-        self.testing_url = "http://localhost:8004"
+    def __init__(
+        self,
+        agent_concurrency: Optional[Dict[str, int]] = None,
+        verbose: bool = True,
+        client: Optional[AgentClient] = None,
+        persist_artifacts: bool = True,
+        stream_files: bool = False,
+        output_dir: Optional[str] = None,
+        report_status: bool = False,
+        durable: bool = False,
+        retries: int = 2,
+        hedge: bool = False,
+        resilience: Optional[Resilience] = None
+    ):
+        self.persist_artifacts = persist_artifacts
+        # Checkpoint every stage in the planning agent's job store; processing
+        # the same story again resumes after its last completed stage
+        self.durable = durable
+        # Send every stage transition to the planning agent's status hub,
+        # which pushes story progress to the dashboards
+        self.report_status = report_status
+        # Read code agent responses as NDJSON, one file at a time (HTTP only)
+        self.stream_files = stream_files
+        # Write every generated file under output_dir/<story_id>/ as it arrives
+        self.output_dir = output_dir
+        self.agent_concurrency = {**DEFAULT_AGENT_CONCURRENCY, **(agent_concurrency or {})}
+        # Pool one keep-alive connection per allowed in-flight request
+        self.client = client or AgentClient(pool_sizes=self.agent_concurrency)
+        # monolith.InProcessTransport and task_queue.QueueTransport expose an
+        # async call() instead of blocking HTTP requests
+        self.async_transport = hasattr(self.client, "call")
+        # task_queue.QueueTransport: tasks for these agents wait in the broker
+        # for up to its result_timeout; a timeout, retry or hedge here would
+        # publish the same task again with nobody reading the first reply
+        self.queued_agents = set(getattr(self.client, "queued_agents", ()))
+        # Retries, per-agent circuit breakers and latency-based timeouts for
+        # every agent call; with hedge, slow generation calls get a backup request
+        self.resilience = resilience or Resilience(
+            max_timeouts={
+                **DEFAULT_TIMEOUTS,
+                # QueueTransport sends its other agents over http_client
+                **getattr(getattr(self.client, "http_client", None), "timeouts", {}),
+                **getattr(self.client, "timeouts", {})
+            },
+            retries=retries,
+            hedge_agents=HEDGED_AGENTS if hedge else ()
+        )
+        self.verbose = verbose
+        self._limits_loop = None
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+    
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+    
+    def _limit(self, agent: str) -> asyncio.Semaphore:
+        """Per-agent semaphore, recreated for every event loop"""
+        loop = asyncio.get_running_loop()
+        if self._limits_loop is not loop:
+            self._limits_loop = loop
+            self._limits = {name: asyncio.Semaphore(limit) for name, limit in self.agent_concurrency.items()}
+        return self._limits.setdefault(agent, asyncio.Semaphore(DEFAULT_AGENT_CONCURRENCY.get(agent, 16)))
+    
+    def process_story(self, story: Dict, previous: Optional[Dict] = None) -> Dict:
+        """Process a user story end-to-end (incrementally if given its previous result)"""
+        async def run():
+            try:
+                return await self.process_story_async(story, previous)
+            finally:
+                await self._close_transport()
+        
+        return asyncio.run(run())
+    
+    def process_stories(
+        self,
+        stories: Iterable[Dict],
+        max_concurrency: int = 10,
+        on_result: Optional[Callable[[Dict], None]] = None
+    ) -> List[Dict]:
+        """
+        Process many stories with at most max_concurrency in flight.
+        on_result is called with each story's result as soon as it completes.
+        """
+        async def collect():
+            # Agent calls run in worker threads; size the pool to the agent limits
+            # so the default executor never becomes the hidden bottleneck
+            asyncio.get_running_loop().set_default_executor(
+                ThreadPoolExecutor(max_workers=sum(self.agent_concurrency.values()))
+            )
+            results = []
+            try:
+                async for result in self.stream_stories(stories, max_concurrency):
+                    if on_result:
+                        on_result(result)
+                    results.append(result)
+            finally:
+                await self._close_transport()
+            return results
+        
+        return asyncio.run(collect())
     
-    def process_story(self, story: Dict) -> Dict:
-        """Process a user story end-to-end"""
+    async def stream_stories(self, stories: Iterable[Dict], max_concurrency: int = 10) -> AsyncIterator[Dict]:
+        """
+        Yield per-story results in completion order.
         
-        print(f"\n🚀 Processing Story: {story['title']}")
-        print("=" * 60)
+        Stories are pulled lazily from the iterable by max_concurrency workers,
+        and workers wait while the result buffer is full, so a slow consumer
+        throttles intake instead of letting results pile up in memory.
+        """
+        story_iter = iter(stories)
+        results: asyncio.Queue = asyncio.Queue(maxsize=max_concurrency)
+        done = object()
+        
+        async def worker():
+            try:
+                for story in story_iter:
+                    try:
+                        result = await self.process_story_async(story)
+                    except Exception as e:
+                        result = {"status": "failed", "stage": "orchestrator", "error": str(e)}
+                    result.setdefault("story_id", _story_id(story))
+                    await results.put(result)
+            finally:
+                await results.put(done)
+        
+        workers = [asyncio.ensure_future(worker()) for _ in range(max(1, max_concurrency))]
+        remaining = len(workers)
+        try:
+            while remaining:
+                result = await results.get()
+                if result is done:
+                    remaining -= 1
+                else:
+                    yield result
+        finally:
+            for task in workers:
+                task.cancel()
+    
+    async def _post(self, agent: str, path: str, payload: Dict, idempotent: bool = True) -> Dict:
+        """
+        POST to an agent over the pooled client without blocking the event
+        loop. Failed idempotent calls are retried; the agent slot is held
+        across retries, a hedged request may briefly exceed the limit.
+        """
+        async def send(timeout: float) -> Dict:
+            if self.async_transport:
+                return await self.client.call(agent, path, payload)
+            response = await asyncio.to_thread(self.client.post, agent, path, payload, timeout)
+            response.raise_for_status()
+            return response.json()
+        
+        async with self._limit(agent):
+            if agent in self.queued_agents:
+                return await self.client.call(agent, path, payload)
+            return await self.resilience.call(agent, path, send, idempotent=idempotent)
+    
+    async def _post_stream(self, agent: str, path: str, payload: Dict, timeout: Optional[float] = None) -> AsyncIterator[Dict]:
+        """Lines of an agent's NDJSON response, read in a worker thread as they arrive"""
+        loop = asyncio.get_running_loop()
+        lines: asyncio.Queue = asyncio.Queue()
+        done = object()
+        
+        def pump():
+            try:
+                for line in self.client.post_stream(agent, path, payload, timeout):
+                    loop.call_soon_threadsafe(lines.put_nowait, line)
+            except Exception as e:
+                loop.call_soon_threadsafe(lines.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(lines.put_nowait, done)
+        
+        reader = asyncio.ensure_future(asyncio.to_thread(pump))
+        while True:
+            line = await lines.get()
+            if line is done:
+                break
+            if isinstance(line, Exception):
+                raise line
+            yield line
+        await reader
+    
+    async def _post_files(self, agent: str, path: str, payload: Dict) -> Dict:
+        """
+        _post for the code agents. With stream_files the response is read as
+        NDJSON, so files are written out while the rest are still being
+        generated; the assembled result is the same either way.
+        """
+        story_id = payload["story_id"]
+        if not self.stream_files or self.async_transport:
+            result = await self._post(agent, path, payload)
+            for file in _result_files(result):
+                await self._write_file(story_id, file)
+            return result
+        
+        async def collect(timeout: float) -> Dict:
+            files = []
+            summary = None
+            async for line in self._post_stream(agent, path, payload, timeout):
+                if "file_path" in line:
+                    files.append(line)
+                    await self._write_file(story_id, line)
+                elif "error" in line:
+                    raise RuntimeError(f"{agent} agent failed after {len(files)} files: {line['error']}")
+                else:
+                    summary = line
+            
+            if summary is None:
+                raise RuntimeError(f"{agent} agent stream ended early after {len(files)} files")
+            summary["test_files" if agent == "testing" else "generated_files"] = files
+            return summary
+        
+        # A retry rewrites the same files; a hedge would write them twice at once
+        async with self._limit(agent):
+            return await self.resilience.call(agent, path, collect, hedge=False)
+    
+    async def _write_file(self, story_id: str, file: Dict):
+        if not self.output_dir:
+            return
+        root = os.path.abspath(os.path.join(self.output_dir, story_id))
+        target = os.path.abspath(os.path.join(root, file["file_path"]))
+        if os.path.commonpath([root, target]) != root:
+            raise ValueError(f"Refusing to write outside {root}: {file['file_path']}")
+        
+        def write():
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "w", encoding="utf-8") as f:
+                f.write(file["content"])
+        
+        await asyncio.to_thread(write)
+    
+    async def _report(self, story_id: str, stage: str, status: str, title: Optional[str] = None, detail: Optional[str] = None):
+        """Best-effort stage transition for the status hub; never fails the story"""
+        if not self.report_status:
+            return
+        update = {"story_id": story_id, "stage": stage, "status": status, "title": title, "detail": detail}
+        try:
+            # Not under the planning limit: status updates must not queue behind LLM calls
+            if self.async_transport:
+                await self.client.call("planning", "/status/stories", update)
+            else:
+                response = await asyncio.to_thread(self.client.post, "planning", "/status/stories", update, 5.0)
+                response.raise_for_status()
+        except Exception as e:
+            self._log(f"⚠️  Status report failed: {str(e)}")
+    
+    def _reported(self, story_id: str, stage: str, runner: Callable[[], Awaitable[Dict]]) -> Callable[[], Awaitable[Dict]]:
+        async def run():
+            await self._report(story_id, stage, "running")
+            try:
+                result = await runner()
+            except Exception as e:
+                await self._report(story_id, stage, "failed", detail=str(e))
+                raise
+            await self._report(story_id, stage, "completed")
+            return result
+        return run
+    
+    async def _open_job(self, planning_request: Dict) -> Optional[Dict]:
+        """The story's durable job, or None (the story then runs without checkpoints)"""
+        try:
+            return await self._post("planning", "/jobs", planning_request, idempotent=False)
+        except Exception as e:
+            self._log(f"⚠️  Job store unavailable, running without checkpoints: {str(e)}")
+            return None
+    
+    async def _checkpoint(self, job: Optional[Dict], story_id: str, stage: str, status: str, output: Dict):
+        if job is None:
+            return
+        try:
+            await self._post("planning", "/jobs/checkpoint", {
+                "job_id": job["job_id"], "story_id": story_id, "stage": stage, "status": status, "output": output
+            }, idempotent=False)
+        except Exception as e:
+            self._log(f"⚠️  Checkpoint of {stage} failed: {str(e)}")
+    
+    async def _finish_job(self, job: Optional[Dict], status: str):
+        if job is None:
+            return
+        try:
+            await self._post("planning", "/jobs/finish", {"job_id": job["job_id"], "status": status}, idempotent=False)
+        except Exception as e:
+            self._log(f"⚠️  Could not mark job {job['job_id']} {status}: {str(e)}")
+    
+    def _checkpointed(self, job: Dict, story_id: str, stage: str, runner: Callable[[], Awaitable[Dict]]) -> Callable[[], Awaitable[Dict]]:
+        async def run():
+            if stage in job["checkpoints"]:
+                self._log(f"♻️  {stage} already completed in job {job['job_id']}, reusing its output")
+                return job["checkpoints"][stage]
+            try:
+                result = await runner()
+            except Exception as e:
+                await self._checkpoint(job, story_id, stage, "failed", {"error": str(e)})
+                raise
+            await self._checkpoint(job, story_id, stage, "completed", result)
+            return result
+        return run
+    
+    async def _close_transport(self):
+        """Async transports hold loop-bound resources; release them with the loop"""
+        if self.async_transport:
+            await self.client.aclose()
+    
+    async def process_story_async(self, story: Dict, previous: Optional[Dict] = None) -> Dict:
+        """
+        Process a user story end-to-end. After planning, the generation stages
+        are scheduled from the planner's dependency_graph so that stages with
+        no edge between them run concurrently.
+        
+        previous is an earlier successful result for the same story. The
+        planner then diffs the new architecture against it, only added or
+        changed entities are sent to the agents, and the previous files of
+        unchanged entities are merged back in. Without a usable diff (e.g.
+        the previous architecture expired) the story is built in full.
+        """
+        
+        story_id = _story_id(story)
+        self._log(f"\n🚀 Processing Story: {story['title']}")
+        self._log("=" * 60)
         
         # Step 1: Planning
-        print("\n📋 Step 1: Planning Agent...")
+        self._log("\n📋 Step 1: Planning Agent...")
         planning_request = {
-            "story_id": story["id"],
-            "session_id": f"session_{story['id']}_{int(time.time())}",
+            "story_id": story_id,
+            "session_id": f"session_{story_id}_{int(time.time())}",
             "title": story["title"],
             "description": story["description"],
             "acceptance_criteria": story.get("acceptance_criteria", []),
@@ -37,118 +371,365 @@ class SimpleOrchestrator:
                 "requires_ui": True,
                 "complexity": "medium"
             }),
-            "project_id": "demo-project"
+            "project_id": story.get("project_id", "demo-project")
         }
+        if previous:
+            planning_request["previous_session_id"] = previous["session_id"]
+        
+        job = await self._open_job(planning_request) if self.durable else None
+        checkpoints = job["checkpoints"] if job else {}
         
+        await self._report(story_id, "planning", "running", title=story["title"])
         try:
-            response = requests.post(
-                f"{self.planning_url}/agents/planning",
-                json=planning_request,
-                timeout=30
-            )
-            response.raise_for_status()
-            planning_result = response.json()
-            print(f"✅ Planning completed in {planning_result['execution_time_seconds']:.2f}s")
+            if "planning" in checkpoints:
+                # Resumed job: no second LLM call for the same story
+                planning_result = checkpoints["planning"]
+                self._log(f"♻️  Resuming job {job['job_id']} with its stored plan")
+            else:
+                planning_result = await self._post("planning", "/agents/planning", planning_request)
+                self._log(f"✅ Planning completed in {planning_result['execution_time_seconds']:.2f}s")
+                await self._checkpoint(job, story_id, "planning", "completed", planning_result)
             
             architecture = planning_result["architecture"]
             session_id = planning_result["session_id"]
+            changes = planning_result.get("changes") if previous else None
             
         except Exception as e:
-            print(f"❌ Planning failed: {str(e)}")
+            self._log(f"❌ Planning failed: {str(e)}")
+            await self._report(story_id, "planning", "failed", detail=str(e))
+            await self._checkpoint(job, story_id, "planning", "failed", {"error": str(e)})
+            await self._finish_job(job, "failed")
             return {"status": "failed", "stage": "planning", "error": str(e)}
+        await self._report(story_id, "planning", "completed")
+        
+        # Step 2: Generation stages, scheduled from the dependency graph
+        # Stages the planner left out of its graph still run, on the default edges
+        graph = with_default_stages(architecture.get("dependency_graph"))
+        
+        prior = previous.get("outputs", {}) if changes else {}
+        if changes:
+            self._log("\n🔁 Incremental build: " + ", ".join(
+                f"{layer} +{len(c['added'])} ~{len(c['changed'])} -{len(c['removed'])}"
+                for layer, c in changes.items()
+            ))
+        
+        runners = {
+            "database": lambda: self._run_database(story, session_id, architecture, changes, prior.get("database")),
+            "backend": lambda: self._run_backend(story, session_id, architecture, changes, prior.get("backend")),
+            "frontend": lambda: self._run_frontend(story, session_id, architecture, changes, prior.get("frontend")),
+            "testing": lambda: self._run_testing(story, session_id, changes, prior.get("testing")),
+        }
+        if job is not None:
+            runners = {stage: self._checkpointed(job, story_id, stage, runner) for stage, runner in runners.items()}
+        if self.report_status:
+            runners = {stage: self._reported(story_id, stage, runner) for stage, runner in runners.items()}
         
-        # Step 2: Database Generation
-        print("\n🗄️  Step 2: Database Agent...")
         try:
-            db_response = requests.post(
-                f"{self.database_url}/agents/database",
-                json={
-                    "task_id": f"db_{story['id']}",
-                    "story_id": story["id"],
+            # A stage never runs on the missing output of a failed dependency
+            outcomes = await run_dependency_graph(graph["nodes"], graph["edges"], runners, skip_on_failure=True)
+        except ValueError as e:
+            self._log(f"❌ Scheduling failed: {str(e)}")
+            for stage in runners:
+                await self._report(story_id, stage, "failed", detail=str(e))
+            await self._finish_job(job, "failed")
+            return {"status": "failed", "stage": "scheduling", "error": str(e)}
+        
+        for stage in runners:
+            if outcomes[stage]["status"] == "skipped":
+                self._log(f"⏭️  {stage} skipped: {outcomes[stage]['error']}")
+                await self._report(story_id, stage, "skipped", detail=outcomes[stage]["error"])
+        
+        failed = [stage for stage, outcome in outcomes.items() if outcome["status"] == "failed"]
+        await self._finish_job(job, "failed" if failed else "completed")
+        
+        artifacts = None
+        if self.persist_artifacts:
+            artifacts = await self._persist_artifacts(story, session_id, outcomes)
+        
+        self._log("\n" + "=" * 60)
+        self._log(f"❌ Story failed at {failed[0]}" if failed else "✅ Story processing complete!")
+        self._log("=" * 60)
+        
+        result = {
+            "status": "failed" if failed else "success",
+            "story_id": story_id,
+            "session_id": session_id,
+            "job_id": job["job_id"] if job else None,
+            "architecture": architecture,
+            "stages": {stage: outcome["status"] for stage, outcome in outcomes.items()},
+            "changes": changes,
+            # Stage results, kept so the next re-plan can reuse unchanged files
+            "outputs": {
+                stage: outcome["result"] for stage, outcome in outcomes.items()
+                if outcome["status"] == "completed" and outcome["result"] is not None
+            },
+            "artifacts": artifacts
+        }
+        if failed:
+            result["stage"] = failed[0]
+            result["error"] = outcomes[failed[0]]["error"]
+        return result
+    
+    async def _generate(
+        self,
+        layer: str,
+        architecture: Dict,
+        post: Callable[[List], Awaitable[Dict]],
+        changes: Optional[Dict] = None,
+        prior: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Full build: post() every entity of the layer. Incremental: reuse the
+        previous result if nothing changed, else post() only the added and
+        changed entities and merge the previous files back in.
+        """
+        entities = layer_entities(architecture, layer)
+        if changes is None or prior is None:
+            return await post(entities)
+        
+        layer_changes = changes[layer]
+        if not is_dirty(layer_changes):
+            self._log(f"♻️  {layer} unchanged, reusing {len(prior['generated_files'])} files")
+            return prior
+        if layer == "database":
+            # schema.sql and models.py each cover every table
+            return await post(entities)
+        
+        fresh = changed_entities(architecture, layer, layer_changes)
+        result = await post(fresh) if fresh else {"generated_files": []}
+        result["generated_files"] = merge_files(prior["generated_files"], result["generated_files"], layer_changes["removed"])
+        return result
+    
+    async def _run_database(self, story: Dict, session_id: str, architecture: Dict, changes=None, prior=None) -> Dict:
+        self._log("\n🗄️  Database Agent...")
+        
+        async def post(tables: List) -> Dict:
+            return await self._post_files(
+                "database",
+                "/agents/database",
+                {
+                    "task_id": f"db_{_story_id(story)}",
+                    "story_id": _story_id(story),
                     "session_id": session_id,
-                    "tables": architecture["database"]["tables"]
-                },
-                timeout=30
+                    "tables": tables
+                }
             )
-            db_response.raise_for_status()
-            db_result = db_response.json()
-            print(f"✅ Generated {len(db_result['generated_files'])} database files")
-        except Exception as e:
-            print(f"❌ Database generation failed: {str(e)}")
         
-        # Step 3: Backend Generation
-        print("\n⚙️  Step 3: Backend Agent...")
         try:
-            backend_response = requests.post(
-                f"{self.backend_url}/agents/backend",
-                json={
-                    "task_id": f"backend_{story['id']}",
-                    "story_id": story["id"],
+            db_result = await self._generate("database", architecture, post, changes, prior)
+            self._log(f"✅ Generated {len(db_result['generated_files'])} database files")
+            return db_result
+        except Exception as e:
+            self._log(f"❌ Database generation failed: {str(e)}")
+            raise
+    
+    async def _run_backend(self, story: Dict, session_id: str, architecture: Dict, changes=None, prior=None) -> Dict:
+        self._log("\n⚙️  Backend Agent...")
+        
+        async def post(endpoints: List) -> Dict:
+            return await self._post_files(
+                "backend",
+                "/agents/backend",
+                {
+                    "task_id": f"backend_{_story_id(story)}",
+                    "story_id": _story_id(story),
                     "session_id": session_id,
-                    "endpoints": architecture["backend"]["endpoints"]
-                },
-                timeout=30
+                    "endpoints": endpoints
+                }
             )
-            backend_response.raise_for_status()
-            backend_result = backend_response.json()
-            print(f"✅ Generated {len(backend_result['generated_files'])} backend files")
-        except Exception as e:
-            print(f"❌ Backend generation failed: {str(e)}")
         
-        # Step 4: Frontend Generation
-        print("\n🎨 Step 4: Frontend Agent...")
         try:
-            frontend_response = requests.post(
-                f"{self.frontend_url}/agents/frontend",
-                json={
-                    "task_id": f"frontend_{story['id']}",
-                    "story_id": story["id"],
+            backend_result = await self._generate("backend", architecture, post, changes, prior)
+            self._log(f"✅ Generated {len(backend_result['generated_files'])} backend files")
+            return backend_result
+        except Exception as e:
+            self._log(f"❌ Backend generation failed: {str(e)}")
+            raise
+    
+    async def _run_frontend(self, story: Dict, session_id: str, architecture: Dict, changes=None, prior=None) -> Dict:
+        self._log("\n🎨 Frontend Agent...")
+        
+        async def post(components: List) -> Dict:
+            return await self._post_files(
+                "frontend",
+                "/agents/frontend",
+                {
+                    "task_id": f"frontend_{_story_id(story)}",
+                    "story_id": _story_id(story),
                     "session_id": session_id,
-                    "components": architecture["frontend"]["components"]
-                },
-                timeout=30
+                    "components": components
+                }
             )
-            frontend_response.raise_for_status()
-            frontend_result = frontend_response.json()
-            print(f"✅ Generated {len(frontend_result['generated_files'])} frontend files")
-        except Exception as e:
-            print(f"❌ Frontend generation failed: {str(e)}")
         
-        # Step 5: Testing
-        print("\n🧪 Step 5: Testing Agent...")
         try:
-            testing_response = requests.post(
-                f"{self.testing_url}/agents/testing",
-                json={
-                    "task_id": f"testing_{story['id']}",
-                    "story_id": story["id"],
+            frontend_result = await self._generate("frontend", architecture, post, changes, prior)
+            self._log(f"✅ Generated {len(frontend_result['generated_files'])} frontend files")
+            return frontend_result
+        except Exception as e:
+            self._log(f"❌ Frontend generation failed: {str(e)}")
+            raise
+    
+    async def _run_testing(self, story: Dict, session_id: str, changes=None, prior=None) -> Dict:
+        self._log("\n🧪 Testing Agent...")
+        if changes is not None and prior is not None and not any(is_dirty(c) for c in changes.values()):
+            self._log("♻️  No code changed, reusing previous test results")
+            return prior
+        try:
+            testing_result = await self._post_files(
+                "testing",
+                "/agents/testing",
+                {
+                    "task_id": f"testing_{_story_id(story)}",
+                    "story_id": _story_id(story),
                     "session_id": session_id,
                     "code_layers": ["database", "backend", "frontend"]
-                },
-                timeout=30
+                }
             )
-            testing_response.raise_for_status()
-            testing_result = testing_response.json()
-            print(f"✅ Tests: {testing_result['total_tests']} total, Coverage: {testing_result['coverage']}%")
+            self._log(f"✅ Tests: {testing_result['total_tests']} total, Coverage: {testing_result['coverage']}%")
+            return testing_result
         except Exception as e:
-            print(f"❌ Testing failed: {str(e)}")
+            self._log(f"❌ Testing failed: {str(e)}")
+            raise
+
+    async def _persist_artifacts(self, story: Dict, session_id: str, outcomes: Dict) -> Optional[Dict]:
+        """Store every generated file of the story in one bulk write"""
+        files = []
+        for layer, outcome in outcomes.items():
+            for file in _result_files(outcome.get("result") or {}):
+                files.append({
+                    "layer": layer,
+                    "file_path": file["file_path"],
+                    "content": file["content"],
+                    "language": file.get("language")
+                })
         
-        print("\n" + "=" * 60)
-        print("✅ Story processing complete!")
-        print("=" * 60)
+        if not files:
+            return None
         
-        return {
-            "status": "success",
-            "story_id": story["id"],
-            "session_id": session_id,
-            "architecture": architecture
-        }
+        self._log("\n💾 Persisting artifacts...")
+        try:
+            stored = await self._post(
+                "planning",
+                "/agents/artifacts",
+                {"story_id": _story_id(story), "session_id": session_id, "files": files},
+                idempotent=False
+            )
+            self._log(f"✅ Stored {stored['files']} files ({stored['new_blobs']} new bodies)")
+            return stored
+        except Exception as e:
+            self._log(f"❌ Artifact persistence failed: {str(e)}")
+            return None
 
-# Example usage
-if __name__ == "__main__":
-    orchestrator = SimpleOrchestrator()
+def _result_files(result: Dict) -> List[Dict]:
+    """Files of a code agent's result (the testing agent calls them test_files)"""
+    return result.get("generated_files", result.get("test_files", []))
+
+def _summarize(result: Dict) -> Dict:
+    """Printable result (drops the architecture and generated files)"""
+    return {key: value for key, value in result.items() if key not in ("architecture", "outputs")}
+
+def main():
+    parser = argparse.ArgumentParser(description="Process user stories through the agent pipeline")
+    parser.add_argument("--stories", help="JSON file with a list of stories (e.g. test_stories.json)")
+    parser.add_argument("--max-concurrency", type=int, default=10, help="Stories processed at the same time")
+    parser.add_argument(
+        "--agent-limit",
+        action="append",
+        default=[],
+        metavar="AGENT=N",
+        help="Per-agent in-flight request limit, e.g. --agent-limit planning=4"
+    )
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Run the agents inside this process instead of calling them over HTTP"
+    )
+    parser.add_argument(
+        "--stream-files",
+        action="store_true",
+        help="Receive generated files from the code agents one at a time (NDJSON)"
+    )
+    parser.add_argument("--output-dir", help="Write generated files to OUTPUT_DIR/<story_id>/ as they arrive")
+    parser.add_argument(
+        "--queue",
+        action="store_true",
+        help="Send generation tasks through RabbitMQ (RABBITMQ_URL) instead of HTTP"
+    )
+    parser.add_argument(
+        "--report-status",
+        action="store_true",
+        help="Report stage progress to the planning agent's status hub (shown on the dashboard)"
+    )
+    parser.add_argument(
+        "--durable",
+        action="store_true",
+        help="Checkpoint every stage in PostgreSQL; re-running the same stories resumes after completed stages"
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=2,
+        help="Extra attempts for a failed agent call (timeouts, connection errors, 429 and 5xx)"
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Send a backup request when a generation call runs past the agent's p95 latency"
+    )
+    args = parser.parse_args()
+    
+    agent_concurrency = {}
+    for limit in args.agent_limit:
+        agent, _, value = limit.partition("=")
+        agent_concurrency[agent.strip()] = int(value)
+    
+    client = None
+    if args.in_process:
+        from monolith import InProcessTransport
+        client = InProcessTransport()
+    elif args.queue:
+        from task_queue import QueueTransport
+        client = QueueTransport(http_client=AgentClient(pool_sizes=DEFAULT_AGENT_CONCURRENCY))
     
-    # Sample user story
+    if args.stories:
+        # Batch mode: one JSON line per story, printed as each one completes
+        orchestrator = SimpleOrchestrator(
+            agent_concurrency=agent_concurrency,
+            verbose=False,
+            client=client,
+            stream_files=args.stream_files,
+            output_dir=args.output_dir,
+            report_status=args.report_status,
+            durable=args.durable,
+            retries=args.retries,
+            hedge=args.hedge
+        )
+        with open(args.stories) as f:
+            stories = json.load(f)
+        
+        start_time = time.time()
+        results = orchestrator.process_stories(
+            stories,
+            max_concurrency=args.max_concurrency,
+            on_result=lambda result: print(json.dumps(_summarize(result)), flush=True)
+        )
+        elapsed = time.time() - start_time
+        succeeded = sum(1 for result in results if result["status"] == "success")
+        print(f"\n📊 {succeeded}/{len(results)} stories succeeded in {elapsed:.2f}s", file=sys.stderr)
+        return
+    
+    orchestrator = SimpleOrchestrator(
+        agent_concurrency=agent_concurrency,
+        client=client,
+        stream_files=args.stream_files,
+        output_dir=args.output_dir,
+        report_status=args.report_status,
+        durable=args.durable,
+        retries=args.retries,
+        hedge=args.hedge
+    )
+    
+    # Example usage: sample user story
     sample_story = {
         "id": "US-001",
         "title": "User Authentication",
@@ -170,4 +751,7 @@ if __name__ == "__main__":
     result = orchestrator.process_story(sample_story)
     
     print("\n📊 Final Result:")
-    print(json.dumps(result, indent=2))
+    print(json.dumps(_summarize(result), indent=2))
+
+if __name__ == "__main__":
+    main()
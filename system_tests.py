@@ -3,11 +3,15 @@ AutoDev Platform - Complete System Testing Suite
 Tests all components with multiple sample test cases
 """
 
-import requests
 import json
 import time
 from datetime import datetime
 
+from agent_client import get_client
+
+# One pooled, keep-alive session per agent for the whole run
+client = get_client()
+
 class Colors:
     GREEN = '\033[92m'
     RED = '\033[91m'
@@ -26,13 +30,9 @@ def print_test(test_name, status, details=""):
     if details:
         print(f"     {details}")
 
-def test_agent_health(port, name):
+def test_agent_health(agent, name):
     """Test if an agent is healthy"""
-    try:
-        response = requests.get(f"http://localhost:{port}/health", timeout=3)
-        return response.status_code == 200
-    except:
-        return False
+    return client.health(agent)
 
 def process_story(story):
     """Process a complete user story through all agents"""
@@ -47,11 +47,7 @@ def process_story(story):
     
     try:
         # Step 1: Planning Agent
-        planning_response = requests.post(
-            "http://localhost:8000/agents/planning",
-            json=story,
-            timeout=30
-        )
+        planning_response = client.post("planning", "/agents/planning", story)
         
         if planning_response.status_code == 200:
             results['planning'] = planning_response.json()
@@ -60,15 +56,15 @@ def process_story(story):
             
             # Step 2: Database Agent
             try:
-                db_response = requests.post(
-                    "http://localhost:8003/agents/database",
-                    json={
+                db_response = client.post(
+                    "database",
+                    "/agents/database",
+                    {
                         "task_id": f"db_{int(time.time())}",
                         "story_id": story['story_id'],
                         "session_id": session_id,
                         "tables": arch['database']['tables']
-                    },
-                    timeout=30
+                    }
                 )
                 if db_response.status_code == 200:
                     results['database'] = db_response.json()
@@ -77,15 +73,15 @@ def process_story(story):
             
             # Step 3: Backend Agent
             try:
-                backend_response = requests.post(
-                    "http://localhost:8002/agents/backend",
-                    json={
+                backend_response = client.post(
+                    "backend",
+                    "/agents/backend",
+                    {
                         "task_id": f"backend_{int(time.time())}",
                         "story_id": story['story_id'],
                         "session_id": session_id,
                         "endpoints": arch['backend']['endpoints']
-                    },
-                    timeout=30
+                    }
                 )
                 if backend_response.status_code == 200:
                     results['backend'] = backend_response.json()
@@ -94,15 +90,15 @@ def process_story(story):
             
             # Step 4: Frontend Agent
             try:
-                frontend_response = requests.post(
-                    "http://localhost:8001/agents/frontend",
-                    json={
+                frontend_response = client.post(
+                    "frontend",
+                    "/agents/frontend",
+                    {
                         "task_id": f"frontend_{int(time.time())}",
                         "story_id": story['story_id'],
                         "session_id": session_id,
                         "components": arch['frontend']['components']
-                    },
-                    timeout=30
+                    }
                 )
                 if frontend_response.status_code == 200:
                     results['frontend'] = frontend_response.json()
@@ -111,15 +107,15 @@ def process_story(story):
             
             # Step 5: Testing Agent
             try:
-                testing_response = requests.post(
-                    "http://localhost:8004/agents/testing",
-                    json={
+                testing_response = client.post(
+                    "testing",
+                    "/agents/testing",
+                    {
                         "task_id": f"testing_{int(time.time())}",
                         "story_id": story['story_id'],
                         "session_id": session_id,
                         "code_layers": ["database", "backend", "frontend"]
-                    },
-                    timeout=30
+                    }
                 )
                 if testing_response.status_code == 200:
                     results['testing'] = testing_response.json()
@@ -243,16 +239,16 @@ print(f"Total Test Cases: {len(TEST_CASES)}")
 print_header("PHASE 1: Infrastructure Health Checks")
 
 agents = [
-    (8000, "Planning Agent"),
-    (8001, "Frontend Agent"),
-    (8002, "Backend Agent"),
-    (8003, "Database Agent"),
-    (8004, "Testing Agent")
+    ("planning", 8000, "Planning Agent"),
+    ("frontend", 8001, "Frontend Agent"),
+    ("backend", 8002, "Backend Agent"),
+    ("database", 8003, "Database Agent"),
+    ("testing", 8004, "Testing Agent")
 ]
 
 healthy_count = 0
-for port, name in agents:
-    is_healthy = test_agent_health(port, name)
+for agent, port, name in agents:
+    is_healthy = test_agent_health(agent, name)
     print_test(f"{name:20s} (Port {port})", is_healthy)
     if is_healthy:
         healthy_count += 1
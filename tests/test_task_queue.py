@@ -0,0 +1,229 @@
+"""
+Task queue tests on the in-memory broker: delivery, prefetch, requeue,
+error replies and the orchestrator-side QueueTransport
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "agents"))
+
+from task_queue import AgentTaskError, AgentWorker, InMemoryBroker, QueueTransport, task_queue_name
+from wire import pack_value, unpack_value
+
+
+class EchoTask(BaseModel):
+    task_id: str
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/agents/echo")
+    async def echo(task: EchoTask):
+        return {"status": "success", "task_id": task.task_id}
+
+    @app.post("/agents/conflict")
+    async def conflict(task: EchoTask):
+        raise HTTPException(status_code=409, detail=f"{task.task_id} already exists")
+
+    return app
+
+
+async def settle():
+    """Let consumer tasks run"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+class FakeHttpClient:
+    def __init__(self):
+        self.calls = []
+
+    def post(self, agent, path, payload, timeout=None):
+        self.calls.append((agent, path, payload))
+        return FakeResponse({"via": "http", "agent": agent})
+
+
+class FailingReplyBroker(InMemoryBroker):
+    """Fails to publish the first `failures` replies"""
+
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+
+    async def publish(self, queue, body, correlation_id=None, reply_to=None, persistent=True):
+        if queue.startswith("amq.gen-") and self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("reply channel closed")
+        await super().publish(queue, body, correlation_id, reply_to, persistent)
+
+
+def test_publish_consume_round_trip():
+    async def run():
+        broker = InMemoryBroker()
+        received = []
+
+        async def on_message(delivery):
+            received.append((unpack_value(delivery.body), delivery.correlation_id, delivery.reply_to))
+            await delivery.ack()
+
+        await broker.declare_task_queue("tasks")
+        await broker.consume("tasks", on_message)
+        await broker.publish("tasks", pack_value({"n": 1}), correlation_id="c1", reply_to="replies")
+        await settle()
+        await broker.close()
+        return received, broker.depth("tasks")
+
+    received, depth = asyncio.run(run())
+    assert received == [({"n": 1}, "c1", "replies")]
+    assert depth == 0
+
+
+def test_prefetch_limits_unacknowledged_deliveries():
+    async def run():
+        broker = InMemoryBroker()
+        held = []
+
+        async def hold(delivery):
+            held.append(delivery)
+
+        await broker.consume("tasks", hold, prefetch=2)
+        for n in range(5):
+            await broker.publish("tasks", pack_value(n))
+        await settle()
+        before = (len(held), broker.depth("tasks"))
+
+        await held[0].ack()
+        await settle()
+        after = (len(held), broker.depth("tasks"))
+        await broker.close()
+        return before, after
+
+    before, after = asyncio.run(run())
+    assert before == (2, 3)
+    assert after == (3, 2)
+
+
+def test_requeue_redelivers_and_ack_settles_once():
+    async def run():
+        broker = InMemoryBroker()
+        seen = []
+
+        async def flaky(delivery):
+            seen.append(unpack_value(delivery.body))
+            if len(seen) == 1:
+                await delivery.requeue()
+                await delivery.ack()  # already settled, must not release the slot twice
+            else:
+                await delivery.ack()
+
+        await broker.consume("tasks", flaky, prefetch=1)
+        await broker.publish("tasks", pack_value("job"))
+        await settle()
+        await broker.close()
+        return seen, broker.depth("tasks")
+
+    seen, depth = asyncio.run(run())
+    assert seen == ["job", "job"]
+    assert depth == 0
+
+
+def test_worker_requeues_a_task_it_could_not_reply_to():
+    async def run():
+        broker = FailingReplyBroker(failures=1)
+        worker = AgentWorker(broker, "echo", make_app(), consumers=1, prefetch=1)
+        await worker.start()
+        transport = QueueTransport(broker, queued_agents=["echo"], result_timeout=5)
+        result = await transport.call("echo", "/agents/echo", {"task_id": "t1"})
+        depth = broker.depth(task_queue_name("echo"))
+        await transport.aclose()
+        return result, worker.handled, depth
+
+    result, handled, depth = asyncio.run(run())
+    assert result == {"status": "success", "task_id": "t1"}
+    # Handled twice: the first reply was lost and the task redelivered
+    assert handled == 2
+    assert depth == 0
+
+
+def test_http_exception_reply_becomes_agent_task_error():
+    async def run():
+        broker = InMemoryBroker()
+        worker = AgentWorker(broker, "echo", make_app(), consumers=1)
+        await worker.start()
+        transport = QueueTransport(broker, queued_agents=["echo"], result_timeout=5)
+        try:
+            with pytest.raises(AgentTaskError) as error:
+                await transport.call("echo", "/agents/conflict", {"task_id": "t1"})
+        finally:
+            await transport.aclose()
+        return error.value, worker.failed
+
+    error, failed = asyncio.run(run())
+    assert error.agent == "echo"
+    assert error.status_code == 409
+    assert error.detail == "t1 already exists"
+    assert failed == 1
+
+
+def test_validation_error_reply_becomes_422():
+    async def run():
+        broker = InMemoryBroker()
+        await AgentWorker(broker, "echo", make_app(), consumers=1).start()
+        transport = QueueTransport(broker, queued_agents=["echo"], result_timeout=5)
+        try:
+            with pytest.raises(AgentTaskError) as error:
+                await transport.call("echo", "/agents/echo", {"wrong": "field"})
+        finally:
+            await transport.aclose()
+        return error.value
+
+    error = asyncio.run(run())
+    assert error.status_code == 422
+    assert list(error.detail[0]["loc"]) == ["task_id"]
+
+
+def test_queue_transport_end_to_end_and_http_for_other_agents():
+    async def run():
+        broker = InMemoryBroker()
+        worker = AgentWorker(broker, "echo", make_app(), consumers=2, prefetch=1)
+        await worker.start()
+        http_client = FakeHttpClient()
+        transport = QueueTransport(broker, http_client=http_client, queued_agents=["echo"], result_timeout=5)
+        queued = await asyncio.gather(*(
+            transport.call("echo", "/agents/echo", {"task_id": f"t{n}"}) for n in range(10)
+        ))
+        over_http = await transport.call("planning", "/agents/planning", {"story_id": "US-1"})
+        pending = len(transport._pending)
+        await transport.aclose()
+        return queued, over_http, http_client.calls, worker.handled, pending
+
+    queued, over_http, http_calls, handled, pending = asyncio.run(run())
+    assert [result["task_id"] for result in queued] == [f"t{n}" for n in range(10)]
+    assert handled == 10
+    assert pending == 0
+    assert over_http == {"via": "http", "agent": "planning"}
+    assert http_calls == [("planning", "/agents/planning", {"story_id": "US-1"})]
+
+
+def test_non_queued_agent_without_http_client_is_rejected():
+    transport = QueueTransport(InMemoryBroker(), queued_agents=["echo"])
+    with pytest.raises(ValueError):
+        asyncio.run(transport.call("planning", "/agents/planning", {}))